@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from .database import configure_connection
+
+        # Pragmas SQLite du mode de production (voir SQLITE_PRAGMAS)
+        connection_created.connect(configure_connection, dispatch_uid='blog.configure_connection')
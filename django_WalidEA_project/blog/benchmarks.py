@@ -0,0 +1,605 @@
+"""
+Scénarios de benchmark de HELBPlace, lancés avec `python manage.py benchmark <scénario>`.
+Chaque scénario s'exécute sur une base de test temporaire (la base de développement n'est
+jamais modifiée) et retourne un dictionnaire de résultats sérialisable en JSON.
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import override_settings
+from django.utils import timezone
+
+from .models import Canvas, Contribution, ContributorTotal, DailyContribution, HourlyContribution, PixelEdit
+from .pixels import PixelBuffer
+from .tiles import TILE_SIZE
+from .writer import stop_pixel_writer
+
+# Registre des scénarios disponibles : nom -> fonction
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Décorateur qui enregistre une fonction de benchmark sous le nom donné."""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Crée une base de test temporaire pour la durée du benchmark puis la détruit.
+    Avec SQLite, la base est un fichier (et non la base en mémoire des tests) afin que
+    plusieurs threads puissent y écrire en même temps.
+    """
+    old_name = connection.settings_dict['NAME']
+    tmpdir = None
+    if connection.vendor == 'sqlite':
+        tmpdir = tempfile.mkdtemp(prefix='helbplace-bench-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        # Le thread d'écriture unique garde sa propre connexion à la base
+        stop_pixel_writer()
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmpdir:
+            os.rmdir(tmpdir)
+
+
+def run_threads(count, target):
+    """
+    Lance `count` threads exécutant target(index) et attend leur fin.
+    Retourne les exceptions levées par les threads et ferme leurs connexions à la base.
+    """
+    errors = []
+
+    def worker(index):
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def create_users(count, prefix='bench'):
+    """Crée (ou réutilise) `count` utilisateurs de benchmark (sans hachage de mot de passe)."""
+    return [User.objects.get_or_create(username=f'{prefix}{i}')[0] for i in range(count)]
+
+
+def create_synthetic_canvas(users, width, height, edits, days=30, colors=16, seed=0, title='Synthetic'):
+    """
+    Crée une toile avec un historique synthétique de `edits` modifications aléatoires,
+    réparties entre les utilisateurs donnés et sur les `days` derniers jours.
+    Les pixels, compteurs (version, edit_count) et agrégats journaliers sont cohérents
+    avec l'historique, comme si les modifications avaient été faites une par une.
+    """
+    rng = random.Random(seed)
+    palette = [f'#{rng.randrange(0x1000000):06X}' for _ in range(colors)]
+    canvas = Canvas.objects.create(title=title, width=width, height=height, author=users[0], pixel_edit_interval=0)
+    buffer = canvas.get_pixel_buffer()
+    now = timezone.now()
+    start = now - timedelta(days=days)
+
+    pixel_edits = []
+    for i in range(edits):
+        x, y = rng.randrange(width), rng.randrange(height)
+        stored_color = buffer.set(x, y, rng.choice(palette))
+        timestamp = start + (now - start) * (i + 1) / edits
+        pixel_edits.append(PixelEdit(canvas=canvas, user=rng.choice(users), x=x, y=y,
+                                     color=stored_color, timestamp=timestamp))
+
+    canvas.version = canvas.edit_count = edits
+    canvas.last_edit_at = pixel_edits[-1].timestamp if pixel_edits else None
+    canvas.save_pixel_buffer(buffer)
+    canvas.save()
+    PixelEdit.objects.bulk_create(pixel_edits, batch_size=1000)
+    DailyContribution.rebuild([canvas.pk])
+    Contribution.rebuild([canvas.pk])
+    ContributorTotal.rebuild()
+    HourlyContribution.rebuild()
+    return canvas
+
+
+def create_filled_canvas(user, size, colors=16, seed=0, title='Filled'):
+    """Crée une toile de `size` x `size` pixels dont tous les pixels sont peints (toutes les tuiles stockées)."""
+    rng = random.Random(seed)
+    palette = [f'#{rng.randrange(0x1000000):06X}' for _ in range(colors)]
+    canvas = Canvas.objects.create(title=title, width=size, height=size, author=user, pixel_edit_interval=0)
+    # Index de couleur aléatoires, sans boucle Python sur les pixels
+    data = rng.randbytes(size * size).translate(bytes(i % colors for i in range(256)))
+    canvas.save_pixel_buffer(PixelBuffer(size, size, palette, data))
+    return canvas
+
+
+@contextmanager
+def count_written_bytes():
+    """
+    Compte les octets des valeurs (chaînes et binaires) envoyées à la base par les requêtes SQL
+    exécutées pendant le bloc. Le bloc reçoit une liste dont le premier élément est le total.
+    """
+    total = [0]
+
+    def count(execute, sql, params, many, context):
+        for row in (params if many else [params or ()]):
+            values = row.values() if isinstance(row, dict) else row
+            total[0] += sum(len(value) for value in values if isinstance(value, (str, bytes, memoryview)))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield total
+
+
+def latency_summary(latencies, elapsed):
+    """Nombre de requêtes, débit (requêtes/s) et latences p50/p95/p99 en millisecondes."""
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        # Méthode du rang le plus proche
+        return round(latencies[max(0, -(-len(latencies) * p // 100) - 1)] * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'throughput_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': round(latencies[-1] * 1000, 2),
+    }
+
+
+def compare_to_baseline(result, baseline, path=''):
+    """
+    Compare les valeurs numériques d'un résultat à celles d'un résultat précédent.
+    Retourne {chemin: {"baseline", "current", "change_percent"}} pour chaque valeur commune.
+    """
+    comparison = {}
+    for key, value in result.items():
+        name = f'{path}{key}'
+        previous = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            comparison.update(compare_to_baseline(value, previous, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(previous, (int, float)):
+            change = round((value - previous) / previous * 100, 1) if previous else None
+            comparison[name] = {'baseline': previous, 'current': value, 'change_percent': change}
+    return comparison
+
+
+@scenario('writes')
+def bench_writes(threads=8, writes=50, size=64):
+    """
+    Plusieurs threads écrivent en parallèle des pixels distincts sur une même toile.
+    Vérifie ensuite qu'aucune écriture n'a été perdue (chaque pixel a la couleur attendue
+    et la version de la toile correspond au nombre total d'écritures).
+    """
+    users = create_users(threads)
+    canvas = Canvas.objects.create(title='Benchmark', width=size, height=size,
+                                   author=users[0], pixel_edit_interval=0)
+    canvas.initialize_canvas()
+    writes = min(writes, size * size // threads)
+
+    def cell(thread_index, i):
+        index = thread_index * writes + i
+        return index % size, index // size
+
+    def color(thread_index):
+        return f'#{thread_index + 1:06X}'
+
+    def painter(thread_index):
+        user = users[thread_index]
+        for i in range(writes):
+            x, y = cell(thread_index, i)
+            # Chaque écriture part d'une instance fraîchement chargée, comme une requête HTTP
+            Canvas.objects.get(pk=canvas.pk).write_pixel(x, y, color(thread_index), user)
+
+    start = time.perf_counter()
+    errors = run_threads(threads, painter)
+    elapsed = time.perf_counter() - start
+
+    canvas = Canvas.objects.get(pk=canvas.pk)
+    buffer = canvas.get_pixel_buffer()
+    lost = sum(
+        1
+        for t in range(threads)
+        for i in range(writes)
+        if buffer.get(*cell(t, i)) != color(t)
+    )
+    total = threads * writes
+    return {
+        'scenario': 'writes',
+        'threads': threads,
+        'writes': total,
+        'errors': [repr(e) for e in errors],
+        'elapsed_seconds': round(elapsed, 4),
+        'writes_per_second': round(total / elapsed, 1) if elapsed else None,
+        'final_version': canvas.version,
+        'lost_updates': lost,
+    }
+
+
+@contextmanager
+def sqlite_mode(pragmas, options):
+    """
+    Applique des pragmas (SQLITE_PRAGMAS) et des options de connexion SQLite aux connexions
+    ouvertes pendant le bloc ; les connexions existantes sont fermées avant et après.
+    """
+    database = connections.settings[connection.alias]
+    old_options = database['OPTIONS']
+    connections.close_all()
+    database['OPTIONS'] = dict(old_options, **options)
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            yield
+    finally:
+        connections.close_all()
+        database['OPTIONS'] = old_options
+
+
+# Modes de stockage comparés par le scénario "storage" : (pragmas, options de connexion, écrivain unique)
+STORAGE_MODES = {
+    # Réglages par défaut de SQLite : journal de rollback, chaque requête valide sa propre transaction
+    'per_request': ({'journal_mode': 'DELETE', 'synchronous': 'FULL'}, {}, False),
+    'wal': (settings.SQLITE_PRODUCTION_PRAGMAS, {'transaction_mode': 'IMMEDIATE'}, False),
+    'wal_single_writer': (settings.SQLITE_PRODUCTION_PRAGMAS, {'transaction_mode': 'IMMEDIATE'}, True),
+}
+
+
+@scenario('storage')
+def bench_storage(threads=8, writes=50, size=64):
+    """
+    Compare le débit d'écriture du scénario "writes" avec les réglages par défaut de SQLite,
+    en mode WAL, puis en mode WAL avec le thread d'écriture unique (mode de production).
+    """
+    if connection.vendor != 'sqlite':
+        return {'scenario': 'storage', 'error': 'SQLite database required'}
+    modes = {}
+    # Le journal de rollback doit être mesuré en premier : le mode WAL est conservé dans le fichier
+    for mode, (pragmas, options, single_writer) in STORAGE_MODES.items():
+        with sqlite_mode(pragmas, options), override_settings(CANVAS_SINGLE_WRITER=single_writer):
+            result = bench_writes(threads, writes, size)
+            stop_pixel_writer()
+        modes[mode] = {key: result[key] for key in ('writes', 'errors', 'elapsed_seconds',
+                                                    'writes_per_second', 'lost_updates')}
+    return {'scenario': 'storage', 'threads': threads, 'modes': modes}
+
+
+@scenario('paint')
+def bench_paint(painters=8, viewers=16, requests=50, size=64, edits=0):
+    """
+    Charge de travail de la page de détail : `painters` utilisateurs modifient des pixels
+    via update_pixel pendant que `viewers` utilisateurs rechargent la toile via get_canvas_data,
+    chacun envoyant `requests` requêtes au travers du client de test de Django.
+    La toile peut être préremplie avec un historique synthétique de `edits` modifications.
+    Retourne le débit et les latences p50/p95/p99 de chaque point d'accès.
+    """
+    from django.test import Client
+    from django.urls import reverse
+
+    users = create_users(painters + viewers)
+    canvas = create_synthetic_canvas(users, size, size, edits, title='Benchmark')
+    update_url = reverse('update-pixel', kwargs={'pk': canvas.pk})
+    data_url = reverse('get-canvas-data', kwargs={'pk': canvas.pk})
+    # Échantillons (point d'accès, latence en secondes, code HTTP) ; list.append est atomique
+    samples = []
+
+    def user_session(index):
+        client = Client(raise_request_exception=False)
+        client.force_login(users[index])
+        rng = random.Random(index)
+        for _ in range(requests):
+            if index < painters:
+                body = json.dumps({'x': rng.randrange(size), 'y': rng.randrange(size),
+                                   'color': f'#{rng.randrange(0x1000000):06X}'})
+                start = time.perf_counter()
+                response = client.post(update_url, body, content_type='application/json')
+                samples.append(('update_pixel', time.perf_counter() - start, response.status_code))
+            else:
+                start = time.perf_counter()
+                response = client.get(data_url)
+                samples.append(('get_canvas_data', time.perf_counter() - start, response.status_code))
+
+    start = time.perf_counter()
+    errors = run_threads(painters + viewers, user_session)
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for name in sorted({sample[0] for sample in samples}):
+        endpoint_samples = [sample for sample in samples if sample[0] == name]
+        endpoints[name] = latency_summary([latency for _, latency, _ in endpoint_samples], elapsed)
+        status_codes = {}
+        for _, _, status in endpoint_samples:
+            status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+        endpoints[name]['status_codes'] = status_codes
+
+    return {
+        'scenario': 'paint',
+        'painters': painters,
+        'viewers': viewers,
+        'size': size,
+        'history_edits': edits,
+        'errors': [repr(e) for e in errors],
+        'elapsed_seconds': round(elapsed, 4),
+        'final_version': Canvas.objects.get(pk=canvas.pk).version,
+        'endpoints': endpoints,
+    }
+
+
+@scenario('subscribers')
+def bench_subscribers(subscribers=500):
+    """
+    Ouvre `subscribers` connexions Server-Sent Events inactives sur une toile, directement
+    sur l'application ASGI du projet, puis mesure la mémoire utilisée par connexion et le
+    temps nécessaire pour qu'une modification publiée atteigne tous les abonnés.
+    """
+    import asyncio
+    import tracemalloc
+
+    from django.test import Client
+    from django.urls import reverse
+
+    from django_WalidEA_project.asgi import application
+
+    from .broadcast import get_broadcaster
+
+    user = create_users(1)[0]
+    canvas = Canvas.objects.create(title='Benchmark', width=16, height=16, author=user)
+    canvas.initialize_canvas()
+    client = Client()
+    client.force_login(user)
+    cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+    path = reverse('canvas-events', kwargs={'pk': canvas.pk})
+
+    async def run():
+        broadcaster = get_broadcaster()
+        disconnect = asyncio.Event()
+        connected = asyncio.Event()
+        delivered = asyncio.Event()
+        counts = {'hello': 0, 'changes': 0, 'errors': 0}
+
+        async def subscriber():
+            request_sent = False
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start' and message['status'] != 200:
+                    counts['errors'] += 1
+                    connected.set()
+                body = message.get('body', b'')
+                if b'event: hello' in body:
+                    counts['hello'] += 1
+                    if counts['hello'] == subscribers:
+                        connected.set()
+                elif b'"changes"' in body:
+                    counts['changes'] += 1
+                    if counts['changes'] == subscribers:
+                        delivered.set()
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': b'', 'root_path': '', 'client': ('127.0.0.1', 0),
+                'server': ('localhost', 80),
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+            }
+            await application(scope, receive, send)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(subscriber()) for _ in range(subscribers)]
+        await asyncio.wait_for(connected.wait(), timeout=300)
+        connect_seconds = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        broadcaster.publish(canvas.pk, 1, [[0, 0, '#000000']])
+        await asyncio.wait_for(delivered.wait(), timeout=60)
+        fanout_seconds = time.perf_counter() - start
+
+        disconnect.set()
+        await asyncio.wait(tasks, timeout=60)
+        return {
+            'scenario': 'subscribers',
+            'subscribers': subscribers,
+            'connected': counts['hello'],
+            'errors': counts['errors'],
+            'connect_seconds': round(connect_seconds, 3),
+            'memory_per_subscriber_kb': round(memory / subscribers / 1024, 2),
+            'fanout_seconds': round(fanout_seconds, 4),
+            'delivered': counts['changes'],
+        }
+
+    return asyncio.run(run())
+
+
+@scenario('community_parser')
+def bench_community_parser(size=1000):
+    """
+    Compare, sur un colors.txt synthétique de `size` x `size` cases, l'ancien décodage
+    (texte complet découpé en listes de chaînes) et le décodage ligne par ligne en octets RGB,
+    puis mesure la comparaison de deux versions dont 1 % des cases ont changé.
+    """
+    import io
+    import tracemalloc
+
+    from .community import diff_boards, parse_board_lines
+
+    rng = random.Random(0)
+    colors = [f'{rng.randrange(0x1000000):06X}' for _ in range(32)]
+    body = '\n'.join(';'.join(rng.choice(colors) for _ in range(size)) for _ in range(size)).encode() + b'\n'
+
+    def legacy():
+        return [line.split(';') for line in body.decode().strip().split('\n')]
+
+    def streaming():
+        # Même découpage que response.iter_lines() pendant le téléchargement
+        return parse_board_lines(io.BytesIO(body))
+
+    def measure(func):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+        return round(elapsed, 4), round(peak / 1024 / 1024, 2)
+
+    legacy_seconds, legacy_mb = measure(legacy)
+    streaming_seconds, streaming_mb = measure(streaming)
+
+    width, _, old = streaming()
+    new = bytearray(old)
+    changed = size * size // 100
+    for index in rng.sample(range(size * size), changed):
+        new[index * 3] ^= 0xFF
+    start = time.perf_counter()
+    changes = diff_boards(width, old, bytes(new))
+    diff_seconds = time.perf_counter() - start
+
+    return {
+        'scenario': 'community_parser',
+        'size': size,
+        'body_mb': round(len(body) / 1024 / 1024, 2),
+        'legacy_seconds': legacy_seconds,
+        'legacy_peak_mb': legacy_mb,
+        'streaming_seconds': streaming_seconds,
+        'streaming_peak_mb': streaming_mb,
+        'changed_cells': changed,
+        'diff_changes': len(changes),
+        'diff_seconds': round(diff_seconds, 4),
+    }
+
+
+def synthetic_buffer(size, colors=16, shapes=200, noise=0.05, seed=0):
+    """
+    Tampon de `size` x `size` pixels ressemblant à une toile dessinée : des rectangles
+    de couleur unie superposés, plus une proportion `noise` de pixels isolés aléatoires.
+    """
+    rng = random.Random(seed)
+    palette = ['#FFFFFF'] + [f'#{rng.randrange(0x1000000):06X}' for _ in range(colors - 1)]
+    data = bytearray(size * size)
+    for _ in range(shapes):
+        x, y = rng.randrange(size), rng.randrange(size)
+        w, h = rng.randint(1, size // 4 or 1), rng.randint(1, size // 4 or 1)
+        w = min(w, size - x)
+        index = rng.randrange(colors)
+        for row in range(y, min(y + h, size)):
+            data[row * size + x:row * size + x + w] = bytes([index]) * w
+    for offset in rng.sample(range(size * size), int(size * size * noise)):
+        data[offset] = rng.randrange(colors)
+    return PixelBuffer(size, size, palette, data)
+
+
+@scenario('wire_format')
+def bench_wire_format(size=None, repeat=3):
+    """
+    Compare la taille et le temps d'encodage (meilleur de `repeat` essais) des données d'une toile
+    dans le format JSON actuel de get_canvas_data et dans le format binaire, avec ou sans gzip,
+    pour des toiles de 100, 500 et 1000 pixels de côté (ou de `size` pixels si l'option est donnée).
+    """
+    from .wire import compress, decode_canvas, encode_canvas
+
+    def measure(func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return {'bytes': len(data), 'encode_ms': round(best * 1000, 2)}
+
+    results = []
+    for side in ([size] if size else [100, 500, 1000]):
+        buffer = synthetic_buffer(side)
+        version = side * side
+
+        def json_body():
+            # Même corps que get_canvas_data : la matrice "#RRGGBB" sérialisée deux fois
+            return json.dumps({'content': json.dumps(buffer.to_matrix()), 'version': version}).encode()
+
+        formats = {
+            'json': measure(json_body),
+            'json_gzip': measure(lambda: compress(json_body())),
+            'binary': measure(lambda: encode_canvas(buffer, version)),
+            'binary_gzip': measure(lambda: compress(encode_canvas(buffer, version))),
+        }
+        # Vérification : le format binaire redonne exactement les pixels encodés
+        decoded, _ = decode_canvas(encode_canvas(buffer, version))
+        assert decoded.data == buffer.data and decoded.palette == buffer.palette
+        for name, result in formats.items():
+            result['ratio'] = round(result['bytes'] / formats['json']['bytes'], 4)
+        results.append({'size': side, 'formats': formats})
+
+    return {'scenario': 'wire_format', 'repeat': repeat, 'canvases': results}
+
+
+@scenario('write_cost')
+def bench_write_cost(writes=100, size=None, sizes=(100, 500, 1000, 2000)):
+    """
+    Mesure le coût d'une écriture d'un pixel (latence et octets envoyés à la base) sur des toiles
+    entièrement peintes de plus en plus grandes (ou de `size` pixels si l'option est donnée).
+    Les pixels sont stockés par tuiles : ce coût ne doit pas dépendre de la taille de la toile.
+    Les images clés (une lecture complète toutes les CANVAS_KEYFRAME_INTERVAL écritures) sont exclues.
+    """
+    user = create_users(1)[0]
+    rng = random.Random(0)
+    results = []
+    with override_settings(CANVAS_KEYFRAME_INTERVAL=10 ** 9):
+        for side in ([size] if size else sizes):
+            canvas = create_filled_canvas(user, side)
+            colors = canvas.palette
+            # Première écriture non mesurée : elle crée les compteurs de contributions de la toile
+            canvas.write_pixel(0, 0, colors[0], user)
+            latencies = []
+            written = []
+            for _ in range(writes):
+                # Pixels d'une tuile complète : les tuiles du bord, plus petites, coûteraient moins
+                x, y = rng.randrange(min(TILE_SIZE, side)), rng.randrange(min(TILE_SIZE, side))
+                with count_written_bytes() as total:
+                    start = time.perf_counter()
+                    # Instance fraîchement chargée à chaque écriture, comme une requête HTTP
+                    Canvas.objects.get(pk=canvas.pk).write_pixel(x, y, rng.choice(colors), user)
+                    latencies.append(time.perf_counter() - start)
+                written.append(total[0])
+            summary = latency_summary(latencies, sum(latencies))
+            results.append({
+                'size': side,
+                'canvas_bytes': side * side,
+                'bytes_written_per_write': max(written),
+                'p50_ms': summary['p50_ms'],
+                'p95_ms': summary['p95_ms'],
+            })
+
+    # Le volume écrit par une écriture est le même quelle que soit la taille de la toile
+    assert len({result['bytes_written_per_write'] for result in results}) == 1, results
+    return {'scenario': 'write_cost', 'writes': writes, 'canvases': results}
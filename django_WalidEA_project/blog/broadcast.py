@@ -0,0 +1,165 @@
+"""
+Diffusion en direct des modifications de pixels aux clients abonnés à une toile
+(Server-Sent Events et WebSocket, voir views.canvas_events et blog.websocket).
+
+Chaque processus possède un Broadcaster qui distribue les messages à ses abonnés locaux.
+Le backend configuré par CANVAS_BROADCAST_BACKEND décide comment les messages arrivent
+jusqu'au Broadcaster : directement (un seul worker) ou en relisant le journal des
+changements en base (plusieurs workers).
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """File de messages d'un abonné, liée à la boucle asyncio qui l'a créée."""
+
+    def __init__(self, canvas_id, maxsize=100):
+        self.canvas_id = canvas_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, message):
+        """Ajoute un message à la file (appelé dans la boucle de l'abonné)."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Abonné trop lent : on vide sa file et on lui demande de recharger la toile
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'version': message['version'], 'resync': True})
+
+    async def get(self):
+        """Attend le prochain message."""
+        return await self.queue.get()
+
+
+class Broadcaster:
+    """Répartit les messages d'une toile entre les abonnés de ce processus."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, canvas_id):
+        """Abonne la boucle asyncio courante aux modifications de la toile."""
+        subscription = Subscription(canvas_id)
+        with self._lock:
+            self._subscriptions[canvas_id].add(subscription)
+        self.backend.start(self)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Désabonne un client (à appeler lorsque la connexion est fermée)."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.canvas_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.canvas_id]
+
+    def canvas_ids(self):
+        """Toiles ayant au moins un abonné dans ce processus."""
+        with self._lock:
+            return list(self._subscriptions)
+
+    def subscriber_count(self):
+        """Nombre total d'abonnés dans ce processus."""
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, canvas_id, version, changes):
+        """Publie les pixels modifiés par une nouvelle version de la toile."""
+        self.backend.publish(self, canvas_id, {'version': version, 'changes': changes})
+
+    def deliver(self, canvas_id, message):
+        """Transmet un message à tous les abonnés locaux de la toile (depuis n'importe quel thread)."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(canvas_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # La boucle de l'abonné est fermée : il ne recevra plus rien
+                self.unsubscribe(subscription)
+
+
+class LocalBackend:
+    """Les messages publiés sont distribués directement aux abonnés du même processus."""
+
+    def start(self, broadcaster):
+        pass
+
+    def publish(self, broadcaster, canvas_id, message):
+        broadcaster.deliver(canvas_id, message)
+
+
+class ChangeLogBackend:
+    """
+    Backend partagé entre plusieurs workers : les modifications sont déjà écrites dans
+    le journal CanvasChange, un thread de chaque processus relit donc régulièrement la
+    version des toiles suivies et distribue les nouveaux changements à ses abonnés.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, 'CANVAS_BROADCAST_POLL_INTERVAL', 0.5)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, broadcaster):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(broadcaster,), daemon=True)
+                self._thread.start()
+
+    def publish(self, broadcaster, canvas_id, message):
+        # Le journal en base est la source : les autres workers le liront aussi
+        pass
+
+    def _run(self, broadcaster):
+        from django.db import close_old_connections
+        from .models import Canvas, CanvasChange
+
+        versions = {}
+        while True:
+            time.sleep(self.interval)
+            canvas_ids = broadcaster.canvas_ids()
+            if not canvas_ids:
+                continue
+            close_old_connections()
+            current = dict(Canvas.objects.filter(pk__in=canvas_ids).values_list('id', 'version'))
+            for canvas_id, version in current.items():
+                since = versions.get(canvas_id)
+                versions[canvas_id] = version
+                if since is None or since == version:
+                    continue
+                changes = CanvasChange.since(canvas_id, version, since)
+                if changes is None:
+                    broadcaster.deliver(canvas_id, {'version': version, 'resync': True})
+                else:
+                    broadcaster.deliver(canvas_id, {'version': version, 'changes': changes})
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """Retourne le Broadcaster du processus, créé avec le backend CANVAS_BROADCAST_BACKEND."""
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            backend_class = import_string(getattr(settings, 'CANVAS_BROADCAST_BACKEND', 'blog.broadcast.LocalBackend'))
+            _broadcaster = Broadcaster(backend_class())
+        return _broadcaster
+
+
+def publish_change(canvas_id, version, changes):
+    """Publie une modification de toile (appelé après le commit de l'écriture)."""
+    get_broadcaster().publish(canvas_id, version, changes)
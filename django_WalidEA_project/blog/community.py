@@ -0,0 +1,320 @@
+"""
+Miroir local de la toile commune B2 (fichier colors.txt distant).
+
+Les pages ne téléchargent plus la toile distante : un thread de chaque processus la
+rafraîchit en arrière-plan toutes les COMMUNITY_REFRESH_INTERVAL secondes (un seul
+processus par intervalle grâce à un verrou dans le cache), avec une session requests
+partagée (connexions réutilisées) et des requêtes conditionnelles (ETag / Last-Modified).
+La dernière copie valide est conservée dans le cache et servie même si le serveur
+distant ne répond plus, avec l'indication qu'elle est périmée.
+
+La toile est lue ligne par ligne pendant le téléchargement et stockée sous forme compacte
+(3 octets RGB par case). Chaque nouvelle version est comparée à la précédente : les cases
+modifiées sont conservées quelques minutes pour que les clients ne téléchargent que les
+différences (voir views.get_community_changes).
+"""
+import binascii
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+
+from .rendering import encode_image
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'community-snapshot'
+REFRESH_LOCK_KEY = 'community-refresh-lock'
+
+# Couleur (blanc) des cases illisibles de colors.txt
+INVALID_CELL = b'\xff\xff\xff'
+
+
+def _board_key(version):
+    return f'community-board:{version}'
+
+
+def _delta_key(version):
+    return f'community-delta:{version}'
+
+
+def get_board_url():
+    """URL du fichier colors.txt de la toile commune."""
+    return getattr(settings, 'COMMUNITY_BOARD_URL', 'https://helbplace2425.alwaysdata.net/colors.txt')
+
+
+def get_refresh_interval():
+    """Nombre de secondes entre deux rafraîchissements du miroir."""
+    return getattr(settings, 'COMMUNITY_REFRESH_INTERVAL', 5)
+
+
+def create_session():
+    """Session requests dont les connexions vers le serveur de la toile commune sont réutilisées."""
+    session = requests.Session()
+    pool_size = getattr(settings, 'COMMUNITY_POOL_SIZE', 10)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def parse_board_cells(line, number):
+    """
+    Décode case par case une ligne de colors.txt qui n'a pas pu être décodée d'un seul coup :
+    les cases illisibles deviennent blanches (INVALID_CELL), le reste de la ligne est conservé.
+    """
+    row = bytearray()
+    invalid = 0
+    for cell in line.split(b';'):
+        try:
+            color = binascii.unhexlify(cell.strip().lstrip(b'#'))
+        except (binascii.Error, ValueError):
+            color = b''
+        if len(color) != 3:
+            color = INVALID_CELL
+            invalid += 1
+        row += color
+    if invalid:
+        logger.warning("colors.txt: %d invalid cell(s) on line %d replaced with white", invalid, number)
+    return row
+
+
+def parse_board_lines(lines):
+    """
+    Décode les lignes de colors.txt (octets "RRGGBB;RRGGBB;...") au fur et à mesure.
+    Retourne (largeur, hauteur, octets RGB de toutes les cases, ligne après ligne).
+    Un ";" final est ignoré et une case illisible devient blanche (voir parse_board_cells) :
+    une erreur ponctuelle du fichier distant ne fait pas perdre le reste de la toile.
+    Lève ValueError si une ligne n'a pas la même longueur que la première.
+    """
+    data = bytearray()
+    width = None
+    height = 0
+    for line in lines:
+        line = line.strip().rstrip(b';')
+        if not line:
+            continue
+        cells = line.count(b';') + 1
+        row = None
+        # Cas courant : toutes les cases font 6 caractères, la ligne est décodée d'un seul coup
+        if len(line) == cells * 7 - 1:
+            try:
+                row = binascii.unhexlify(line.replace(b';', b''))
+            except binascii.Error:
+                pass
+        if row is None:
+            row = parse_board_cells(line, height + 1)
+        if width is not None and cells != width:
+            raise ValueError(f"Invalid line {height + 1} in colors.txt")
+        width = cells
+        data += row
+        height += 1
+    if not height:
+        raise ValueError("Empty colors.txt")
+    return width, height, bytes(data)
+
+
+def diff_boards(width, old, new):
+    """
+    Compare deux toiles de même taille (octets RGB) et retourne les cases modifiées
+    au format [[x, y, "#RRGGBB"], ...]. Les lignes, puis les blocs de 64 cases identiques
+    sont comparés d'un seul coup : seules les zones modifiées sont parcourues case par case.
+    """
+    old, new = memoryview(old), memoryview(new)
+    row_size = width * 3
+    block_size = 64 * 3
+    changes = []
+    for row_start in range(0, len(new), row_size):
+        row_end = row_start + row_size
+        if old[row_start:row_end] == new[row_start:row_end]:
+            continue
+        for start in range(row_start, row_end, block_size):
+            end = min(start + block_size, row_end)
+            if old[start:end] == new[start:end]:
+                continue
+            for offset in range(start, end, 3):
+                if old[offset:offset + 3] != new[offset:offset + 3]:
+                    index = offset // 3
+                    changes.append([index % width, index // width, '#' + new[offset:offset + 3].hex().upper()])
+    return changes
+
+
+class CommunityMirror:
+    """Copie locale de la toile commune, rafraîchie en arrière-plan."""
+
+    def __init__(self):
+        self.session = create_session()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def get_snapshot(self):
+        """
+        Retourne la description de la dernière copie valide (ou None) : un dictionnaire avec
+        sa `version` (incrémentée à chaque changement de contenu), `width`, `height`, les
+        validateurs HTTP `etag` et `last_modified`, la date du dernier contenu reçu
+        `updated_at` et celle de la dernière vérification réussie `checked_at`.
+        Les cases elles-mêmes sont lues avec get_board().
+        """
+        return cache.get(SNAPSHOT_KEY)
+
+    def get_board(self):
+        """Retourne (copie, octets RGB des cases) de la dernière copie valide, ou (None, None)."""
+        for _ in range(2):
+            snapshot = self.get_snapshot()
+            if snapshot is None:
+                return None, None
+            data = cache.get(_board_key(snapshot['version']))
+            if data is not None:
+                return snapshot, data
+            # Cases remplacées entre les deux lectures, ou supprimées du cache : on les recharge
+            self.refresh(conditional=False)
+        return None, None
+
+    def get_changes(self, since):
+        """
+        Retourne (version, cases modifiées depuis la version `since`) ; les cases sont None
+        si les différences ne sont plus disponibles et que la toile doit être rechargée.
+        """
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return None, None
+        version = snapshot['version']
+        if since == version:
+            return version, []
+        if since > version or version - since > getattr(settings, 'COMMUNITY_DELTA_HISTORY', 100):
+            return version, None
+        deltas = cache.get_many([_delta_key(v) for v in range(since + 1, version + 1)])
+        changes = []
+        for v in range(since + 1, version + 1):
+            delta = deltas.get(_delta_key(v))
+            if delta is None:
+                return version, None
+            changes.extend(delta)
+        return version, changes
+
+    def refresh(self, conditional=True):
+        """
+        Télécharge la toile distante si elle a changé (requête conditionnelle) et met à jour
+        la copie du cache. En cas d'erreur, la copie précédente est conservée telle quelle.
+        """
+        snapshot = self.get_snapshot()
+        headers = {}
+        if snapshot is not None and conditional:
+            if snapshot['etag']:
+                headers['If-None-Match'] = snapshot['etag']
+            if snapshot['last_modified']:
+                headers['If-Modified-Since'] = snapshot['last_modified']
+
+        try:
+            with self.session.get(get_board_url(), headers=headers, stream=True,
+                                  timeout=getattr(settings, 'COMMUNITY_FETCH_TIMEOUT', 5)) as response:
+                if response.status_code == 200:
+                    # Décodage pendant le téléchargement, sans garder le texte complet en mémoire
+                    width, height, data = parse_board_lines(response.iter_lines(chunk_size=65536))
+        except (requests.RequestException, ValueError):
+            return snapshot
+
+        now = time.time()
+        if response.status_code == 304 and snapshot is not None:
+            # Contenu inchangé : seule la date de vérification avance
+            snapshot['checked_at'] = now
+        elif response.status_code == 200:
+            snapshot = self._store(snapshot, width, height, data)
+            snapshot.update({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checked_at': now,
+            })
+        else:
+            return snapshot
+        cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+        return snapshot
+
+    def _store(self, snapshot, width, height, data):
+        """
+        Enregistre les cases téléchargées comme nouvelle version (si elles ont changé) avec
+        les différences par rapport à la version précédente. Retourne la nouvelle description.
+        """
+        previous = None
+        if snapshot is not None and (snapshot['width'], snapshot['height']) == (width, height):
+            previous = cache.get(_board_key(snapshot['version']))
+            if previous == data:
+                return dict(snapshot)
+
+        version = snapshot['version'] + 1 if snapshot is not None else 1
+        # Sans version précédente comparable, les clients devront recharger toute la toile
+        changes = diff_boards(width, previous, data) if previous is not None else None
+        if changes is not None:
+            cache.set(_delta_key(version), changes, getattr(settings, 'COMMUNITY_DELTA_TIMEOUT', 300))
+        cache.set(_board_key(version), data, timeout=None)
+        if snapshot is not None:
+            cache.delete(_board_key(snapshot['version']))
+        return {'version': version, 'width': width, 'height': height, 'updated_at': time.time()}
+
+    def refresh_if_due(self):
+        """Rafraîchit le miroir si aucun processus ne l'a fait pendant l'intervalle courant."""
+        if cache.add(REFRESH_LOCK_KEY, True, timeout=get_refresh_interval()):
+            return self.refresh()
+        return self.get_snapshot()
+
+    def start(self):
+        """Démarre le thread de rafraîchissement de ce processus (une seule fois)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh_if_due()
+            except Exception:
+                # Le thread ne doit jamais s'arrêter : la copie apparaîtra simplement périmée
+                pass
+            time.sleep(get_refresh_interval())
+
+    def get_status(self):
+        """
+        Retourne (copie, périmée) pour l'affichage. La copie est None si la toile distante
+        n'a encore jamais pu être téléchargée ; elle est périmée si elle n'a pas été vérifiée
+        depuis COMMUNITY_STALE_AFTER secondes.
+        """
+        if getattr(settings, 'COMMUNITY_BACKGROUND_REFRESH', True):
+            self.start()
+            snapshot = self.get_snapshot()
+            if snapshot is None:
+                # Premier affichage : aucune copie disponible, on attend un téléchargement
+                snapshot = self.refresh()
+        else:
+            snapshot = self.refresh_if_due()
+        if snapshot is None:
+            return None, True
+        stale = time.time() - snapshot['checked_at'] > getattr(settings, 'COMMUNITY_STALE_AFTER', 30)
+        return snapshot, stale
+
+
+def get_community_image(snapshot, data):
+    """Retourne les octets PNG de la copie de la toile commune, mis en cache pour sa version."""
+    key = f'community-image:{snapshot["version"]}'
+    image = cache.get(key)
+    if image is None:
+        image = encode_image(Image.frombytes('RGB', (snapshot['width'], snapshot['height']), data), 'png')
+        cache.set(key, image, getattr(settings, 'CANVAS_IMAGE_CACHE_TIMEOUT', 3600))
+    return image
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_community_mirror():
+    """Retourne le miroir de la toile commune du processus."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = CommunityMirror()
+        return _mirror
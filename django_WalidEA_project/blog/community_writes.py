@@ -0,0 +1,149 @@
+"""
+File d'envoi des modifications de pixels vers la toile commune B2 (writer.php distant).
+
+La vue accepte la modification immédiatement et la place dans une file ; des threads
+d'envoi la transmettent ensuite au serveur distant. Une nouvelle couleur pour une case
+déjà en attente remplace l'ancienne (une seule requête envoyée), les échecs sont
+réessayés avec un délai croissant et la file a une taille maximale : au-delà, les
+nouvelles modifications sont refusées plutôt que d'accumuler du retard.
+
+La file est propre à chaque processus et n'est conservée qu'en mémoire : les modifications
+en attente sont perdues si le processus s'arrête ou redémarre avant de les avoir envoyées.
+
+Chaque appel à enqueue est compté une seule fois : `accepted` (nouvelle entrée), `coalesced`
+(remplace la couleur d'une case déjà en attente) ou `rejected` (file pleine). Chaque entrée
+acceptée finit `sent`, `failed` ou `superseded` (abandonnée entre deux essais au profit d'une
+couleur plus récente pour la même case), ou est encore en attente ou en cours d'envoi :
+accepted = sent + failed + superseded + depth + in_flight.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+
+from .community import create_session
+
+METRIC_NAMES = ('accepted', 'coalesced', 'rejected', 'sent', 'retries', 'failed', 'superseded')
+
+
+class CommunityWriteQueue:
+    """File des modifications en attente, vidée par un groupe de threads d'envoi."""
+
+    def __init__(self, workers=None, max_size=None):
+        self.workers = workers or getattr(settings, 'COMMUNITY_WRITE_WORKERS', 4)
+        self.max_size = max_size or getattr(settings, 'COMMUNITY_WRITE_QUEUE_SIZE', 10000)
+        self.session = create_session()
+        # (ligne, colonne) -> couleur, dans l'ordre d'arrivée
+        self._pending = OrderedDict()
+        # Cases en cours d'envoi : une même case n'est jamais envoyée par deux threads à la fois
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._metrics = dict.fromkeys(METRIC_NAMES, 0)
+        self._threads = []
+
+    def start(self):
+        """Démarre les threads d'envoi (une seule fois)."""
+        with self._condition:
+            if self._threads:
+                return
+            self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def enqueue(self, row, col, hexvalue):
+        """
+        Ajoute une modification à la file. Retourne False si la file est pleine
+        (la modification n'est alors pas enregistrée).
+        """
+        key = (row, col)
+        with self._condition:
+            if key in self._pending:
+                # La case est déjà en attente : seule sa couleur change, aucune entrée n'est ajoutée
+                self._metrics['coalesced'] += 1
+            elif len(self._pending) >= self.max_size:
+                self._metrics['rejected'] += 1
+                return False
+            else:
+                self._metrics['accepted'] += 1
+            self._pending[key] = hexvalue
+            self._condition.notify()
+        return True
+
+    def metrics(self):
+        """Compteurs de la file et nombre de modifications en attente ou en cours d'envoi."""
+        with self._condition:
+            return dict(self._metrics, depth=len(self._pending), in_flight=len(self._in_flight))
+
+    def join(self, timeout=None):
+        """Attend que la file soit vide. Retourne False si le délai est dépassé."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def _take(self):
+        """Retire la plus ancienne modification dont la case n'est pas déjà en cours d'envoi."""
+        for key in self._pending:
+            if key not in self._in_flight:
+                self._in_flight.add(key)
+                return key, self._pending.pop(key)
+        return None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                item = self._condition.wait_for(self._take)
+            key, hexvalue = item
+            try:
+                self._send(key, hexvalue)
+            finally:
+                with self._condition:
+                    self._in_flight.discard(key)
+                    self._condition.notify_all()
+
+    def _send(self, key, hexvalue):
+        """Envoie une modification, en réessayant avec un délai croissant en cas d'échec."""
+        row, col = key
+        params = {
+            'username': getattr(settings, 'COMMUNITY_USERNAME', ''),
+            'password': getattr(settings, 'COMMUNITY_PASSWORD', ''),
+            'row': row,
+            'col': col,
+            'hexvalue': hexvalue,
+        }
+        retries = getattr(settings, 'COMMUNITY_WRITE_RETRIES', 5)
+        backoff = getattr(settings, 'COMMUNITY_WRITE_BACKOFF', 0.5)
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1))
+                with self._condition:
+                    # Une couleur plus récente est en attente pour cette case : inutile d'insister
+                    if key in self._pending:
+                        self._metrics['superseded'] += 1
+                        return
+                    self._metrics['retries'] += 1
+            try:
+                response = self.session.get(getattr(settings, 'COMMUNITY_WRITER_URL', ''), params=params,
+                                            timeout=getattr(settings, 'COMMUNITY_FETCH_TIMEOUT', 5))
+                if response.status_code == 200:
+                    with self._condition:
+                        self._metrics['sent'] += 1
+                    return
+            except requests.RequestException:
+                pass
+        with self._condition:
+            self._metrics['failed'] += 1
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_community_write_queue():
+    """Retourne la file d'envoi du processus, avec ses threads démarrés."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = CommunityWriteQueue()
+            _queue.start()
+        return _queue
@@ -0,0 +1,21 @@
+"""
+Réglage des connexions SQLite (mode de production, voir SQLITE_PRAGMAS dans settings.py).
+
+Les pragmas sont appliqués à chaque nouvelle connexion par le signal connection_created :
+journal WAL (les lectures ne bloquent plus l'écriture en cours), synchronous=NORMAL
+(pas de fsync à chaque transaction en mode WAL), délai d'attente du verrou d'écriture
+et lecture du fichier par mmap.
+"""
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Applique SQLITE_PRAGMAS à une nouvelle connexion SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
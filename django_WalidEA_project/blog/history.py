@@ -0,0 +1,106 @@
+"""
+Relecture de l'historique d'une toile (time-lapse).
+
+L'état d'une toile à un instant T est reconstruit à partir de l'image clé (CanvasKeyframe)
+la plus récente avant T, puis des PixelEdit enregistrés après elle : au plus
+CANVAS_KEYFRAME_INTERVAL modifications sont donc rejouées pour un état isolé.
+Les images d'une animation sont produites une à une par des générateurs, sans jamais
+garder l'animation complète en mémoire.
+"""
+import io
+
+from django.conf import settings
+from django.utils import timezone
+from PIL import GifImagePlugin, Image
+
+from .models import CanvasKeyframe, PixelEdit
+from .pixels import PixelBuffer
+from .rendering import render_buffer
+
+
+class Replay:
+    """
+    Relecture vers l'avant des modifications d'une toile.
+    Les appels successifs à seek() doivent utiliser des instants croissants : seules les
+    modifications postérieures au dernier instant sont alors lues.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.buffer = PixelBuffer.blank(canvas.width, canvas.height)
+        # Identifiant du dernier PixelEdit appliqué
+        self.edit_id = 0
+
+    def seek(self, when):
+        """Avance la relecture jusqu'à l'instant `when` et retourne le tampon de pixels."""
+        # Sauter directement à l'image clé la plus récente si elle est plus loin que nous
+        keyframe = (
+            CanvasKeyframe.objects.filter(canvas_id=self.canvas.pk, edit_id__gt=self.edit_id, timestamp__lte=when)
+            .order_by('-edit_id')
+            .first()
+        )
+        if keyframe is not None:
+            self.buffer = keyframe.to_buffer(self.canvas.width, self.canvas.height)
+            self.edit_id = keyframe.edit_id
+
+        edits = (
+            PixelEdit.objects.filter(canvas_id=self.canvas.pk, id__gt=self.edit_id, timestamp__lte=when)
+            .order_by('id')
+            .values_list('id', 'x', 'y', 'color')
+        )
+        for edit_id, x, y, color in edits.iterator():
+            # Les anciennes modifications importées n'ont pas de coordonnées
+            if x is not None and color and self.buffer.in_bounds(x, y):
+                self.buffer.set(x, y, color)
+            self.edit_id = edit_id
+        return self.buffer
+
+
+def state_at(canvas, when):
+    """Retourne le tampon de pixels de la toile telle qu'elle était à l'instant `when`."""
+    return Replay(canvas).seek(when)
+
+
+def get_max_frames():
+    """Nombre maximal d'images d'une animation time-lapse."""
+    return getattr(settings, 'CANVAS_TIMELAPSE_MAX_FRAMES', 300)
+
+
+def get_time_range(canvas):
+    """Retourne (début, fin) de l'historique de la toile."""
+    first = canvas.edits.order_by('id').values_list('timestamp', flat=True).first()
+    start = min(first, canvas.date_posted) if first else canvas.date_posted
+    return start, canvas.last_edit_at or timezone.now()
+
+
+def iter_frames(canvas, frames, scale=1):
+    """
+    Générateur des `frames` images Pillow de la toile, à intervalles réguliers entre
+    sa création et sa dernière modification.
+    """
+    start, end = get_time_range(canvas)
+    replay = Replay(canvas)
+    for index in range(frames):
+        when = end if frames == 1 else start + (end - start) * index / (frames - 1)
+        image = render_buffer(replay.seek(when))
+        if scale > 1:
+            image = image.resize((image.width * scale, image.height * scale), Image.NEAREST)
+        yield image
+
+
+def iter_gif(frames, duration=100):
+    """
+    Encode des images Pillow en GIF animé (en boucle) et retourne les octets par morceaux :
+    un morceau par image, l'animation n'est jamais construite entière en mémoire.
+    """
+    header_written = False
+    for frame in frames:
+        if not header_written:
+            for chunk in GifImagePlugin.getheader(frame, info={'loop': 0, 'duration': duration})[0]:
+                yield chunk
+            header_written = True
+        # Chaque image garde sa propre palette (elle change au fil des modifications)
+        for chunk in GifImagePlugin.getdata(frame, duration=duration, include_color_table=True):
+            yield chunk
+    if header_written:
+        yield b';'
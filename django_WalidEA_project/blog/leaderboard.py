@@ -0,0 +1,63 @@
+"""
+Classement général des contributeurs, toutes toiles confondues.
+
+Le classement depuis le début est lu dans ContributorTotal (index sur le nombre de
+modifications : seuls les K premiers sont lus). Les classements des dernières 24 heures et
+des 7 derniers jours additionnent les compteurs HourlyContribution de la période (à l'heure
+près : l'heure la plus ancienne est comptée entière). Tous ces compteurs sont maintenus à
+chaque écriture de pixel ; les classements calculés sont mis en cache quelques secondes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ContributorTotal, HourlyContribution
+
+# Périodes disponibles : nom -> durée (None : depuis le début)
+WINDOWS = {
+    'all': None,
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+}
+
+
+def get_leaderboard_size():
+    """Nombre maximal de contributeurs d'un classement."""
+    return getattr(settings, 'LEADERBOARD_SIZE', 50)
+
+
+def compute_leaderboard(window, limit):
+    """Retourne les `limit` premiers contributeurs de la période : [{"rank", "username", "count"}, ...]."""
+    duration = WINDOWS[window]
+    if duration is None:
+        rows = (
+            ContributorTotal.objects.order_by('-count', 'user_id')
+            .values_list('user__username', 'count')[:limit]
+        )
+    else:
+        since = HourlyContribution.truncate(timezone.now() - duration)
+        rows = (
+            HourlyContribution.objects.filter(hour__gte=since)
+            .values('user_id', 'user__username')
+            .annotate(total=Sum('count'))
+            .order_by('-total', 'user_id')
+            .values_list('user__username', 'total')[:limit]
+        )
+    return [
+        {'rank': rank, 'username': username, 'count': count}
+        for rank, (username, count) in enumerate(rows, start=1)
+    ]
+
+
+def get_leaderboard(window, limit=None):
+    """Classement de la période `window` (voir WINDOWS), mis en cache LEADERBOARD_CACHE_TIMEOUT secondes."""
+    limit = min(limit or get_leaderboard_size(), get_leaderboard_size())
+    key = f'leaderboard:{window}:{limit}'
+    entries = cache.get(key)
+    if entries is None:
+        entries = compute_leaderboard(window, limit)
+        cache.set(key, entries, getattr(settings, 'LEADERBOARD_CACHE_TIMEOUT', 30))
+    return entries
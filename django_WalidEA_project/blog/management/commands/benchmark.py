@@ -0,0 +1,49 @@
+import inspect
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from blog.benchmarks import SCENARIOS, benchmark_database, compare_to_baseline
+
+
+class Command(BaseCommand):
+    help = "Lance un scénario de benchmark sur une base temporaire et affiche les résultats en JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS), help="Scénario à exécuter")
+        parser.add_argument('--threads', type=int, help="Nombre de threads en parallèle")
+        parser.add_argument('--writes', type=int, help="Nombre d'écritures par thread")
+        parser.add_argument('--size', type=int, help="Largeur et hauteur de la toile")
+        parser.add_argument('--subscribers', type=int, help="Nombre de connexions en direct inactives")
+        parser.add_argument('--painters', type=int, help="Nombre d'utilisateurs modifiant des pixels")
+        parser.add_argument('--viewers', type=int, help="Nombre d'utilisateurs rechargeant la toile")
+        parser.add_argument('--requests', type=int, help="Nombre de requêtes par utilisateur")
+        parser.add_argument('--edits', type=int, help="Taille de l'historique synthétique de la toile")
+        parser.add_argument('--output', help="Fichier dans lequel écrire les résultats JSON")
+        parser.add_argument('--baseline', help="Résultats JSON précédents auxquels comparer ce benchmark")
+
+    def handle(self, *args, **options):
+        func = SCENARIOS[options['scenario']]
+
+        # Ne transmettre au scénario que les options qu'il accepte et qui ont été données
+        accepted = inspect.signature(func).parameters
+        kwargs = {name: value for name, value in options.items()
+                  if name in accepted and value is not None}
+
+        # DEBUG désactivé : les requêtes SQL ne sont pas conservées en mémoire pendant la mesure
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['*']), benchmark_database():
+            try:
+                result = func(**kwargs)
+            except Exception as e:
+                raise CommandError(f"Benchmark failed: {e}") from e
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                result['baseline_comparison'] = compare_to_baseline(result, json.load(f))
+
+        output = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
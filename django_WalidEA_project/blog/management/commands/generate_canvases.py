@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from blog.benchmarks import create_synthetic_canvas, create_users
+
+
+class Command(BaseCommand):
+    help = "Crée des toiles avec un historique de modifications synthétique (données de test ou de benchmark)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--canvases', type=int, default=1, help="Nombre de toiles à créer")
+        parser.add_argument('--size', type=int, default=100, help="Largeur et hauteur des toiles")
+        parser.add_argument('--edits', type=int, default=1000, help="Nombre de modifications par toile")
+        parser.add_argument('--users', type=int, default=10, help="Nombre d'utilisateurs contributeurs")
+        parser.add_argument('--days', type=int, default=30, help="Période couverte par l'historique (en jours)")
+
+    def handle(self, *args, **options):
+        users = create_users(options['users'], prefix='synthetic')
+        for i in range(options['canvases']):
+            canvas = create_synthetic_canvas(users, options['size'], options['size'], options['edits'],
+                                             days=options['days'], seed=i, title=f"Synthetic {i + 1}")
+            self.stdout.write(f"Canvas {canvas.pk} created with {options['edits']} edits.")
+        self.stdout.write(self.style.SUCCESS(f"{options['canvases']} synthetic canvases created."))
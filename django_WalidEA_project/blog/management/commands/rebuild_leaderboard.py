@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import ContributorTotal, HourlyContribution
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les compteurs du classement général à partir de l'historique des pixels."
+
+    def handle(self, *args, **options):
+        created = ContributorTotal.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{created} contributor totals rebuilt."))
+        created = HourlyContribution.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{created} hourly contribution counters rebuilt."))
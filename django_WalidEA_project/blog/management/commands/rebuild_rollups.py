@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Contribution, DailyContribution
+
+
+class Command(BaseCommand):
+    help = ("Reconstruit les compteurs de contributions journalières et les résumés des contributions "
+            "par utilisateur à partir de l'historique des pixels.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--canvas', type=int, action='append', dest='canvas_ids',
+                            help="Limiter la reconstruction à ce canvas (option répétable)")
+
+    def handle(self, *args, **options):
+        created = DailyContribution.rebuild(options['canvas_ids'])
+        self.stdout.write(self.style.SUCCESS(f"{created} daily contribution counters rebuilt."))
+        created = Contribution.rebuild(options['canvas_ids'])
+        self.stdout.write(self.style.SUCCESS(f"{created} contribution summaries rebuilt."))
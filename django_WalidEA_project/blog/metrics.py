@@ -0,0 +1,246 @@
+"""
+Mesures des requêtes HTTP (latence, requêtes SQL, taille des réponses) par nom d'URL.
+
+RequestMetricsMiddleware enregistre chaque requête dans le registre du processus :
+quelques additions sous un verrou, sans accès au cache ni à la base, pour rester
+négligeable même sur le polling de get_canvas_data. Les requêtes SQL sont comptées avec
+connection.execute_wrapper (vues synchrones uniquement : les vues asynchrones exécutent
+leurs requêtes dans d'autres threads). Les requêtes plus lentes que
+METRICS_SLOW_REQUEST_THRESHOLD secondes sont conservées dans une liste tournante.
+
+Les valeurs sont propres à chaque processus : Prometheus agrège les workers lors du scraping.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+# Limites (incluses) des intervalles des histogrammes
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Histogramme à intervalles fixes (nombre d'observations par intervalle, somme et total)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Une case par limite, plus une pour les valeurs au-delà de la dernière (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Retourne [(limite, nombre d'observations <= limite), ...] avec '+Inf' en dernier."""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class ViewMetrics:
+    """Mesures cumulées des requêtes d'un nom d'URL."""
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        # (méthode, code HTTP) -> nombre de requêtes
+        self.responses = {}
+        self.queries = 0
+        self.query_time = 0.0
+
+
+class RequestMetrics:
+    """Registre des mesures de requêtes d'un processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._slow = deque(maxlen=getattr(settings, 'METRICS_SLOW_REQUESTS', 50))
+
+    def record(self, request, view, status, duration, size=None, queries=None, query_time=0.0):
+        """Enregistre une requête terminée (size et queries valent None s'ils sont inconnus)."""
+        slow = duration >= getattr(settings, 'METRICS_SLOW_REQUEST_THRESHOLD', 0.5)
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = ViewMetrics()
+            metrics.duration.observe(duration)
+            key = (request.method, status)
+            metrics.responses[key] = metrics.responses.get(key, 0) + 1
+            if size is not None:
+                metrics.response_size.observe(size)
+            if queries is not None:
+                metrics.queries += queries
+                metrics.query_time += query_time
+        if slow:
+            # deque.append est atomique ; le chemin n'est construit que pour les requêtes lentes
+            self._slow.append({
+                'timestamp': timezone.now(),
+                'view': view,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': status,
+                'duration_ms': round(duration * 1000, 1),
+                'queries': queries,
+                'query_time_ms': round(query_time * 1000, 1) if queries is not None else None,
+                'size': size,
+            })
+
+    def slowest(self):
+        """Retourne les dernières requêtes lentes, de la plus lente à la plus rapide."""
+        return sorted(list(self._slow), key=lambda entry: entry['duration_ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+            self._slow.clear()
+
+    def render(self):
+        """Retourne les mesures au format texte de Prometheus (lignes sans retour final)."""
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                '# HELP http_requests_total Number of responses by URL name, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for view, metrics in views:
+                for (method, status), count in sorted(metrics.responses.items()):
+                    lines.append(f'http_requests_total{format_labels(view=view, method=method, status=status)} {count}')
+
+            lines += [
+                '# HELP http_request_duration_seconds Request latency by URL name.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for view, metrics in views:
+                lines += format_histogram('http_request_duration_seconds', metrics.duration, view=view)
+
+            lines += [
+                '# HELP http_response_size_bytes Response body size by URL name.',
+                '# TYPE http_response_size_bytes histogram',
+            ]
+            for view, metrics in views:
+                if metrics.response_size.count:
+                    lines += format_histogram('http_response_size_bytes', metrics.response_size, view=view)
+
+            lines += [
+                '# HELP http_db_queries_total Database queries executed by URL name.',
+                '# TYPE http_db_queries_total counter',
+            ]
+            for view, metrics in views:
+                lines.append(f'http_db_queries_total{format_labels(view=view)} {metrics.queries}')
+
+            lines += [
+                '# HELP http_db_query_duration_seconds_total Time spent in database queries by URL name.',
+                '# TYPE http_db_query_duration_seconds_total counter',
+            ]
+            for view, metrics in views:
+                lines.append(f'http_db_query_duration_seconds_total{format_labels(view=view)} {metrics.query_time}')
+        return lines
+
+
+def escape_label(value):
+    """Échappe une valeur d'étiquette Prometheus (barres obliques inverses, guillemets, retours à la ligne)."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(**labels):
+    """Formate des étiquettes Prometheus : {nom="valeur",...}."""
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+def format_histogram(name, histogram, **labels):
+    """Lignes Prometheus d'un histogramme : intervalles cumulés, somme et total."""
+    lines = [
+        f'{name}_bucket{format_labels(**labels, le=bound)} {count}'
+        for bound, count in histogram.cumulative()
+    ]
+    lines.append(f'{name}_sum{format_labels(**labels)} {histogram.sum}')
+    lines.append(f'{name}_count{format_labels(**labels)} {histogram.count}')
+    return lines
+
+
+def format_counters(name, help_text, label, values, metric_type='counter'):
+    """Lignes Prometheus d'un ensemble de compteurs ({valeur d'étiquette: nombre})."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    lines += [f'{name}{format_labels(**{label: key})} {value}' for key, value in values.items()]
+    return lines
+
+
+def get_view_name(request):
+    """Nom de l'URL de la requête (les URL inconnues sont regroupées pour limiter les séries)."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or '<unnamed>'
+
+
+def get_response_size(response):
+    """Taille du corps de la réponse, ou None pour une réponse en flux de taille inconnue."""
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+_registry = RequestMetrics()
+
+
+def get_request_metrics():
+    """Retourne le registre des mesures du processus."""
+    return _registry
+
+
+class RequestMetricsMiddleware:
+    """Mesure la latence, les requêtes SQL et la taille de la réponse de chaque requête."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        # [nombre de requêtes, durée totale], mis à jour par le wrapper de la connexion
+        queries = [0, 0.0]
+
+        def count_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        _registry.record(request, get_view_name(request), response.status_code, duration,
+                         get_response_size(response), queries[0], queries[1])
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        duration = time.perf_counter() - start
+        _registry.record(request, get_view_name(request), response.status_code, duration,
+                         get_response_size(response))
+        return response
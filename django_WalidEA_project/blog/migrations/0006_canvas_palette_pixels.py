@@ -0,0 +1,86 @@
+import re
+
+from django.db import migrations, models
+
+# Copie figée du format de l'époque : la migration ne doit pas dépendre du code courant de l'application
+DEFAULT_COLOR = "#FFFFFF"
+MAX_PALETTE_SIZE = 256
+COLOR_RE = re.compile(r"#[0-9A-Fa-f]{6}")
+
+
+def hex_to_rgb(color):
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def matrix_to_pixels(matrix, width, height):
+    """
+    Convertit une matrice de couleurs "#RRGGBB" en (palette, un octet par pixel), ligne par ligne.
+    Les cellules manquantes ou invalides prennent la couleur de fond (index 0) ; au-delà de
+    MAX_PALETTE_SIZE couleurs, la couleur la plus proche déjà présente est utilisée.
+    """
+    palette = [DEFAULT_COLOR]
+    index = {DEFAULT_COLOR: 0}
+    data = bytearray(width * height)
+    for y, row in enumerate(matrix[:height]):
+        for x, color in enumerate(row[:width]):
+            if not isinstance(color, str) or not COLOR_RE.fullmatch(color):
+                continue
+            color = color.upper()
+            i = index.get(color)
+            if i is None:
+                if len(palette) < MAX_PALETTE_SIZE:
+                    i = index[color] = len(palette)
+                    palette.append(color)
+                else:
+                    r, g, b = hex_to_rgb(color)
+                    i = min(range(len(palette)), key=lambda j: sum(
+                        (p - c) ** 2 for p, c in zip(hex_to_rgb(palette[j]), (r, g, b))))
+            data[y * width + x] = i
+    return palette, bytes(data)
+
+
+def content_to_pixels(apps, schema_editor):
+    """Convertit la matrice JSON de chaque toile en palette + un octet par pixel."""
+    Canvas = apps.get_model('blog', 'Canvas')
+    for canvas in Canvas.objects.all().iterator():
+        canvas.palette, canvas.pixels = matrix_to_pixels(canvas.content or [], canvas.width, canvas.height)
+        canvas.save(update_fields=['palette', 'pixels'])
+
+
+def pixels_to_content(apps, schema_editor):
+    """Reconstruit la matrice JSON à partir de la palette et des pixels."""
+    Canvas = apps.get_model('blog', 'Canvas')
+    for canvas in Canvas.objects.all().iterator():
+        width, height = canvas.width, canvas.height
+        pixels = bytes(canvas.pixels)
+        if len(pixels) == width * height:
+            palette = canvas.palette
+            canvas.content = [[palette[i] for i in pixels[y * width:(y + 1) * width]] for y in range(height)]
+        else:
+            canvas.content = [[DEFAULT_COLOR] * width for _ in range(height)]
+        canvas.save(update_fields=['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_canvas_contributions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='canvas',
+            name='palette',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='canvas',
+            name='pixels',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(content_to_pixels, pixels_to_content),
+        migrations.RemoveField(
+            model_name='canvas',
+            name='content',
+        ),
+    ]
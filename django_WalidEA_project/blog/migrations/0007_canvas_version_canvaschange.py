@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_canvas_palette_pixels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='canvas',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CanvasChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveIntegerField()),
+                ('version', models.PositiveIntegerField()),
+                ('pixels', models.JSONField(default=list)),
+                ('canvas', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='blog.canvas')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('canvas', 'slot'), name='unique_canvas_change_slot')],
+            },
+        ),
+    ]
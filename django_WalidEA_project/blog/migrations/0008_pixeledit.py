@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:37
+
+import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def contributions_to_edits(apps, schema_editor):
+    """Crée une ligne PixelEdit pour chaque timestamp de l'ancien champ JSON `contributions`."""
+    Canvas = apps.get_model('blog', 'Canvas')
+    PixelEdit = apps.get_model('blog', 'PixelEdit')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    user_ids = set(User.objects.values_list('id', flat=True))
+    for canvas in Canvas.objects.only('id', 'contributions').iterator():
+        edits = [
+            PixelEdit(
+                canvas_id=canvas.id,
+                user_id=int(user_id),
+                timestamp=datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc),
+            )
+            for user_id, timestamps in (canvas.contributions or {}).items()
+            if int(user_id) in user_ids
+            for timestamp in timestamps
+        ]
+        PixelEdit.objects.bulk_create(edits, batch_size=1000)
+
+
+def edits_to_contributions(apps, schema_editor):
+    """Reconstruit le champ JSON `contributions` à partir des PixelEdit."""
+    Canvas = apps.get_model('blog', 'Canvas')
+    PixelEdit = apps.get_model('blog', 'PixelEdit')
+    contributions = {}
+    for canvas_id, user_id, timestamp in PixelEdit.objects.order_by('timestamp').values_list('canvas_id', 'user_id', 'timestamp'):
+        contributions.setdefault(canvas_id, {}).setdefault(str(user_id), []).append(timestamp.timestamp())
+    for canvas_id, value in contributions.items():
+        Canvas.objects.filter(pk=canvas_id).update(contributions=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_canvas_version_canvaschange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PixelEdit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('x', models.PositiveIntegerField(null=True)),
+                ('y', models.PositiveIntegerField(null=True)),
+                ('color', models.CharField(blank=True, max_length=7)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('canvas', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='edits', to='blog.canvas')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pixel_edits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['canvas', 'timestamp'], name='pixeledit_canvas_time_idx'), models.Index(fields=['user', 'canvas'], name='pixeledit_user_canvas_idx')],
+            },
+        ),
+        migrations.RunPython(contributions_to_edits, edits_to_contributions),
+        migrations.RemoveField(
+            model_name='canvas',
+            name='contributions',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_pixeledit'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='canvas',
+            name='last_edit_timestamps',
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def count_edits(apps, schema_editor):
+    """Initialise edit_count et last_edit_at à partir des PixelEdit existants."""
+    Canvas = apps.get_model('blog', 'Canvas')
+    PixelEdit = apps.get_model('blog', 'PixelEdit')
+    totals = PixelEdit.objects.values('canvas_id').annotate(count=Count('id'), last=Max('timestamp'))
+    for row in totals:
+        Canvas.objects.filter(pk=row['canvas_id']).update(edit_count=row['count'], last_edit_at=row['last'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_remove_canvas_last_edit_timestamps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='canvas',
+            name='edit_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='canvas',
+            name='last_edit_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(count_edits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='canvas',
+            index=models.Index(fields=['-edit_count', '-id'], name='canvas_edit_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='canvas',
+            index=models.Index(fields=['-last_edit_at'], name='canvas_last_edit_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def build_daily_contributions(apps, schema_editor):
+    """Calcule les compteurs journaliers à partir des PixelEdit existants."""
+    PixelEdit = apps.get_model('blog', 'PixelEdit')
+    DailyContribution = apps.get_model('blog', 'DailyContribution')
+    rows = (
+        PixelEdit.objects.annotate(day=TruncDate('timestamp'))
+        .values('canvas_id', 'user_id', 'day')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    DailyContribution.objects.bulk_create((DailyContribution(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_canvas_edit_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('canvas', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_contributions', to='blog.canvas')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_contributions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('canvas', 'user', 'day'), name='unique_daily_contribution')],
+            },
+        ),
+        migrations.RunPython(build_daily_contributions, migrations.RunPython.noop),
+    ]
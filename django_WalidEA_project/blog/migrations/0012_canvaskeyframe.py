@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def create_baseline_keyframes(apps, schema_editor):
+    """
+    Crée une image clé de l'état actuel de chaque toile : l'historique antérieur
+    (sans coordonnées) ne permet pas de reconstruire les états précédents.
+    """
+    Canvas = apps.get_model('blog', 'Canvas')
+    CanvasKeyframe = apps.get_model('blog', 'CanvasKeyframe')
+    for canvas in Canvas.objects.iterator():
+        last = canvas.edits.aggregate(edit_id=Max('id'), timestamp=Max('timestamp'))
+        CanvasKeyframe.objects.create(
+            canvas=canvas,
+            edit_id=last['edit_id'] or 0,
+            timestamp=last['timestamp'] or canvas.date_posted,
+            palette=canvas.palette,
+            pixels=canvas.pixels,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_dailycontribution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CanvasKeyframe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('edit_id', models.BigIntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('palette', models.JSONField(default=list)),
+                ('pixels', models.BinaryField()),
+                ('canvas', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keyframes', to='blog.canvas')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['canvas', 'edit_id'], name='keyframe_canvas_edit_idx')],
+            },
+        ),
+        migrations.RunPython(create_baseline_keyframes, migrations.RunPython.noop),
+    ]
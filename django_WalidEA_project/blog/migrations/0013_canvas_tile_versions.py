@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:56
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_canvaskeyframe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='canvas',
+            name='tile_versions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='canvas',
+            name='height',
+            field=models.PositiveIntegerField(default=25, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(2000)]),
+        ),
+        migrations.AlterField(
+            model_name='canvas',
+            name='width',
+            field=models.PositiveIntegerField(default=25, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(2000)]),
+        ),
+    ]
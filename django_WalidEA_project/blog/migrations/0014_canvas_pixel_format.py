@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_canvas_tile_versions'),
+    ]
+
+    operations = [
+        # Les toiles existantes sont stockées au format dense ; les nouvelles seront creuses
+        migrations.AddField(
+            model_name='canvas',
+            name='pixel_format',
+            field=models.CharField(choices=[('dense', 'Dense'), ('sparse', 'Sparse')], default='dense', max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='canvas',
+            name='pixel_format',
+            field=models.CharField(choices=[('dense', 'Dense'), ('sparse', 'Sparse')], default='sparse', max_length=6),
+        ),
+    ]
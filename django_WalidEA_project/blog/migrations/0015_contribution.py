@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def build_contributions(apps, schema_editor):
+    """Calcule les résumés des contributions à partir des PixelEdit existants."""
+    PixelEdit = apps.get_model('blog', 'PixelEdit')
+    Contribution = apps.get_model('blog', 'Contribution')
+    rows = (
+        PixelEdit.objects.values('canvas_id', 'user_id')
+        .annotate(count=Count('id'), first_edit_at=Min('timestamp'), last_edit_at=Max('timestamp'))
+        .order_by()
+    )
+    Contribution.objects.bulk_create((Contribution(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_canvas_pixel_format'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('first_edit_at', models.DateTimeField()),
+                ('last_edit_at', models.DateTimeField()),
+                ('canvas', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='blog.canvas')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-count'], name='contribution_user_count_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'canvas'), name='unique_contribution')],
+            },
+        ),
+        migrations.RunPython(build_contributions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def build_leaderboard(apps, schema_editor):
+    """Calcule les totaux par utilisateur et les compteurs horaires des 7 derniers jours."""
+    PixelEdit = apps.get_model('blog', 'PixelEdit')
+    ContributorTotal = apps.get_model('blog', 'ContributorTotal')
+    HourlyContribution = apps.get_model('blog', 'HourlyContribution')
+    totals = (
+        PixelEdit.objects.values('user_id')
+        .annotate(count=Count('id'), last_edit_at=Max('timestamp'))
+        .order_by()
+    )
+    ContributorTotal.objects.bulk_create((ContributorTotal(**row) for row in totals.iterator()), batch_size=1000)
+    hourly = (
+        PixelEdit.objects.filter(timestamp__gte=timezone.now() - timedelta(days=7, hours=1))
+        .annotate(hour=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+        .values('user_id', 'hour')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    HourlyContribution.objects.bulk_create((HourlyContribution(**row) for row in hourly.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_contribution'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributorTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_edit_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='contributor_total', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-count'], name='contributor_total_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_contributions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='hourly_contribution_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'hour'), name='unique_hourly_contribution')],
+            },
+        ),
+        migrations.RunPython(build_leaderboard, migrations.RunPython.noop),
+    ]
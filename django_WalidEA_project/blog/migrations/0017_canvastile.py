@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:02
+
+import struct
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copie figée des formats de l'époque : la migration ne doit pas dépendre du code courant de l'application
+TILE_SIZE = 64
+SPARSE_RECORD = struct.Struct('>IB')
+
+
+def decode_pixels(canvas):
+    """Retourne les octets denses (un octet par pixel) d'une toile au format "dense" ou "sparse"."""
+    size = canvas.width * canvas.height
+    pixels = bytes(canvas.pixels)
+    if canvas.pixel_format == 'sparse':
+        data = bytearray(size)
+        for position, index in SPARSE_RECORD.iter_unpack(pixels):
+            if position < size:
+                data[position] = index
+        return bytes(data)
+    if len(pixels) == size:
+        return pixels
+    # Toile jamais initialisée : fond blanc
+    return bytes(size)
+
+
+def pixels_to_tiles(apps, schema_editor):
+    """Découpe les pixels de chaque toile en tuiles ; les tuiles entièrement de la couleur de fond sont omises."""
+    Canvas = apps.get_model('blog', 'Canvas')
+    CanvasTile = apps.get_model('blog', 'CanvasTile')
+    for canvas in Canvas.objects.all().iterator():
+        width, height = canvas.width, canvas.height
+        data = decode_pixels(canvas)
+        columns, rows = -(-width // TILE_SIZE), -(-height // TILE_SIZE)
+        versions = canvas.tile_versions if len(canvas.tile_versions) == columns * rows else None
+        tiles = []
+        for ty in range(rows):
+            for tx in range(columns):
+                x0, y0 = tx * TILE_SIZE, ty * TILE_SIZE
+                w, h = min(TILE_SIZE, width - x0), min(TILE_SIZE, height - y0)
+                tile = b''.join(data[(y0 + row) * width + x0:(y0 + row) * width + x0 + w] for row in range(h))
+                if tile.count(0) == len(tile):
+                    continue
+                version = versions[ty * columns + tx] if versions else canvas.version
+                tiles.append(CanvasTile(canvas=canvas, tx=tx, ty=ty, version=version, pixels=tile))
+        CanvasTile.objects.bulk_create(tiles, batch_size=500)
+
+
+def tiles_to_pixels(apps, schema_editor):
+    """Reconstruit les pixels denses et les versions des tuiles de chaque toile."""
+    Canvas = apps.get_model('blog', 'Canvas')
+    for canvas in Canvas.objects.all().iterator():
+        width, height = canvas.width, canvas.height
+        columns, rows = -(-width // TILE_SIZE), -(-height // TILE_SIZE)
+        data = bytearray(width * height)
+        versions = [0] * (columns * rows)
+        for tile in canvas.tiles.all():
+            x0, y0 = tile.tx * TILE_SIZE, tile.ty * TILE_SIZE
+            w, h = min(TILE_SIZE, width - x0), min(TILE_SIZE, height - y0)
+            pixels = bytes(tile.pixels)
+            for row in range(h):
+                start = (y0 + row) * width + x0
+                data[start:start + w] = pixels[row * w:(row + 1) * w]
+            versions[tile.ty * columns + tile.tx] = tile.version
+        canvas.pixels = bytes(data)
+        canvas.pixel_format = 'dense'
+        canvas.tile_versions = versions
+        canvas.save(update_fields=['pixels', 'pixel_format', 'tile_versions'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_leaderboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CanvasTile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tx', models.PositiveIntegerField()),
+                ('ty', models.PositiveIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('pixels', models.BinaryField()),
+                ('canvas', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiles', to='blog.canvas')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('canvas', 'ty', 'tx'), name='unique_canvas_tile')],
+            },
+        ),
+        migrations.RunPython(pixels_to_tiles, tiles_to_pixels),
+        migrations.RemoveField(
+            model_name='canvas',
+            name='pixels',
+        ),
+        migrations.RemoveField(
+            model_name='canvas',
+            name='pixel_format',
+        ),
+        migrations.RemoveField(
+            model_name='canvas',
+            name='tile_versions',
+        ),
+    ]
@@ -1,19 +1,43 @@
-from django.db import models
+from datetime import timedelta, timezone as dt_timezone
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncHour
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.urls import reverse
-import json
+from .broadcast import publish_change
+from .pixels import PixelBuffer
+from .ratelimit import get_cooldown_policy, get_rate_limiter
+from .tiles import TILE_SIZE, TiledPixelBuffer
+
+# Nombre maximal de tentatives d'une écriture de pixel en cas d'écritures concurrentes
+WRITE_ATTEMPTS = 20
+
+# Taille maximale (en pixels) d'un côté d'une toile
+MAX_CANVAS_SIZE = 2000
+
+# Champs d'une toile modifiés par les écritures de pixels (les pixels eux-mêmes sont dans CanvasTile)
+PIXEL_FIELDS = ['width', 'height', 'palette', 'version', 'edit_count', 'last_edit_at']
+
+
+class CanvasWriteConflict(Exception):
+    """Levée lorsqu'une écriture n'a pas pu être appliquée après WRITE_ATTEMPTS tentatives."""
 
 class Canvas(models.Model):
     # Le titre de la toile
     title = models.CharField(max_length=100)
 
     # Dimensions de la toile (largeur et hauteur)
-    width = models.PositiveIntegerField(default=25)
-    height = models.PositiveIntegerField(default=25)
+    width = models.PositiveIntegerField(default=25, validators=[MinValueValidator(1), MaxValueValidator(MAX_CANVAS_SIZE)])
+    height = models.PositiveIntegerField(default=25, validators=[MinValueValidator(1), MaxValueValidator(MAX_CANVAS_SIZE)])
 
-    # Contenu de la toile, stocké sous forme de matrice JSON
-    content = models.JSONField(default=list)
+    # Palette de couleurs de la toile ("#RRGGBB"), au maximum 256 entrées ; les pixels sont
+    # stockés par tuiles (CanvasTile), un octet par pixel (index dans cette palette)
+    palette = models.JSONField(default=list)
 
     # Date de publication de la toile
     date_posted = models.DateTimeField(default=timezone.now)
@@ -24,11 +48,19 @@ class Canvas(models.Model):
     # Référence à l'utilisateur qui a créé cette toile
     author = models.ForeignKey(User, on_delete=models.CASCADE)
 
-    # Dictionnaire des timestamps de la dernière modification par chaque utilisateur
-    last_edit_timestamps = models.JSONField(default=dict)
+    # Version de la toile, incrémentée à chaque modification de pixels
+    version = models.PositiveIntegerField(default=0)
+
+    # Nombre total de modifications et date de la dernière, maintenus à chaque écriture
+    # (évite de compter les PixelEdit pour trier la liste des toiles)
+    edit_count = models.PositiveIntegerField(default=0)
+    last_edit_at = models.DateTimeField(null=True, blank=True)
 
-    # Dictionnaire des contributions par chaque utilisateur
-    contributions = models.JSONField(default=dict)
+    class Meta:
+        indexes = [
+            models.Index(fields=['-edit_count', '-id'], name='canvas_edit_count_idx'),
+            models.Index(fields=['-last_edit_at'], name='canvas_last_edit_idx'),
+        ]
 
     def __str__(self):
         """Retourne le titre de la toile"""
@@ -38,83 +70,595 @@ class Canvas(models.Model):
         """Retourne l'URL de la page de détail de la toile"""
         return reverse('canvas-detail', kwargs={'pk': self.pk})
 
+    def get_pixel_buffer(self):
+        """
+        Retourne le tampon de pixels (palette + tuiles, voir tiles.TiledPixelBuffer) de la toile.
+        Le tampon est construit une seule fois puis réutilisé pour cette instance.
+        """
+        buffer = getattr(self, '_pixel_buffer', None)
+        if buffer is None:
+            buffer = self.get_tiles()
+            self._pixel_buffer = buffer
+        return buffer
+
+    def get_tiles(self, keys=None):
+        """
+        Retourne un tampon de pixels avec les tuiles enregistrées de la toile, ou seulement
+        celles de la liste `keys` [(tx, ty), ...] : les autres y sont alors considérées vides.
+        La palette de l'instance a été lue avant les tuiles : si une écriture validée entre-temps y a
+        ajouté des couleurs, elle est relue (la palette ne fait que grandir, la relire suffit).
+        """
+        tiles = self.tiles.all()
+        if keys is not None:
+            keys = set(keys)
+            tiles = tiles.filter(tx__in={tx for tx, _ in keys}, ty__in={ty for _, ty in keys})
+        tiles = {
+            (tx, ty): pixels for tx, ty, pixels in tiles.values_list('tx', 'ty', 'pixels')
+            if keys is None or (tx, ty) in keys
+        }
+        palette = self.palette
+        if any(max(pixels, default=0) >= len(palette) for pixels in tiles.values()):
+            palette = Canvas.objects.values_list('palette', flat=True).get(pk=self.pk)
+        return TiledPixelBuffer(self.width, self.height, palette, tiles)
+
+    def save_pixel_buffer(self, buffer):
+        """
+        Remplace tous les pixels de la toile par ceux du tampon (palette et tuiles), sans changer
+        sa version : réservé à l'initialisation et aux outils (benchmarks, rechargement complet).
+        """
+        if not isinstance(buffer, TiledPixelBuffer):
+            buffer = TiledPixelBuffer.from_buffer(buffer)
+        with transaction.atomic():
+            self.tiles.all().delete()
+            CanvasTile.objects.bulk_create([
+                CanvasTile(canvas_id=self.pk, tx=tx, ty=ty, version=self.version, pixels=bytes(tile))
+                for (tx, ty), tile in buffer.tiles.items()
+            ], batch_size=500)
+            self.palette = buffer.palette
+            Canvas.objects.filter(pk=self.pk).update(palette=self.palette)
+        buffer.modified.clear()
+        self._pixel_buffer = buffer
+
+    def get_content(self):
+        """Retourne le contenu de la toile sous forme de matrice de couleurs "#RRGGBB"."""
+        return self.get_pixel_buffer().to_matrix()
+
     def initialize_canvas(self):
         """
-        Initialise la toile avec une matrice de pixels blancs.
-        Cette méthode est appelée lors de la création de la toile pour la remplir initialement de pixels blancs.
+        Réinitialise la toile avec des pixels blancs (aucune tuile n'est stockée).
+        Une nouvelle toile n'a pas besoin d'être initialisée : elle est blanche par défaut.
         """
-        self.content = [["#FFFFFF" for _ in range(self.width)] for _ in range(self.height)]
-        self.save()
+        self.save_pixel_buffer(TiledPixelBuffer.blank(self.width, self.height))
 
     def update_pixel(self, x, y, color, user):
         """
         Met à jour la couleur d'un pixel à une position spécifique (x, y) pour un utilisateur donné.
         Avant la mise à jour, vérifie si l'utilisateur respecte l'intervalle de temps autorisé entre les modifications.
         """
-        if not self.can_user_edit(user):
+        limiter = get_rate_limiter()
+        interval, _ = get_cooldown_policy(user, self.author_id, self.pixel_edit_interval)
+        allowed, _ = limiter.acquire(self.pk, user.id, interval)
+        if not allowed:
             return False  # Retourne False si l'utilisateur ne respecte pas l'intervalle de modification
 
-        if 0 <= x < self.width and 0 <= y < self.height:
-            # Mise à jour de la couleur du pixel
-            self.content[y][x] = color
+        try:
+            success = self.write_pixel(x, y, color, user)
+        except Exception:
+            limiter.release(self.pk, user.id)
+            raise
+        if not success:
+            # Coordonnées invalides : l'intervalle de modification n'est pas consommé
+            limiter.release(self.pk, user.id)
+        return success
 
-            # Enregistrement du timestamp de la dernière modification de cet utilisateur
-            self.last_edit_timestamps[str(user.id)] = timezone.now().timestamp()
+    def write_pixel(self, x, y, color, user):
+        """
+        Applique atomiquement la modification d'un pixel, sans vérifier l'intervalle de modification.
+        Retourne False si les coordonnées sont invalides (voir write_pixels).
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False  # Retourne False si les coordonnées sont invalides
+        self.write_pixels([(x, y, color)], user)
+        return True  # Retourne True si la mise à jour a été réussie
 
-            # Enregistrement de la contribution de cet utilisateur
-            timestamp = timezone.now().timestamp()
-            if str(user.id) in self.contributions:
-                self.contributions[str(user.id)].append(timestamp)
-            else:
-                self.contributions[str(user.id)] = [timestamp]
+    def write_pixels(self, pixels, user):
+        """
+        Applique un lot de modifications (voir apply_pixels). Avec CANVAS_SINGLE_WRITER, le lot est
+        confié au thread d'écriture unique du processus (voir writer.PixelWriter) et cette méthode
+        attend qu'il soit validé ; hors d'une transaction seulement, le thread d'écriture ne pouvant
+        pas voir les données non validées de l'appelant.
+        Retourne les couleurs réellement stockées, dans l'ordre du lot.
+        """
+        if getattr(settings, 'CANVAS_SINGLE_WRITER', False) and not transaction.get_connection().in_atomic_block:
+            from .writer import get_pixel_writer
+
+            stored_colors, fields = get_pixel_writer().write(self.pk, pixels, user)
+            # L'instance reprend l'état de la toile après l'écriture
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._pixel_buffer = None
+            return stored_colors
+        return self.apply_pixels(pixels, user)
+
+    def apply_pixels(self, pixels, user):
+        """
+        Applique atomiquement un lot de modifications [(x, y, couleur), ...] déjà validées
+        (voir pixels.validate_pixels) : une seule version, une seule entrée du journal des
+        changements et une seule transaction, quelle que soit la taille du lot.
+        L'écriture est conditionnée à la version lue (UPDATE ... WHERE version = v) : si un autre
+        écrivain est passé entre-temps, l'état est rechargé et le lot est rejoué, aucune écriture
+        concurrente n'est donc perdue. Seules les tuiles contenant les pixels du lot sont lues et
+        réécrites (la palette seulement si elle a changé) : le coût d'une écriture dépend de la
+        taille du lot, pas de celle de la toile.
+        Retourne les couleurs réellement stockées, dans l'ordre du lot.
+        """
+        keys = {(x // TILE_SIZE, y // TILE_SIZE) for x, y, _ in pixels}
+        for _ in range(WRITE_ATTEMPTS):
+            buffer = self.get_tiles(keys)
+            stored = set(buffer.tiles)
 
-            self.save()
-            return True  # Retourne True si la mise à jour a été réussie
-        return False  # Retourne False si les coordonnées sont invalides
+            # Mise à jour de la couleur des pixels (un seul octet de leur tuile par pixel)
+            changes = [[x, y, buffer.set(x, y, color)] for x, y, color in pixels]
+            fields = {}
+            if buffer.palette != self.palette:
+                fields['palette'] = buffer.palette
+
+            now = timezone.now()
+
+            with transaction.atomic():
+                updated = Canvas.objects.filter(pk=self.pk, version=self.version).update(
+                    version=models.F('version') + 1,
+                    edit_count=models.F('edit_count') + len(changes),
+                    last_edit_at=now,
+                    **fields,
+                )
+                if updated:
+                    self.version += 1
+                    self.palette = buffer.palette
+                    self.edit_count += len(changes)
+                    self.last_edit_at = now
+                    # Les tuiles modifiées prennent la nouvelle version de la toile
+                    for tx, ty in buffer.modified & stored:
+                        CanvasTile.objects.filter(canvas_id=self.pk, tx=tx, ty=ty).update(
+                            pixels=bytes(buffer.tiles[tx, ty]), version=self.version,
+                        )
+                    CanvasTile.objects.bulk_create([
+                        CanvasTile(canvas_id=self.pk, tx=tx, ty=ty, version=self.version,
+                                   pixels=bytes(buffer.tiles[tx, ty]))
+                        for tx, ty in buffer.modified - stored
+                    ])
+                    self._pixel_buffer = None
+                    # Ajout des modifications dans le journal des changements
+                    CanvasChange.record(self.pk, self.version, changes)
+                    # Diffusion aux clients abonnés une fois l'écriture validée
+                    transaction.on_commit(partial(publish_change, self.pk, self.version, changes))
+                    # Enregistrement des contributions de cet utilisateur (un seul INSERT groupé)
+                    edits = PixelEdit.objects.bulk_create([
+                        PixelEdit(canvas_id=self.pk, user=user, x=x, y=y, color=stored_color, timestamp=now)
+                        for x, y, stored_color in changes
+                    ])
+                    DailyContribution.increment(self.pk, user.id, timezone.localdate(now), len(changes))
+                    Contribution.increment(self.pk, user.id, now, len(changes))
+                    # Classement général (total et compteur de l'heure, toutes toiles confondues)
+                    ContributorTotal.increment(user.id, now, len(changes))
+                    HourlyContribution.increment(user.id, now, len(changes))
+                    # Image clé périodique pour pouvoir rejouer l'historique (time-lapse)
+                    interval = get_keyframe_interval()
+                    if self.edit_count // interval > (self.edit_count - len(changes)) // interval:
+                        # Toutes les bases ne retournent pas les identifiants des insertions groupées
+                        edit_id = edits[-1].pk or self.edits.aggregate(Max('id'))['id__max']
+                        # Les images clés sont au format dense : toutes les tuiles sont lues, une fois par intervalle
+                        keyframe = self.get_tiles()
+                        CanvasKeyframe.objects.create(canvas_id=self.pk, edit_id=edit_id, timestamp=now,
+                                                      palette=keyframe.palette, pixels=keyframe.to_bytes())
+                    return [stored_color for _, _, stored_color in changes]
+
+            # Un autre écrivain a modifié la toile depuis notre lecture : recharger et réessayer
+            self.reload_pixels()
+        raise CanvasWriteConflict(f"Canvas {self.pk} is too busy, please retry")
+
+    def reload_pixels(self):
+        """Recharge depuis la base les champs modifiés par les écritures de pixels."""
+        self.refresh_from_db(fields=PIXEL_FIELDS)
+        self._pixel_buffer = None
 
     def can_user_edit(self, user):
         """
         Vérifie si un utilisateur peut modifier la toile en fonction de l'intervalle de temps entre les modifications.
         """
-        last_edit_time = self.last_edit_timestamps.get(str(user.id))
-        if last_edit_time:
-            # Vérifie si l'utilisateur respecte l'intervalle de modification
-            elapsed_time = timezone.now().timestamp() - last_edit_time
-            return elapsed_time >= self.pixel_edit_interval
-        return True  # Si l'utilisateur n'a jamais modifié, il peut modifier
+        return get_rate_limiter().remaining(self.pk, user.id) <= 0
 
     def get_statistics(self):
         """
         Récupère les statistiques de la toile, comme le nombre de contributions quotidiennes
         et le classement des contributeurs par nombre de modifications.
+        Les comptages sont lus dans les agrégats DailyContribution : deux requêtes,
+        quel que soit le nombre de modifications ou de contributeurs.
         """
-        daily_contributions = {}
-        top_contributors = []
-
         # Comptage des contributions par jour
-        for user_id, timestamps in self.contributions.items():
-            user = User.objects.get(id=user_id)
-            for timestamp in timestamps:
-                date = timezone.datetime.fromtimestamp(timestamp).date()
-                if date not in daily_contributions:
-                    daily_contributions[date] = 0
-                daily_contributions[date] += 1
+        daily_contributions = list(
+            self.daily_contributions.values('day')
+            .annotate(count=Sum('count'))
+            .order_by('day')
+        )
 
         # Trie les contributeurs par nombre de contributions
-        top_contributors = sorted(
-            self.contributions.items(),
-            key=lambda x: len(x[1]),
-            reverse=True
+        top_contributors = (
+            self.daily_contributions.values('user__username')
+            .annotate(contributions=Sum('count'))
+            .order_by('-contributions', 'user__username')
         )
 
         # Retourne les statistiques au format attendu pour le template
         return {
             'daily_contributions': {
-                'dates': list(daily_contributions.keys()),
-                'counts': list(daily_contributions.values())
+                'dates': [row['day'] for row in daily_contributions],
+                'counts': [row['count'] for row in daily_contributions]
             },
             'top_contributors': [
-                {'username': User.objects.get(id=user_id).username, 'contributions': len(contrib)}
-                for user_id, contrib in top_contributors
+                {'username': row['user__username'], 'contributions': row['contributions']}
+                for row in top_contributors
             ]
         }
+
+
+class CanvasTile(models.Model):
+    """
+    Pixels d'une tuile de TILE_SIZE x TILE_SIZE pixels d'une toile (voir blog.tiles) : un octet
+    par pixel (index dans la palette de la toile), ligne par ligne. Une tuile jamais modifiée
+    n'a pas de ligne : elle est entièrement de la couleur de fond.
+    """
+    canvas = models.ForeignKey(Canvas, on_delete=models.CASCADE, related_name='tiles')
+
+    # Position de la tuile dans la grille (colonne, ligne)
+    tx = models.PositiveIntegerField()
+    ty = models.PositiveIntegerField()
+
+    # Version de la toile lors de la dernière modification d'un pixel de la tuile
+    version = models.PositiveIntegerField(default=0)
+
+    pixels = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['canvas', 'ty', 'tx'], name='unique_canvas_tile'),
+        ]
+
+
+class PixelEdit(models.Model):
+    """
+    Historique des modifications de pixels : une ligne est ajoutée à chaque modification.
+    Les modifications antérieures à cette table (migrées depuis l'ancien champ JSON
+    `contributions`) n'ont ni coordonnées ni couleur.
+    """
+    # Toile modifiée
+    canvas = models.ForeignKey(Canvas, on_delete=models.CASCADE, related_name='edits')
+
+    # Utilisateur ayant fait la modification
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pixel_edits')
+
+    # Position et couleur du pixel modifié
+    x = models.PositiveIntegerField(null=True)
+    y = models.PositiveIntegerField(null=True)
+    color = models.CharField(max_length=7, blank=True)
+
+    # Date de la modification
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['canvas', 'timestamp'], name='pixeledit_canvas_time_idx'),
+            models.Index(fields=['user', 'canvas'], name='pixeledit_user_canvas_idx'),
+        ]
+
+
+class DailyContribution(models.Model):
+    """
+    Nombre de modifications d'un utilisateur sur une toile pour une journée.
+    Mis à jour à chaque écriture de pixel ; peut être reconstruit à partir des
+    PixelEdit avec la commande `python manage.py rebuild_rollups`.
+    """
+    canvas = models.ForeignKey(Canvas, on_delete=models.CASCADE, related_name='daily_contributions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_contributions')
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['canvas', 'user', 'day'], name='unique_daily_contribution'),
+        ]
+
+    @classmethod
+    def increment(cls, canvas_id, user_id, day, count=1):
+        """Ajoute `count` modifications au compteur du jour (créé s'il n'existe pas encore)."""
+        counters = cls.objects.filter(canvas_id=canvas_id, user_id=user_id, day=day)
+        if counters.update(count=models.F('count') + count):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(canvas_id=canvas_id, user_id=user_id, day=day, count=count)
+        except IntegrityError:
+            # Créé entre-temps par une autre écriture
+            counters.update(count=models.F('count') + count)
+
+    @classmethod
+    def rebuild(cls, canvas_ids=None):
+        """
+        Recalcule les compteurs à partir des PixelEdit avec une seule agrégation en base
+        et une insertion groupée. Retourne le nombre de compteurs créés.
+        """
+        edits = PixelEdit.objects.all()
+        counters = cls.objects.all()
+        if canvas_ids is not None:
+            edits = edits.filter(canvas_id__in=canvas_ids)
+            counters = counters.filter(canvas_id__in=canvas_ids)
+        rows = (
+            edits.annotate(day=TruncDate('timestamp'))
+            .values('canvas_id', 'user_id', 'day')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        with transaction.atomic():
+            counters.delete()
+            created = cls.objects.bulk_create((cls(**row) for row in rows.iterator()), batch_size=1000)
+        return len(created)
+
+
+class Contribution(models.Model):
+    """
+    Résumé des modifications d'un utilisateur sur une toile : nombre total, première et
+    dernière modification. Mis à jour à chaque écriture de pixel et indexé par utilisateur :
+    la liste des toiles d'un profil est lue par une seule requête triée, sans parcourir les
+    PixelEdit. Reconstruit avec les compteurs journaliers par `python manage.py rebuild_rollups`.
+    """
+    canvas = models.ForeignKey(Canvas, on_delete=models.CASCADE, related_name='contributions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contributions')
+    count = models.PositiveIntegerField(default=0)
+    first_edit_at = models.DateTimeField()
+    last_edit_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'canvas'], name='unique_contribution'),
+        ]
+        indexes = [
+            # Liste des toiles d'un utilisateur, de la plus modifiée à la moins modifiée
+            models.Index(fields=['user', '-count'], name='contribution_user_count_idx'),
+        ]
+
+    @classmethod
+    def increment(cls, canvas_id, user_id, timestamp, count=1):
+        """Ajoute `count` modifications faites à `timestamp` au résumé (créé s'il n'existe pas encore)."""
+        summaries = cls.objects.filter(canvas_id=canvas_id, user_id=user_id)
+        if summaries.update(count=models.F('count') + count, last_edit_at=timestamp):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(canvas_id=canvas_id, user_id=user_id, count=count,
+                                   first_edit_at=timestamp, last_edit_at=timestamp)
+        except IntegrityError:
+            # Créé entre-temps par une autre écriture
+            summaries.update(count=models.F('count') + count, last_edit_at=timestamp)
+
+    @classmethod
+    def rebuild(cls, canvas_ids=None):
+        """
+        Recalcule les résumés à partir des PixelEdit avec une seule agrégation en base
+        et une insertion groupée. Retourne le nombre de résumés créés.
+        """
+        edits = PixelEdit.objects.all()
+        summaries = cls.objects.all()
+        if canvas_ids is not None:
+            edits = edits.filter(canvas_id__in=canvas_ids)
+            summaries = summaries.filter(canvas_id__in=canvas_ids)
+        rows = (
+            edits.values('canvas_id', 'user_id')
+            .annotate(count=Count('id'), first_edit_at=Min('timestamp'), last_edit_at=Max('timestamp'))
+            .order_by()
+        )
+        with transaction.atomic():
+            summaries.delete()
+            created = cls.objects.bulk_create((cls(**row) for row in rows.iterator()), batch_size=1000)
+        return len(created)
+
+
+class ContributorTotal(models.Model):
+    """
+    Nombre total de modifications d'un utilisateur, toutes toiles confondues (classement
+    général depuis le début). Mis à jour à chaque écriture de pixel et indexé par nombre
+    de modifications : les K premiers sont lus sans parcourir l'historique.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='contributor_total')
+    count = models.PositiveIntegerField(default=0)
+    last_edit_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-count'], name='contributor_total_count_idx'),
+        ]
+
+    @classmethod
+    def increment(cls, user_id, timestamp, count=1):
+        """Ajoute `count` modifications faites à `timestamp` au total de l'utilisateur."""
+        totals = cls.objects.filter(user_id=user_id)
+        if totals.update(count=models.F('count') + count, last_edit_at=timestamp):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, count=count, last_edit_at=timestamp)
+        except IntegrityError:
+            # Créé entre-temps par une autre écriture
+            totals.update(count=models.F('count') + count, last_edit_at=timestamp)
+
+    @classmethod
+    def rebuild(cls):
+        """Recalcule les totaux à partir des PixelEdit. Retourne le nombre de totaux créés."""
+        rows = (
+            PixelEdit.objects.values('user_id')
+            .annotate(count=Count('id'), last_edit_at=Max('timestamp'))
+            .order_by()
+        )
+        with transaction.atomic():
+            cls.objects.all().delete()
+            created = cls.objects.bulk_create((cls(**row) for row in rows.iterator()), batch_size=1000)
+        return len(created)
+
+
+def get_leaderboard_retention():
+    """Durée de conservation des compteurs horaires (fenêtre la plus longue du classement)."""
+    return timedelta(days=getattr(settings, 'LEADERBOARD_RETENTION_DAYS', 7))
+
+
+class HourlyContribution(models.Model):
+    """
+    Nombre de modifications d'un utilisateur, toutes toiles confondues, pour une heure
+    (début de l'heure en UTC). Les classements des dernières 24 heures et des 7 derniers
+    jours additionnent ces compteurs : leur nombre ne dépend que des utilisateurs actifs
+    sur la période, pas du volume de l'historique. Les compteurs plus anciens que
+    LEADERBOARD_RETENTION_DAYS sont supprimés.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hourly_contributions')
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'hour'], name='unique_hourly_contribution'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='hourly_contribution_hour_idx'),
+        ]
+
+    @staticmethod
+    def truncate(timestamp):
+        """Début de l'heure (UTC) contenant `timestamp`."""
+        return timestamp.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def increment(cls, user_id, timestamp, count=1):
+        """Ajoute `count` modifications au compteur de l'heure de `timestamp` (créé s'il n'existe pas encore)."""
+        hour = cls.truncate(timestamp)
+        counters = cls.objects.filter(user_id=user_id, hour=hour)
+        if counters.update(count=models.F('count') + count):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, hour=hour, count=count)
+        except IntegrityError:
+            # Créé entre-temps par une autre écriture
+            counters.update(count=models.F('count') + count)
+            return
+        # Nouvelle heure pour cet utilisateur : ses compteurs expirés sont supprimés
+        cls.objects.filter(user_id=user_id, hour__lt=hour - get_leaderboard_retention()).delete()
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalcule les compteurs de la période conservée à partir des PixelEdit.
+        Retourne le nombre de compteurs créés.
+        """
+        since = cls.truncate(timezone.now() - get_leaderboard_retention())
+        rows = (
+            PixelEdit.objects.filter(timestamp__gte=since)
+            .annotate(hour=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+            .values('user_id', 'hour')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        with transaction.atomic():
+            cls.objects.all().delete()
+            created = cls.objects.bulk_create((cls(**row) for row in rows.iterator()), batch_size=1000)
+        return len(created)
+
+
+def get_keyframe_interval():
+    """Nombre de modifications entre deux images clés de l'historique d'une toile."""
+    return getattr(settings, 'CANVAS_KEYFRAME_INTERVAL', 500)
+
+
+class CanvasKeyframe(models.Model):
+    """
+    Copie complète des pixels d'une toile après une modification donnée.
+    L'état de la toile à un instant T est reconstruit à partir de l'image clé la plus
+    proche, puis des PixelEdit suivants (au plus CANVAS_KEYFRAME_INTERVAL), voir blog.history.
+    """
+    canvas = models.ForeignKey(Canvas, on_delete=models.CASCADE, related_name='keyframes')
+
+    # Identifiant du dernier PixelEdit inclus dans cette image clé (0 si aucun)
+    edit_id = models.BigIntegerField()
+
+    # Date de la dernière modification incluse
+    timestamp = models.DateTimeField()
+
+    # Palette et pixels de la toile, au même format que Canvas
+    palette = models.JSONField(default=list)
+    pixels = models.BinaryField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['canvas', 'edit_id'], name='keyframe_canvas_edit_idx'),
+        ]
+
+    def to_buffer(self, width, height):
+        """Retourne le tampon de pixels de l'image clé."""
+        return PixelBuffer(width, height, self.palette, self.pixels)
+
+
+def get_change_log_size():
+    """Nombre de versions conservées dans le journal des changements de chaque toile."""
+    return getattr(settings, 'CANVAS_CHANGE_LOG_SIZE', 256)
+
+
+class CanvasChange(models.Model):
+    """
+    Journal circulaire des dernières modifications d'une toile.
+    Chaque toile possède au plus CANVAS_CHANGE_LOG_SIZE lignes : la version N
+    est écrite dans l'emplacement N % CANVAS_CHANGE_LOG_SIZE, en écrasant la plus ancienne.
+    """
+    # Toile concernée par la modification
+    canvas = models.ForeignKey(Canvas, on_delete=models.CASCADE, related_name='changes')
+
+    # Emplacement dans le tampon circulaire
+    slot = models.PositiveIntegerField()
+
+    # Version de la toile produite par cette modification
+    version = models.PositiveIntegerField()
+
+    # Pixels modifiés, sous forme de liste [x, y, "#RRGGBB"]
+    pixels = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['canvas', 'slot'], name='unique_canvas_change_slot'),
+        ]
+
+    @classmethod
+    def record(cls, canvas_id, version, pixels):
+        """Enregistre les pixels modifiés par la version donnée, en écrasant l'emplacement le plus ancien."""
+        cls.objects.update_or_create(
+            canvas_id=canvas_id,
+            slot=version % get_change_log_size(),
+            defaults={'version': version, 'pixels': pixels},
+        )
+
+    @classmethod
+    def since(cls, canvas_id, current_version, since):
+        """
+        Retourne la liste des pixels [x, y, "#RRGGBB"] modifiés après la version `since`,
+        dans l'ordre d'application, ou None si le client doit recharger toute la toile
+        (version inconnue ou trop ancienne pour le journal).
+        """
+        if since == current_version:
+            return []
+        if since > current_version or current_version - since > get_change_log_size():
+            return None
+
+        entries = list(
+            cls.objects.filter(canvas_id=canvas_id, version__gt=since, version__lte=current_version)
+            .order_by('version')
+            .values_list('pixels', flat=True)
+        )
+        # Une version manquante signifie que le journal a été écrasé entre-temps
+        if len(entries) != current_version - since:
+            return None
+        return [pixel for pixels in entries for pixel in pixels]
@@ -0,0 +1,139 @@
+import re
+
+# Couleur de fond utilisée pour les nouvelles toiles
+DEFAULT_COLOR = "#FFFFFF"
+
+# Un pixel est stocké sur un seul octet : la palette d'une toile est donc limitée à 256 couleurs
+MAX_PALETTE_SIZE = 256
+
+COLOR_RE = re.compile(r"#[0-9A-Fa-f]{6}")
+
+
+def normalize_color(color):
+    """
+    Valide une couleur "#RRGGBB" et la retourne en majuscules.
+    Lève une ValueError si la couleur n'est pas au bon format.
+    """
+    if not isinstance(color, str) or not COLOR_RE.fullmatch(color):
+        raise ValueError(f"Invalid color: {color!r}")
+    return color.upper()
+
+
+def hex_to_rgb(color):
+    """Convertit une couleur "#RRGGBB" en tuple (r, g, b)."""
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def validate_pixels(pixels, width, height):
+    """
+    Valide en une seule passe un lot de modifications [(x, y, couleur), ...] pour une toile.
+    Retourne (modifications valides avec couleurs normalisées, résultat de chaque modification) ;
+    les résultats sont dans l'ordre du lot, avec le statut "ok" ou "invalid" et la raison.
+    """
+    valid = []
+    results = []
+    for x, y, color in pixels:
+        result = {'x': x, 'y': y}
+        if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < width and 0 <= y < height):
+            result.update(status='invalid', error='Invalid pixel coordinates')
+        else:
+            try:
+                valid.append((x, y, normalize_color(color)))
+                result['status'] = 'ok'
+            except ValueError as e:
+                result.update(status='invalid', error=str(e))
+        results.append(result)
+    return valid, results
+
+
+class PixelBuffer:
+    """
+    Représentation compacte des pixels d'une toile : une palette de couleurs
+    et un octet par pixel (l'index de la couleur dans la palette), ligne par ligne.
+    Modifier un pixel ne touche qu'un seul octet du tampon.
+    """
+
+    def __init__(self, width, height, palette, data):
+        self.width = width
+        self.height = height
+        self.palette = list(palette)
+        self.data = bytearray(data)
+        # Index inverse couleur -> position dans la palette
+        self._index = {color: i for i, color in enumerate(self.palette)}
+        if len(self.data) != width * height:
+            raise ValueError("Pixel data does not match canvas dimensions")
+
+    @classmethod
+    def blank(cls, width, height, color=DEFAULT_COLOR):
+        """Crée un tampon entièrement rempli d'une seule couleur (index 0)."""
+        return cls(width, height, [normalize_color(color)], bytes(width * height))
+
+    @classmethod
+    def from_matrix(cls, matrix, width, height):
+        """
+        Construit un tampon à partir de l'ancien format (liste de listes de "#RRGGBB").
+        Les cellules manquantes ou invalides sont remplacées par la couleur de fond.
+        """
+        buffer = cls.blank(width, height)
+        for y, row in enumerate(matrix[:height]):
+            for x, color in enumerate(row[:width]):
+                try:
+                    buffer.set(x, y, color)
+                except ValueError:
+                    continue
+        return buffer
+
+    def in_bounds(self, x, y):
+        """Vérifie que les coordonnées (x, y) sont dans la toile."""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def color_index(self, color):
+        """
+        Retourne l'index de la couleur dans la palette, en l'ajoutant si nécessaire.
+        Si la palette est pleine, la couleur la plus proche déjà présente est utilisée.
+        """
+        color = normalize_color(color)
+        index = self._index.get(color)
+        if index is not None:
+            return index
+        if len(self.palette) < MAX_PALETTE_SIZE:
+            self.palette.append(color)
+            self._index[color] = len(self.palette) - 1
+            return len(self.palette) - 1
+        return self._nearest_index(color)
+
+    def _nearest_index(self, color):
+        """Cherche la couleur de la palette la plus proche (distance euclidienne RGB)."""
+        r, g, b = hex_to_rgb(color)
+
+        def distance(item):
+            pr, pg, pb = hex_to_rgb(item[1])
+            return (pr - r) ** 2 + (pg - g) ** 2 + (pb - b) ** 2
+
+        return min(enumerate(self.palette), key=distance)[0]
+
+    def get(self, x, y):
+        """Retourne la couleur "#RRGGBB" du pixel (x, y)."""
+        return self.palette[self.data[y * self.width + x]]
+
+    def set(self, x, y, color):
+        """
+        Modifie la couleur du pixel (x, y) en écrivant un seul octet.
+        Retourne la couleur réellement stockée (elle peut différer si la palette est pleine).
+        """
+        index = self.color_index(color)
+        self.data[y * self.width + x] = index
+        return self.palette[index]
+
+    def to_matrix(self):
+        """Reconstruit la matrice de couleurs "#RRGGBB" (ancien format, utilisé par le JavaScript)."""
+        palette = self.palette
+        width = self.width
+        return [
+            [palette[i] for i in self.data[row * width:(row + 1) * width]]
+            for row in range(self.height)
+        ]
+
+    def to_bytes(self):
+        """Retourne les octets des pixels, prêts à être stockés dans un BinaryField."""
+        return bytes(self.data)
@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class CooldownLimiter:
+    """
+    Limiteur à intervalle fixe : après une modification, un utilisateur doit attendre
+    `interval` secondes avant de modifier à nouveau la même toile.
+    L'état est stocké dans le cache Django (locmem, fichiers, memcached...), jamais dans la toile.
+    """
+
+    def __init__(self, cache_alias='default'):
+        self.cache = caches[cache_alias]
+
+    def key(self, canvas_id, user_id):
+        """Clé de cache de l'intervalle d'un utilisateur sur une toile."""
+        return f'cooldown:{canvas_id}:{user_id}'
+
+    def acquire(self, canvas_id, user_id, interval):
+        """
+        Réserve une modification pour l'utilisateur.
+        Retourne (True, 0) si la modification est autorisée, sinon (False, secondes restantes).
+        """
+        if interval <= 0:
+            return True, 0
+        # cache.add est atomique : seule la première requête de l'intervalle obtient la clé
+        if self.cache.add(self.key(canvas_id, user_id), time.time() + interval, timeout=interval):
+            return True, 0
+        return False, self.remaining(canvas_id, user_id)
+
+    def remaining(self, canvas_id, user_id):
+        """Nombre de secondes avant que l'utilisateur puisse de nouveau modifier la toile."""
+        available_at = self.cache.get(self.key(canvas_id, user_id))
+        if available_at is None:
+            return 0
+        return max(available_at - time.time(), 0)
+
+    def release(self, canvas_id, user_id):
+        """Annule une réservation (par exemple si la modification a finalement échoué)."""
+        self.cache.delete(self.key(canvas_id, user_id))
+
+
+# Intervalle de modification et nombre maximal de pixels par requête selon le rôle de l'utilisateur
+# ("interval": None = intervalle de la toile, 0 = aucun intervalle). Tous les rôles respectent
+# l'intervalle de la toile, y compris pour les modifications d'un seul pixel ; le staff et le créateur
+# peuvent seulement envoyer des lots plus grands. Remplaçable par le réglage CANVAS_COOLDOWN_POLICY.
+DEFAULT_COOLDOWN_POLICY = {
+    'staff': {'interval': None, 'max_pixels': 1000},
+    'author': {'interval': None, 'max_pixels': 1000},
+    'default': {'interval': None, 'max_pixels': 1},
+}
+
+
+def get_user_role(user, author_id):
+    """Rôle de l'utilisateur sur une toile : "staff", "author" (créateur de la toile) ou "default"."""
+    if user.is_staff:
+        return 'staff'
+    if user.id == author_id:
+        return 'author'
+    return 'default'
+
+
+def get_cooldown_policy(user, author_id, canvas_interval):
+    """
+    Retourne (intervalle en secondes, nombre maximal de pixels par modification) applicables
+    à l'utilisateur sur une toile, d'après son rôle et CANVAS_COOLDOWN_POLICY.
+    """
+    policies = getattr(settings, 'CANVAS_COOLDOWN_POLICY', DEFAULT_COOLDOWN_POLICY)
+    policy = policies.get(get_user_role(user, author_id)) or policies['default']
+    interval = policy.get('interval')
+    if interval is None:
+        interval = canvas_interval
+    return interval, policy.get('max_pixels', 1)
+
+
+def get_rate_limiter():
+    """
+    Retourne le limiteur configuré par CANVAS_RATE_LIMITER (chemin de la classe)
+    et CANVAS_RATE_LIMIT_CACHE (alias du cache à utiliser).
+    """
+    limiter_class = import_string(getattr(settings, 'CANVAS_RATE_LIMITER', 'blog.ratelimit.CooldownLimiter'))
+    return limiter_class(getattr(settings, 'CANVAS_RATE_LIMIT_CACHE', 'default'))
@@ -0,0 +1,99 @@
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+
+from .pixels import hex_to_rgb
+
+
+def render_buffer(buffer):
+    """
+    Construit l'image Pillow (mode "P", un pixel par pixel de la toile) directement
+    à partir du tampon d'octets et de la palette, sans boucle pixel par pixel.
+    """
+    image = Image.frombytes('P', (buffer.width, buffer.height), bytes(buffer.data))
+    image.putpalette([channel for color in buffer.palette for channel in hex_to_rgb(color)])
+    return image
+
+
+def render_image(canvas):
+    """Construit l'image Pillow de l'état courant de la toile."""
+    return render_buffer(canvas.get_pixel_buffer())
+
+
+# Formats d'export disponibles : extension -> (format Pillow, type MIME, options d'encodage)
+IMAGE_FORMATS = {
+    'png': ('PNG', 'image/png', {'optimize': True}),
+    'webp': ('WEBP', 'image/webp', {'lossless': True}),
+}
+
+
+def encode_image(image, image_format='png'):
+    """Encode une image Pillow dans l'un des IMAGE_FORMATS et retourne ses octets."""
+    pillow_format, _, options = IMAGE_FORMATS[image_format]
+    output = io.BytesIO()
+    image.save(output, format=pillow_format, **options)
+    return output.getvalue()
+
+
+def get_cached_render(canvas, name, render):
+    """
+    Retourne les octets rendus par render(), mis en cache pour la version courante de la toile
+    (une nouvelle version produit une nouvelle clé : les anciennes entrées expirent seules).
+    """
+    key = f'canvas-render:{canvas.pk}:{canvas.version}:{name}'
+    data = cache.get(key)
+    if data is None:
+        data = render()
+        cache.set(key, data, getattr(settings, 'CANVAS_IMAGE_CACHE_TIMEOUT', 3600))
+    return data
+
+
+def get_thumbnail_size():
+    """Taille maximale (en pixels) du plus grand côté d'une miniature."""
+    return getattr(settings, 'CANVAS_THUMBNAIL_SIZE', 200)
+
+
+def render_thumbnail(canvas, size=None):
+    """
+    Retourne les octets PNG de la miniature de la toile.
+    Les petites toiles sont agrandies sans lissage pour garder des pixels nets.
+    """
+    size = size or get_thumbnail_size()
+    image = render_image(canvas)
+    factor = size / max(image.width, image.height)
+    thumbnail_size = (max(1, round(image.width * factor)), max(1, round(image.height * factor)))
+    resample = Image.NEAREST if factor >= 1 else Image.BOX
+    return encode_image(image.convert('RGB').resize(thumbnail_size, resample), 'png')
+
+
+def get_thumbnail(canvas):
+    """Retourne la miniature PNG de la toile, mise en cache pour sa version courante."""
+    size = get_thumbnail_size()
+    return get_cached_render(canvas, f'thumbnail:{size}', lambda: render_thumbnail(canvas, size))
+
+
+def get_max_export_size():
+    """Taille maximale (en pixels) d'un côté d'une image exportée."""
+    return getattr(settings, 'CANVAS_EXPORT_MAX_SIZE', 4096)
+
+
+def render_export(canvas, scale=1, image_format='png'):
+    """
+    Retourne les octets de l'image de la toile agrandie `scale` fois (sans lissage).
+    L'agrandissement est fait par Pillow sur toute l'image, pas pixel par pixel.
+    """
+    image = render_image(canvas)
+    if scale > 1:
+        image = image.resize((image.width * scale, image.height * scale), Image.NEAREST)
+    if image_format != 'png':
+        # Le mode palette n'est pas supporté par tous les formats
+        image = image.convert('RGB')
+    return encode_image(image, image_format)
+
+
+def get_export(canvas, scale=1, image_format='png'):
+    """Retourne l'image exportée de la toile, mise en cache pour sa version courante."""
+    return get_cached_render(canvas, f'export:{scale}:{image_format}',
+                             lambda: render_export(canvas, scale, image_format))
@@ -0,0 +1,70 @@
+"""
+Cache des statistiques des toiles.
+
+Une entrée est associée au nombre de modifications de la toile (edit_count) au moment du
+calcul : chaque écriture de pixel réussie l'invalide donc automatiquement, sans travail
+supplémentaire dans l'écriture. Pour les toiles très actives, une entrée périmée reste
+servie pendant CANVAS_STATISTICS_STALENESS secondes : les statistiques sont alors
+recalculées au plus une fois par intervalle.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+COUNTER_NAMES = ('hits', 'stale_hits', 'misses')
+
+
+def _counter_key(name):
+    return f'canvas-statistics-counter:{name}'
+
+
+def _count(name):
+    """Incrémente un compteur de monitoring (partagé si le cache l'est)."""
+    key = _counter_key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Compteur supprimé entre add() et incr()
+        cache.set(key, 1, timeout=None)
+
+
+def get_counters():
+    """Retourne les compteurs hits / stale_hits / misses du cache des statistiques."""
+    values = cache.get_many([_counter_key(name) for name in COUNTER_NAMES])
+    return {name: values.get(_counter_key(name), 0) for name in COUNTER_NAMES}
+
+
+def reset_counters():
+    """Remet les compteurs à zéro."""
+    cache.delete_many([_counter_key(name) for name in COUNTER_NAMES])
+
+
+def get_cached_statistics(canvas):
+    """
+    Retourne les statistiques de la toile (même format que Canvas.get_statistics),
+    depuis le cache si elles correspondent à son nombre de modifications ou sont
+    encore dans la fenêtre de péremption.
+    """
+    key = f'canvas-statistics:{canvas.pk}'
+    staleness = getattr(settings, 'CANVAS_STATISTICS_STALENESS', 10)
+    now = time.time()
+
+    entry = cache.get(key)
+    if entry is not None:
+        if entry['edit_count'] == canvas.edit_count:
+            _count('hits')
+            return entry['statistics']
+        if now - entry['computed_at'] < staleness:
+            _count('stale_hits')
+            return entry['statistics']
+
+    _count('misses')
+    statistics = canvas.get_statistics()
+    cache.set(key, {
+        'edit_count': canvas.edit_count,
+        'computed_at': now,
+        'statistics': statistics,
+    }, getattr(settings, 'CANVAS_STATISTICS_CACHE_TIMEOUT', 3600))
+    return statistics
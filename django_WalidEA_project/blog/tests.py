@@ -1,3 +1,990 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import io
+import json
+import struct
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .benchmarks import bench_write_cost, compare_to_baseline, create_synthetic_canvas, latency_summary
+from .broadcast import Broadcaster, LocalBackend
+from .community import CommunityMirror, diff_boards, parse_board_lines
+from .community_writes import CommunityWriteQueue
+from .database import configure_connection
+from .history import state_at
+from .leaderboard import get_leaderboard
+from .metrics import get_request_metrics
+from .models import (
+    Canvas, CanvasChange, CanvasKeyframe, CanvasWriteConflict, ContributorTotal, DailyContribution, HourlyContribution,
+    PixelEdit,
+)
+from .pixels import MAX_PALETTE_SIZE, PixelBuffer
+from .ratelimit import CooldownLimiter
+from .statistics import get_cached_statistics, get_counters
+from .tiles import TILE_SIZE, TiledPixelBuffer, get_tile
+from .writer import PixelWriter
+from .wire import decode_canvas
+
+
+@contextmanager
+def write_before_tiles_are_read(canvas_id, user, pixels):
+    """
+    Valide l'écriture de `pixels` juste avant la première lecture des tuiles du canvas :
+    reproduit une écriture concurrente validée entre la lecture de la palette et celle des tuiles.
+    """
+    written = []
+
+    def wrapper(execute, sql, params, many, context):
+        if not written and sql.startswith('SELECT') and 'blog_canvastile' in sql:
+            written.append(True)
+            Canvas.objects.get(pk=canvas_id).write_pixels(pixels, user)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+class PixelBufferTests(TestCase):
+    def test_set_touches_single_byte(self):
+        buffer = PixelBuffer.blank(4, 3)
+        buffer.set(2, 1, "#ff0000")
+        self.assertEqual(buffer.get(2, 1), "#FF0000")
+        self.assertEqual(buffer.palette, ["#FFFFFF", "#FF0000"])
+        self.assertEqual(buffer.data.count(1), 1)
+        self.assertEqual(buffer.data[1 * 4 + 2], 1)
+
+    def test_matrix_round_trip(self):
+        matrix = [["#FFFFFF", "#000000"], ["#00ff00", "#FFFFFF"]]
+        buffer = PixelBuffer.from_matrix(matrix, 2, 2)
+        self.assertEqual(buffer.to_matrix(), [["#FFFFFF", "#000000"], ["#00FF00", "#FFFFFF"]])
+
+    def test_full_palette_uses_nearest_color(self):
+        buffer = PixelBuffer.blank(MAX_PALETTE_SIZE, 1)
+        for i in range(1, MAX_PALETTE_SIZE):
+            buffer.set(i, 0, f"#{i:02X}0000")
+        self.assertEqual(len(buffer.palette), MAX_PALETTE_SIZE)
+        self.assertEqual(buffer.set(0, 0, "#FE0101"), "#FE0000")
+
+    def test_invalid_color(self):
+        buffer = PixelBuffer.blank(2, 2)
+        with self.assertRaises(ValueError):
+            buffer.set(0, 0, "red")
+
+
+class TiledPixelBufferTests(TestCase):
+    def test_only_painted_tiles_are_stored(self):
+        buffer = TiledPixelBuffer.blank(1000, 1000)
+        buffer.set(3, 2, "#ff0000")
+        buffer.set(999, 999, "#00ff00")
+        self.assertEqual(set(buffer.tiles), {(0, 0), (15, 15)})
+        # Tuile du bord : 1000 - 15 * 64 = 40 pixels de côté
+        self.assertEqual(len(buffer.tiles[15, 15]), 40 * 40)
+        restored = TiledPixelBuffer(1000, 1000, buffer.palette, buffer.tiles)
+        self.assertEqual((restored.get(3, 2), restored.get(999, 999), restored.get(500, 500)),
+                         ("#FF0000", "#00FF00", "#FFFFFF"))
+        # Le tampon dense n'est construit qu'à la lecture, puis maintenu
+        self.assertIsNone(restored._data)
+        self.assertEqual(restored.data[2 * 1000 + 3], 1)
+        restored.set(0, 0, "#000000")
+        self.assertEqual(restored.data[0], 3)
+        self.assertEqual(TiledPixelBuffer.from_buffer(restored).tiles.keys(), restored.tiles.keys())
+
+    def test_canvas_creation_does_not_write_pixels(self):
+        user = User.objects.create_user('painter')
+        self.client.force_login(user)
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('canvas-create'), {
+                'title': 'Event', 'width': 2000, 'height': 2000, 'pixel_edit_interval': 5,
+            })
+        self.assertEqual(response.status_code, 302)
+        canvas = Canvas.objects.get(title='Event')
+        self.assertFalse(canvas.tiles.exists())
+        self.assertEqual(canvas.get_pixel_buffer().get(1999, 1999), "#FFFFFF")
+
+
+class CanvasStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('painter', password='secret')
+        self.canvas = Canvas.objects.create(title='Test', width=5, height=4, author=self.user)
+        self.canvas.initialize_canvas()
+
+    def test_initialize_canvas(self):
+        canvas = Canvas.objects.get(pk=self.canvas.pk)
+        # Toile vide : aucune tuile stockée
+        self.assertFalse(canvas.tiles.exists())
+        self.assertEqual(canvas.get_content(), [["#FFFFFF"] * 5 for _ in range(4)])
+
+    def test_write_only_touches_modified_tiles(self):
+        canvas = Canvas.objects.create(title='Large', width=TILE_SIZE * 3, height=TILE_SIZE, author=self.user)
+        canvas.write_pixel(1, 1, "#000000", self.user)
+        canvas.write_pixels([(TILE_SIZE * 2, 0, "#FF0000"), (TILE_SIZE * 2 + 1, 0, "#000000")], self.user)
+        tiles = {(tile.tx, tile.ty): tile for tile in canvas.tiles.all()}
+        self.assertEqual({key: tile.version for key, tile in tiles.items()}, {(0, 0): 1, (2, 0): 2})
+        self.assertEqual(len(tiles[2, 0].pixels), TILE_SIZE * TILE_SIZE)
+        # La palette n'est réécrite que lorsqu'une couleur y est ajoutée
+        with CaptureQueriesContext(connection) as queries:
+            Canvas.objects.get(pk=canvas.pk).write_pixel(0, 0, "#FF0000", self.user)
+        update = next(q['sql'] for q in queries if q['sql'].startswith('UPDATE "blog_canvas"'))
+        self.assertNotIn('"palette"', update)
+        canvas = Canvas.objects.get(pk=canvas.pk)
+        self.assertEqual(canvas.palette, ["#FFFFFF", "#000000", "#FF0000"])
+        self.assertEqual(canvas.get_content()[0][:2], ["#FF0000", "#FFFFFF"])
+        self.assertEqual(canvas.get_pixel_buffer().get(TILE_SIZE * 2 + 1, 0), "#000000")
+
+    def test_update_pixel_is_persisted(self):
+        self.assertTrue(self.canvas.update_pixel(4, 3, "#123abc", self.user))
+        canvas = Canvas.objects.get(pk=self.canvas.pk)
+        self.assertEqual(canvas.get_pixel_buffer().get(4, 3), "#123ABC")
+        self.assertFalse(canvas.update_pixel(5, 0, "#000000", User.objects.create_user('other')))
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        # Deux requêtes chargent la même version de la toile avant d'écrire
+        first = Canvas.objects.get(pk=self.canvas.pk)
+        second = Canvas.objects.get(pk=self.canvas.pk)
+        other = User.objects.create_user('other')
+        self.assertTrue(first.write_pixel(0, 0, "#000000", self.user))
+        self.assertTrue(second.write_pixel(1, 0, "#FF0000", other))
+
+        canvas = Canvas.objects.get(pk=self.canvas.pk)
+        self.assertEqual(canvas.version, 2)
+        self.assertEqual(canvas.get_content()[0][:2], ["#000000", "#FF0000"])
+        self.assertEqual(set(canvas.edits.values_list('user__username', flat=True)), {'painter', 'other'})
+
+    def test_get_canvas_data_returns_matrix(self):
+        self.canvas.update_pixel(0, 0, "#000000", self.user)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('get-canvas-data', kwargs={'pk': self.canvas.pk}))
+        content = json.loads(response.json()['content'])
+        self.assertEqual(content[0][0], "#000000")
+        self.assertEqual(len(content), 4)
+
+    def test_get_canvas_data_binary_format(self):
+        cache.clear()
+        self.canvas.write_pixels([(0, 0, "#000000"), (4, 3, "#FF0000")], self.user)
+        self.client.force_login(self.user)
+        url = reverse('get-canvas-data', kwargs={'pk': self.canvas.pk})
+        response = self.client.get(url, headers={'accept': 'application/octet-stream', 'accept-encoding': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept', response['Vary'])
+        buffer, version = decode_canvas(gzip.decompress(response.content))
+        self.assertEqual(version, 1)
+        self.assertEqual(buffer.to_matrix(), Canvas.objects.get(pk=self.canvas.pk).get_content())
+
+        # Sans gzip accepté, le format binaire est envoyé tel quel ; le JSON reste le format par défaut
+        response = self.client.get(url, headers={'accept': 'application/octet-stream'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(decode_canvas(response.content)[0].get(4, 3), "#FF0000")
+        self.assertEqual(self.client.get(url, headers={'accept': '*/*'})['Content-Type'], 'application/json')
+
+    def test_binary_data_respects_accept_encoding_q_values(self):
+        self.client.force_login(self.user)
+        url = reverse('get-canvas-data', kwargs={'pk': self.canvas.pk})
+        for accept_encoding, compressed in [('gzip;q=0', False), ('gzip;q=0, *', False), ('*;q=0.5', True),
+                                            ('br, *;q=0', False), ('deflate, GZIP;q=0.1', True)]:
+            response = self.client.get(url, headers={'accept': 'application/octet-stream',
+                                                     'accept-encoding': accept_encoding})
+            self.assertEqual(response.get('Content-Encoding') == 'gzip', compressed, accept_encoding)
+
+    def test_palette_grown_between_reads(self):
+        self.canvas.write_pixel(0, 0, "#000000", self.user)
+        # Palette lue avant qu'une écriture concurrente n'y ajoute deux couleurs
+        canvas = Canvas.objects.get(pk=self.canvas.pk)
+        Canvas.objects.get(pk=self.canvas.pk).write_pixels([(1, 0, "#FF0000"), (2, 0, "#00FF00")], self.user)
+        self.assertEqual(canvas.get_content()[0][:3], ["#000000", "#FF0000", "#00FF00"])
+
+        self.client.force_login(self.user)
+        url = reverse('get-canvas-data', kwargs={'pk': self.canvas.pk})
+        with write_before_tiles_are_read(self.canvas.pk, self.user, [(3, 0, "#0000FF")]):
+            response = self.client.get(url)
+        self.assertEqual(json.loads(response.json()['content'])[0][3], "#0000FF")
+        with write_before_tiles_are_read(self.canvas.pk, self.user, [(4, 0, "#FFFF00")]):
+            response = self.client.get(url, headers={'accept': 'application/octet-stream'})
+        self.assertEqual(decode_canvas(response.content)[0].get(4, 0), "#FFFF00")
+
+    def test_binary_data_of_deleted_canvas(self):
+        self.client.force_login(self.user)
+        url = reverse('get-canvas-data', kwargs={'pk': self.canvas.pk})
+        # Canvas supprimé entre la lecture de sa version et le rendu des données
+        with mock.patch('blog.wire.cache.get', return_value=None), \
+                mock.patch('blog.models.Canvas.objects.get', side_effect=Canvas.DoesNotExist):
+            response = self.client.get(url, headers={'accept': 'application/octet-stream'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CANVAS_CHANGE_LOG_SIZE=3)
+class CanvasChangesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('painter', password='secret')
+        self.canvas = Canvas.objects.create(title='Test', width=5, height=5, author=self.user, pixel_edit_interval=0)
+        self.canvas.initialize_canvas()
+        self.client.force_login(self.user)
+        self.url = reverse('get-canvas-changes', kwargs={'pk': self.canvas.pk})
+
+    def test_changes_since_version(self):
+        self.canvas.update_pixel(1, 1, "#000000", self.user)
+        self.canvas.update_pixel(2, 2, "#ff0000", self.user)
+        response = self.client.get(self.url, {'since': 1})
+        self.assertEqual(response.json(), {'version': 2, 'changes': [[2, 2, "#FF0000"]]})
+        response = self.client.get(self.url, {'since': 2})
+        self.assertEqual(response.json(), {'version': 2, 'changes': []})
+
+    def test_change_log_is_bounded(self):
+        for i in range(5):
+            self.canvas.update_pixel(i, 0, "#000000", self.user)
+        self.assertEqual(CanvasChange.objects.filter(canvas=self.canvas).count(), 3)
+        self.assertEqual(len(self.client.get(self.url, {'since': 2}).json()['changes']), 3)
+        self.assertEqual(self.client.get(self.url, {'since': 1}).json(), {'version': 5, 'resync': True})
+
+
+class CanvasStatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+        self.canvas = Canvas.objects.create(title='Stats', width=4, height=4, author=self.alice, pixel_edit_interval=0)
+        self.canvas.initialize_canvas()
+
+    def test_pixel_write_inserts_edit(self):
+        self.canvas.update_pixel(3, 2, "#00ff00", self.bob)
+        edit = PixelEdit.objects.get(canvas=self.canvas)
+        self.assertEqual((edit.user, edit.x, edit.y, edit.color), (self.bob, 3, 2, "#00FF00"))
+
+    def test_get_statistics(self):
+        for x in range(3):
+            self.canvas.update_pixel(x, 0, "#000000", self.bob)
+        self.canvas.update_pixel(0, 1, "#000000", self.alice)
+        statistics = self.canvas.get_statistics()
+        self.assertEqual(statistics['daily_contributions']['counts'], [4])
+        self.assertEqual(statistics['top_contributors'], [
+            {'username': 'bob', 'contributions': 3},
+            {'username': 'alice', 'contributions': 1},
+        ])
+
+    def test_get_statistics_query_count_is_constant(self):
+        for i in range(10):
+            self.canvas.update_pixel(i % 4, 0, "#000000", User.objects.create_user(f'user{i}'))
+        with self.assertNumQueries(2):
+            statistics = self.canvas.get_statistics()
+        self.assertEqual(len(statistics['top_contributors']), 10)
+
+    def test_rebuild_rollups(self):
+        self.canvas.update_pixel(0, 0, "#000000", self.bob)
+        PixelEdit.objects.create(canvas=self.canvas, user=self.bob,
+                                 timestamp=timezone.now() - timedelta(days=1))
+        DailyContribution.objects.all().delete()
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        statistics = self.canvas.get_statistics()
+        self.assertEqual(statistics['daily_contributions']['counts'], [1, 1])
+        self.assertEqual(statistics['top_contributors'], [{'username': 'bob', 'contributions': 2}])
+
+
+class CooldownTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('painter', password='secret')
+        self.canvas = Canvas.objects.create(title='Test', width=3, height=3, author=self.user, pixel_edit_interval=30)
+        self.canvas.initialize_canvas()
+        self.client.force_login(self.user)
+        self.url = reverse('update-pixel', kwargs={'pk': self.canvas.pk})
+
+    def post_pixel(self, x, y, color='#000000'):
+        return self.client.post(self.url, json.dumps({'x': x, 'y': y, 'color': color}),
+                                content_type='application/json')
+
+    def test_limiter(self):
+        limiter = CooldownLimiter()
+        self.assertEqual(limiter.acquire(1, 2, 10), (True, 0))
+        allowed, remaining = limiter.acquire(1, 2, 10)
+        self.assertFalse(allowed)
+        self.assertGreater(remaining, 9)
+        limiter.release(1, 2)
+        self.assertEqual(limiter.remaining(1, 2), 0)
+
+    def test_early_edit_is_rejected_before_loading_canvas(self):
+        self.assertEqual(self.post_pixel(0, 0).status_code, 200)
+        # Session, utilisateur et intervalle de la toile : le contenu n'est pas chargé
+        with self.assertNumQueries(3):
+            response = self.post_pixel(1, 1)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('30 seconds', response.json()['error'])
+
+    def test_invalid_coordinates_do_not_consume_cooldown(self):
+        self.assertEqual(self.post_pixel(5, 5).status_code, 400)
+        self.assertEqual(self.post_pixel(0, 0).status_code, 200)
+
+    def test_invalid_pixel_is_rejected_like_bulk_updates(self):
+        for x, y, color in [('0', 0, '#000000'), (0.5, 0, '#000000'), (None, 0, '#000000'), (0, -1, '#000000'),
+                            (0, 0, 'red'), (0, 0, None)]:
+            response = self.post_pixel(x, y, color)
+            self.assertEqual(response.status_code, 400, (x, y, color))
+            results = response.json()['results']
+            self.assertEqual([result['status'] for result in results], ['invalid'])
+            self.assertEqual(response.json()['error'], results[0]['error'])
+        self.assertEqual(self.post_pixel(0, 0, '#00ff00').status_code, 200)
+        self.assertEqual(Canvas.objects.get(pk=self.canvas.pk).get_pixel_buffer().get(0, 0), '#00FF00')
+
+    def test_cooldown_endpoint(self):
+        url = reverse('get-canvas-cooldown', kwargs={'pk': self.canvas.pk})
+        self.assertEqual(self.client.get(url).json(), {'interval': 30, 'max_pixels': 1000, 'remaining': 0})
+        self.post_pixel(0, 0)
+        self.assertGreater(self.client.get(url).json()['remaining'], 29)
+
+
+class PixelWriterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('painter', password='secret')
+        self.canvas = Canvas.objects.create(title='Writer', width=4, height=4, author=self.user, pixel_edit_interval=0)
+
+    def test_queued_writes_are_group_committed(self):
+        writer = PixelWriter(batch_size=10)
+        futures = [writer.submit(self.canvas.pk, [(x, 0, "#FF0000")], self.user) for x in range(3)]
+        missing = writer.submit(0, [(0, 0, "#FF0000")], self.user)
+        writer.flush()
+        versions = [future.result()[1]['version'] for future in futures]
+        self.assertEqual(versions, [1, 2, 3])
+        self.assertIsInstance(missing.exception(), Canvas.DoesNotExist)
+        self.canvas.refresh_from_db()
+        self.assertEqual(self.canvas.version, 3)
+        self.assertEqual([self.canvas.get_pixel_buffer().get(x, 0) for x in range(3)], ["#FF0000"] * 3)
+        self.assertEqual(PixelEdit.objects.filter(canvas=self.canvas).count(), 3)
+
+    @override_settings(CANVAS_WRITER_TIMEOUT=0.01)
+    def test_timed_out_write_is_cancelled(self):
+        # Thread d'écriture non démarré : la requête abandonne et son lot n'est jamais appliqué
+        writer = PixelWriter()
+        with self.assertRaises(CanvasWriteConflict):
+            writer.write(self.canvas.pk, [(1, 1, "#00FF00")], self.user)
+        writer.flush()
+        self.canvas.refresh_from_db()
+        self.assertEqual(self.canvas.version, 0)
+
+    def test_connection_pragmas(self):
+        with override_settings(SQLITE_PRAGMAS={'cache_size': -4000}):
+            configure_connection(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4000)
+            cursor.execute('PRAGMA cache_size = -2000')
+
+
+class BulkUpdateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author')
+        self.canvas = Canvas.objects.create(title='Bulk', width=4, height=4, author=self.author, pixel_edit_interval=30)
+        self.client.force_login(self.author)
+        self.url = reverse('update-pixels', kwargs={'pk': self.canvas.pk})
+
+    def post_json(self, pixels):
+        return self.client.post(self.url, json.dumps({'pixels': pixels}), content_type='application/json')
+
+    def test_batch_is_one_version_and_one_change_entry(self):
+        response = self.post_json([
+            {'x': 0, 'y': 0, 'color': '#ff0000'},
+            {'x': 9, 'y': 0, 'color': '#000000'},
+            {'x': 1, 'y': 0, 'color': 'red'},
+            {'x': 2, 'y': 3, 'color': '#00FF00'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], ['ok', 'invalid', 'invalid', 'ok'])
+        self.assertEqual(results[0]['color'], '#FF0000')
+
+        canvas = Canvas.objects.get(pk=self.canvas.pk)
+        self.assertEqual((canvas.version, canvas.edit_count), (1, 2))
+        self.assertEqual(CanvasChange.since(canvas.pk, 1, 0), [[0, 0, '#FF0000'], [2, 3, '#00FF00']])
+        self.assertEqual(canvas.edits.count(), 2)
+        self.assertEqual(DailyContribution.objects.get(canvas=canvas).count, 2)
+        # L'intervalle de la toile s'applique ensuite au créateur
+        self.assertEqual(self.post_json([{'x': 1, 'y': 1, 'color': '#000000'}]).status_code, 403)
+
+    def test_binary_payload(self):
+        body = struct.pack('>HHBBBHHBBB', 1, 2, 0, 0, 255, 3, 3, 1, 2, 3)
+        response = self.client.post(self.url, body, content_type='application/octet-stream')
+        self.assertEqual([r['color'] for r in response.json()['results']], ['#0000FF', '#010203'])
+        self.assertEqual(Canvas.objects.get(pk=self.canvas.pk).get_pixel_buffer().get(1, 2), '#0000FF')
+        self.assertEqual(self.client.post(self.url, body[:-1], content_type='application/octet-stream').status_code, 400)
+
+    def test_invalid_batch_does_not_consume_cooldown(self):
+        self.assertEqual(self.post_json([{'x': 9, 'y': 9, 'color': '#000000'}]).status_code, 400)
+        self.assertEqual(self.post_json([{'x': 0, 'y': 0, 'color': '#000000'}]).status_code, 200)
+
+    def test_cooldown_policy_by_role(self):
+        # Les autres utilisateurs ne peuvent modifier qu'un pixel à la fois
+        self.client.force_login(User.objects.create_user('visitor'))
+        pixels = [{'x': 0, 'y': 0, 'color': '#000000'}, {'x': 1, 'y': 0, 'color': '#000000'}]
+        self.assertEqual(self.post_json(pixels).status_code, 400)
+
+        # Les membres du staff envoient des lots, mais respectent l'intervalle de la toile par défaut
+        moderator = User.objects.create_user('moderator', is_staff=True)
+        self.client.force_login(moderator)
+        self.assertEqual(self.post_json(pixels).status_code, 200)
+        self.assertEqual(self.post_json(pixels).status_code, 403)
+        self.assertFalse(self.canvas.update_pixel(2, 2, '#000000', moderator))
+
+        policy = {'staff': {'interval': 0, 'max_pixels': 2}, 'default': {'interval': 0, 'max_pixels': 2}}
+        with override_settings(CANVAS_COOLDOWN_POLICY=policy):
+            self.assertEqual(self.post_json(pixels).status_code, 200)
+            self.assertTrue(self.canvas.update_pixel(2, 2, '#000000', moderator))
+            self.client.force_login(User.objects.create_user('painter'))
+            self.assertEqual(self.post_json(pixels).status_code, 200)
+
+
+class CanvasTileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('painter', is_staff=True)
+        self.canvas = Canvas.objects.create(title='Tiles', width=TILE_SIZE * 2 + 10, height=TILE_SIZE + 1,
+                                            author=self.user, pixel_edit_interval=0)
+        self.client.force_login(self.user)
+
+    def get_tile(self, tx, ty, **headers):
+        return self.client.get(reverse('canvas-tile', kwargs={'pk': self.canvas.pk, 'tx': tx, 'ty': ty}), **headers)
+
+    def test_tile_content(self):
+        self.canvas.write_pixels([(TILE_SIZE + 1, 2, '#FF0000'), (TILE_SIZE * 2 + 9, TILE_SIZE, '#0000FF')], self.user)
+        tile = self.get_tile(1, 0).json()
+        self.assertEqual((tile['x'], tile['y'], tile['width'], tile['height']), (TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
+        self.assertEqual((tile['palette'], tile['version']), (['#FFFFFF', '#FF0000'], 1))
+        pixels = base64.b64decode(tile['pixels'])
+        self.assertEqual(pixels[2 * TILE_SIZE + 1], 1)
+        self.assertEqual(pixels.count(1), 1)
+        # Tuile du bord : plus petite, avec sa propre palette
+        tile = self.get_tile(2, 1).json()
+        self.assertEqual((tile['width'], tile['height'], tile['palette']), (10, 1, ['#FFFFFF', '#0000FF']))
+        self.assertEqual(self.get_tile(3, 0).status_code, 404)
+
+    def test_tile_versions_are_independent(self):
+        self.canvas.write_pixel(0, 0, '#000000', self.user)
+        etag = self.get_tile(1, 0)['ETag']
+        # Une modification dans une autre tuile ne change pas celle-ci (réponse 304 sans charger les pixels)
+        self.canvas.write_pixel(1, 1, '#000000', self.user)
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get_tile(1, 0, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get_tile(0, 0).json()['version'], 2)
+        self.canvas.write_pixel(TILE_SIZE, 0, '#000000', self.user)
+        self.assertEqual(self.get_tile(1, 0, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_tile_palette_grown_between_reads(self):
+        self.canvas.write_pixel(0, 0, '#000000', self.user)
+        with write_before_tiles_are_read(self.canvas.pk, self.user, [(1, 0, '#FF0000')]):
+            tile = json.loads(get_tile(self.canvas.pk, 0, 0, 1))
+        self.assertEqual(set(tile['palette']) - {'#FFFFFF', '#000000'}, {'#FF0000'})
+
+    def test_tile_of_deleted_canvas(self):
+        # Canvas supprimé entre la lecture de la version de la tuile et son rendu
+        with mock.patch('blog.views.get_tile_version', return_value=3):
+            response = self.client.get(reverse('canvas-tile', kwargs={'pk': self.canvas.pk + 1, 'tx': 0, 'ty': 0}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_page_does_not_ship_pixels(self):
+        response = self.client.get(reverse('canvas-detail', kwargs={'pk': self.canvas.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('palette', response.context['canvas'].get_deferred_fields())
+
+    def test_canvas_size_is_bounded(self):
+        response = self.client.post(reverse('canvas-create'), {
+            'title': 'Huge', 'width': 5000, 'height': 10, 'pixel_edit_interval': 5,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('width', response.context['form'].errors)
+        self.assertFalse(Canvas.objects.filter(title='Huge').exists())
+
+
+class BroadcastTests(TestCase):
+    def test_published_change_reaches_subscribers(self):
+        broadcaster = Broadcaster(LocalBackend())
+
+        async def listen():
+            subscription = broadcaster.subscribe(7)
+            other = broadcaster.subscribe(8)
+            broadcaster.publish(7, 3, [[1, 2, "#000000"]])
+            message = await asyncio.wait_for(subscription.get(), timeout=1)
+            self.assertTrue(other.queue.empty())
+            broadcaster.unsubscribe(subscription)
+            broadcaster.unsubscribe(other)
+            return message
+
+        self.assertEqual(asyncio.run(listen()), {'version': 3, 'changes': [[1, 2, "#000000"]]})
+        self.assertEqual(broadcaster.subscriber_count(), 0)
+
+    def test_write_publishes_after_commit(self):
+        user = User.objects.create_user('painter')
+        canvas = Canvas.objects.create(title='Live', width=2, height=2, author=user)
+        canvas.initialize_canvas()
+        with mock.patch('blog.models.publish_change') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                canvas.write_pixel(1, 1, "#ff0000", user)
+        publish.assert_called_once_with(canvas.pk, 1, [[1, 1, "#FF0000"]])
+
+    def test_events_require_asgi(self):
+        user = User.objects.create_user('painter')
+        canvas = Canvas.objects.create(title='Live', width=2, height=2, author=user)
+        self.client.force_login(user)
+        response = self.client.get(reverse('canvas-events', kwargs={'pk': canvas.pk}))
+        self.assertEqual(response.status_code, 501)
+
+
+class CanvasThumbnailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('painter')
+        self.canvas = Canvas.objects.create(title='Thumb', width=20, height=10, author=self.user, pixel_edit_interval=0)
+        self.canvas.initialize_canvas()
+        self.canvas.write_pixel(0, 0, "#ff0000", self.user)
+        self.url = reverse('canvas-thumbnail', kwargs={'pk': self.canvas.pk})
+
+    def test_thumbnail_is_rendered(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        image = Image.open(io.BytesIO(response.content)).convert('RGB')
+        self.assertEqual(image.size, (200, 100))
+        self.assertEqual(image.getpixel((0, 0)), (255, 0, 0))
+        self.assertEqual(image.getpixel((199, 99)), (255, 255, 255))
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.canvas.write_pixel(1, 0, "#000000", self.user)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_versioned_url_is_cached_long(self):
+        response = self.client.get(self.url, {'v': self.canvas.version})
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('no-cache', self.client.get(self.url)['Cache-Control'])
+
+    def test_image_export(self):
+        url = reverse('canvas-image-png', kwargs={'pk': self.canvas.pk})
+        response = self.client.get(url, {'scale': 3})
+        image = Image.open(io.BytesIO(response.content))
+        self.assertEqual(image.size, (60, 30))
+        self.assertEqual(image.convert('RGB').getpixel((2, 2)), (255, 0, 0))
+        self.assertEqual(image.convert('RGB').getpixel((3, 0)), (255, 255, 255))
+        self.assertEqual(self.client.get(url, {'scale': 3}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        # Une autre échelle est une autre représentation
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(url, {'scale': 1000}).status_code, 400)
+
+    def test_webp_export(self):
+        response = self.client.get(reverse('canvas-image-webp', kwargs={'pk': self.canvas.pk}))
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        image = Image.open(io.BytesIO(response.content))
+        self.assertEqual((image.format, image.size), ('WEBP', (20, 10)))
+        self.assertEqual(image.convert('RGB').getpixel((0, 0)), (255, 0, 0))
+
+    def test_home_page_ships_thumbnails(self):
+        response = self.client.get(reverse('canvas-home'))
+        self.assertContains(response, f'{self.url}?v={self.canvas.version}')
+        self.assertNotContains(response, '#FFFFFF')
+
+
+class CanvasListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('painter')
+        self.canvases = [
+            Canvas.objects.create(title=f'Canvas {i}', width=3, height=3, author=self.user, pixel_edit_interval=0)
+            for i in range(12)
+        ]
+        for _ in range(2):
+            self.canvases[5].write_pixel(0, 0, "#000000", self.user)
+        self.canvases[7].write_pixel(0, 0, "#000000", self.user)
+
+    def test_edit_count_is_maintained(self):
+        canvas = Canvas.objects.get(pk=self.canvases[5].pk)
+        self.assertEqual(canvas.edit_count, 2)
+        self.assertIsNotNone(canvas.last_edit_at)
+
+    def test_list_is_ordered_and_paginated_without_pixels(self):
+        # Comptage pour la pagination + une requête pour la page (auteurs et profils joints)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('canvas-home'))
+        canvases = list(response.context['canvases'])
+        self.assertEqual(len(canvases), 10)
+        self.assertEqual([c.pk for c in canvases[:2]], [self.canvases[5].pk, self.canvases[7].pk])
+        self.assertIn('palette', canvases[0].get_deferred_fields())
+        self.assertEqual(len(self.client.get(reverse('canvas-home'), {'page': 2}).context['canvases']), 2)
+
+
+class StatisticsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('painter', password='secret', is_staff=True)
+        self.canvas = Canvas.objects.create(title='Stats', width=4, height=4, author=self.user, pixel_edit_interval=0)
+        self.canvas.write_pixel(0, 0, "#000000", self.user)
+
+    def test_hit_and_invalidation_on_write(self):
+        with override_settings(CANVAS_STATISTICS_STALENESS=0):
+            get_cached_statistics(self.canvas)
+            with self.assertNumQueries(0):
+                get_cached_statistics(self.canvas)
+            self.canvas.write_pixel(1, 0, "#000000", self.user)
+            statistics = get_cached_statistics(self.canvas)
+        self.assertEqual(statistics['top_contributors'][0]['contributions'], 2)
+        self.assertEqual(get_counters(), {'hits': 1, 'stale_hits': 0, 'misses': 2})
+
+    def test_busy_canvas_serves_stale_statistics(self):
+        with override_settings(CANVAS_STATISTICS_STALENESS=60):
+            get_cached_statistics(self.canvas)
+            self.canvas.write_pixel(1, 0, "#000000", self.user)
+            statistics = get_cached_statistics(self.canvas)
+        self.assertEqual(statistics['top_contributors'][0]['contributions'], 1)
+        self.assertEqual(get_counters()['stale_hits'], 1)
+
+    def test_counters_endpoint_is_staff_only(self):
+        url = reverse('statistics-cache-counters')
+        self.client.force_login(self.user)
+        self.client.get(reverse('canvas-statistics', kwargs={'pk': self.canvas.pk}))
+        self.assertEqual(self.client.get(url).json()['misses'], 1)
+        self.client.force_login(User.objects.create_user('visitor'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', password='secret')
+        self.bob = User.objects.create_user('bob', password='secret')
+        self.first = Canvas.objects.create(title='First', width=4, height=4, author=self.alice, pixel_edit_interval=0)
+        self.second = Canvas.objects.create(title='Second', width=4, height=4, author=self.bob, pixel_edit_interval=0)
+        now = timezone.now()
+        # Alice : 3 modifications il y a trois jours ; Bob : 2 modifications récentes
+        with mock.patch('blog.models.timezone.now', return_value=now - timedelta(days=3)):
+            self.first.write_pixels([(0, 0, "#FF0000"), (1, 0, "#FF0000")], self.alice)
+            self.second.write_pixel(2, 0, "#FF0000", self.alice)
+        self.first.write_pixel(0, 1, "#00FF00", self.bob)
+        self.second.write_pixel(1, 1, "#00FF00", self.bob)
+
+    def ranking(self, window):
+        return [(entry['username'], entry['count']) for entry in get_leaderboard(window)]
+
+    def test_windows(self):
+        self.assertEqual(self.ranking('all'), [('alice', 3), ('bob', 2)])
+        self.assertEqual(self.ranking('7d'), [('alice', 3), ('bob', 2)])
+        self.assertEqual(self.ranking('24h'), [('bob', 2)])
+        # Les classements en cache sont lus sans requête
+        with self.assertNumQueries(0):
+            get_leaderboard('24h')
+
+    def test_rebuild_matches_incremental_counters(self):
+        def counters():
+            return (
+                list(ContributorTotal.objects.order_by('user_id').values_list('user_id', 'count', 'last_edit_at')),
+                list(HourlyContribution.objects.order_by('user_id', 'hour').values_list('user_id', 'hour', 'count')),
+            )
+        expected = counters()
+        call_command('rebuild_leaderboard', stdout=io.StringIO())
+        self.assertEqual(counters(), expected)
+
+    def test_expired_hourly_counters_are_pruned(self):
+        with mock.patch('blog.models.timezone.now', return_value=timezone.now() - timedelta(days=10)):
+            self.first.write_pixel(3, 3, "#0000FF", self.bob)
+        self.assertEqual(HourlyContribution.objects.filter(user=self.bob).count(), 2)
+        with mock.patch('blog.models.timezone.now', return_value=timezone.now() + timedelta(hours=1)):
+            self.first.write_pixel(3, 3, "#0000FF", self.bob)
+        self.assertEqual(HourlyContribution.objects.filter(user=self.bob).count(), 2)
+        self.assertEqual(ContributorTotal.objects.get(user=self.bob).count, 4)
+
+    def test_api(self):
+        url = reverse('get-leaderboard')
+        response = self.client.get(url, {'window': '7d', 'limit': 1})
+        self.assertEqual(response.json(), {'window': '7d', 'entries': [{'rank': 1, 'username': 'alice', 'count': 3}]})
+        self.assertEqual(self.client.get(url, {'window': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 'x'}).status_code, 400)
+        self.assertContains(self.client.get(reverse('leaderboard'), {'window': '24h'}), 'bob')
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        get_request_metrics().reset()
+        self.user = User.objects.create_user('painter', password='secret')
+        self.canvas = Canvas.objects.create(title='Metrics', width=4, height=4, author=self.user)
+        self.client.force_login(self.user)
+
+    def test_requests_are_measured_by_url_name(self):
+        self.user.is_staff = True
+        self.user.save()
+        for _ in range(3):
+            self.client.get(reverse('get-canvas-data', kwargs={'pk': self.canvas.pk}))
+        self.client.get('/missing-page/')
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_requests_total{view="get-canvas-data",method="GET",status="200"} 3', body)
+        self.assertIn('http_request_duration_seconds_count{view="get-canvas-data"} 3', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="get-canvas-data",le="+Inf"} 3', body)
+        self.assertIn('http_requests_total{view="<unresolved>",method="GET",status="404"} 1', body)
+        self.assertIn('canvas_statistics_cache_total{result="misses"}', body)
+        self.assertIn('community_write_queue{state="pending"} 0', body)
+        queries = next(line for line in body.splitlines() if line.startswith('http_db_queries_total{view="get-canvas-data"}'))
+        self.assertGreater(int(queries.split()[-1]), 0)
+
+    def test_metrics_require_staff_or_allowed_address(self):
+        # Aucune adresse autorisée par défaut, pas même celle d'un reverse proxy local
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_requests_page(self):
+        self.client.get(reverse('get-canvas-data', kwargs={'pk': self.canvas.pk}))
+        self.assertEqual(self.client.get(reverse('slow-requests')).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('slow-requests'))
+        self.assertContains(response, f'/api/canvas/{self.canvas.pk}/get_data/')
+
+
+class BenchmarkTests(TestCase):
+    def test_synthetic_canvas_matches_history(self):
+        users = [User.objects.create(username=f'synthetic{i}') for i in range(3)]
+        canvas = create_synthetic_canvas(users, 8, 8, 40)
+        self.assertEqual((canvas.version, canvas.edit_count), (40, 40))
+        self.assertEqual(canvas.edits.count(), 40)
+        self.assertEqual(sum(DailyContribution.objects.filter(canvas=canvas).values_list('count', flat=True)), 40)
+        # Relire l'historique redonne exactement les pixels enregistrés
+        canvas.refresh_from_db()
+        replayed = state_at(canvas, timezone.now())
+        buffer = canvas.get_pixel_buffer()
+        for x in range(8):
+            for y in range(8):
+                self.assertEqual(replayed.get(x, y), buffer.get(x, y))
+
+    def test_latency_summary_and_baseline(self):
+        summary = latency_summary([i / 1000 for i in range(1, 101)], 2)
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (50, 95, 99))
+        self.assertEqual(summary['throughput_per_second'], 50)
+        comparison = compare_to_baseline({'a': {'p50_ms': 15}, 'label': 'x'}, {'a': {'p50_ms': 10}})
+        self.assertEqual(comparison, {'a.p50_ms': {'baseline': 10, 'current': 15, 'change_percent': 50.0}})
+
+    def test_write_cost_does_not_depend_on_canvas_size(self):
+        # Le scénario vérifie lui-même que chaque écriture envoie le même volume à la base
+        result = bench_write_cost(writes=3, sizes=(TILE_SIZE, 2000))
+        small, large = result['canvases']
+        self.assertEqual(small['bytes_written_per_write'], large['bytes_written_per_write'])
+        self.assertLess(large['bytes_written_per_write'], TILE_SIZE * TILE_SIZE * 2)
+
+
+@override_settings(CANVAS_KEYFRAME_INTERVAL=2)
+class CanvasHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('painter', password='secret')
+        self.canvas = Canvas.objects.create(title='History', width=4, height=2, author=self.user, pixel_edit_interval=0)
+        self.start = timezone.now()
+        self.times = [self.start + timedelta(minutes=i + 1) for i in range(5)]
+        for i, when in enumerate(self.times):
+            with mock.patch('blog.models.timezone.now', return_value=when):
+                self.canvas.write_pixel(i % 4, 0, ["#FF0000", "#00FF00", "#0000FF", "#000000", "#FFFF00"][i], self.user)
+
+    def test_keyframes_are_recorded(self):
+        keyframes = list(self.canvas.keyframes.order_by('edit_id'))
+        self.assertEqual(len(keyframes), 2)
+        self.assertEqual(keyframes[1].timestamp, self.times[3])
+        self.assertEqual(keyframes[1].to_buffer(4, 2).to_matrix()[0], ["#FF0000", "#00FF00", "#0000FF", "#000000"])
+
+    def test_state_at_uses_nearest_keyframe(self):
+        self.assertEqual(state_at(self.canvas, self.start).to_matrix()[0], ["#FFFFFF"] * 4)
+        self.assertEqual(state_at(self.canvas, self.times[2]).to_matrix()[0], ["#FF0000", "#00FF00", "#0000FF", "#FFFFFF"])
+        # Image clé après la 4e modification + une seule modification rejouée
+        CanvasKeyframe.objects.filter(edit_id__lt=self.canvas.keyframes.latest('edit_id').edit_id).delete()
+        with self.assertNumQueries(2):
+            buffer = state_at(self.canvas, self.times[4])
+        self.assertEqual(buffer.to_matrix(), self.canvas.get_pixel_buffer().to_matrix())
+
+    def test_timelapse_gif(self):
+        url = reverse('canvas-timelapse', kwargs={'pk': self.canvas.pk})
+        self.client.force_login(self.user)
+        response = self.client.get(url, {'frames': 6, 'scale': 2})
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        image = Image.open(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual((image.n_frames, image.size), (6, (8, 4)))
+        self.assertEqual(image.convert('RGB').getpixel((0, 0)), (255, 255, 255))
+        image.seek(5)
+        self.assertEqual(image.convert('RGB').getpixel((0, 0)), (255, 255, 0))
+        self.assertEqual(image.convert('RGB').getpixel((7, 0)), (0, 0, 0))
+        self.assertEqual(self.client.get(url, {'frames': 100000}).status_code, 400)
+
+
+class FakeBoardHandler(BaseHTTPRequestHandler):
+    """Serveur local remplaçant colors.txt (avec ETag) pendant les tests."""
+    body = b"FFFFFF;000000\nFF0000;00FF00\n"
+    requests = []
+
+    def do_GET(self):
+        FakeBoardHandler.requests.append(self.headers.get('If-None-Match'))
+        etag = f'"{hash(self.body)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CommunityMirrorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        FakeBoardHandler.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBoardHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.settings = override_settings(
+            COMMUNITY_BOARD_URL=f'http://127.0.0.1:{self.server.server_port}/colors.txt',
+            COMMUNITY_BACKGROUND_REFRESH=False,
+            COMMUNITY_REFRESH_INTERVAL=0,
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def test_conditional_refresh(self):
+        mirror = CommunityMirror()
+        snapshot = mirror.refresh()
+        self.assertEqual((snapshot['version'], snapshot['width'], snapshot['height']), (1, 2, 2))
+        self.assertEqual(mirror.get_board()[1], bytes.fromhex('FFFFFF000000FF000000FF00'))
+        self.assertEqual(mirror.refresh()['version'], 1)
+        # Le deuxième téléchargement est conditionnel et reçoit 304
+        self.assertEqual(FakeBoardHandler.requests, [None, snapshot['etag']])
+
+    def test_parse_and_diff(self):
+        width, height, data = parse_board_lines([b'FFFFFF;000000', b'ff0000;00FF00', b''])
+        self.assertEqual((width, height, data), (2, 2, bytes.fromhex('FFFFFF000000FF000000FF00')))
+        with self.assertRaises(ValueError):
+            parse_board_lines([b'FFFFFF;000000', b'FFFFFF'])
+        # Une case illisible devient blanche et un ";" final est ignoré : le reste de la toile est conservé
+        with self.assertLogs('blog.community', 'WARNING'):
+            board = parse_board_lines([b'FFFFFF;00000G;', b'000000;#ff0000', b'123;000000', b'000000;000000;'])
+        self.assertEqual(board, (2, 4, bytes.fromhex('FFFFFFFFFFFF000000FF0000FFFFFF000000000000000000')))
+        new = bytes.fromhex('FFFFFF000000FF0000123456')
+        self.assertEqual(diff_boards(2, data, new), [[1, 1, '#123456']])
+
+    def test_changes_endpoint(self):
+        url = reverse('get-community-changes')
+        CommunityMirror().refresh()
+        self.assertEqual(self.client.get(url, {'since': 1}).json(), {'version': 1, 'changes': []})
+        FakeBoardHandler.body = b"FFFFFF;000000\nFF0000;0000FF\n"
+        self.addCleanup(setattr, FakeBoardHandler, 'body', b"FFFFFF;000000\nFF0000;00FF00\n")
+        CommunityMirror().refresh()
+        self.assertEqual(self.client.get(url, {'since': 1}).json(), {'version': 2, 'changes': [[1, 1, '#0000FF']]})
+        self.assertTrue(self.client.get(url, {'since': 0}).json()['resync'])
+
+        response = self.client.get(reverse('community-board'), {'v': 2})
+        image = Image.open(io.BytesIO(response.content)).convert('RGB')
+        self.assertEqual((image.size, image.getpixel((1, 1))), ((2, 2), (0, 0, 255)))
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_page_serves_last_good_snapshot(self):
+        response = self.client.get(reverse('blog-community'))
+        self.assertEqual((response.context['version'], response.context['canvas_width']), (1, 20))
+        self.assertFalse(response.context['stale'])
+
+        # Serveur distant arrêté : la dernière copie reste servie, signalée comme périmée
+        self.server.shutdown()
+        self.server.server_close()
+        with override_settings(COMMUNITY_STALE_AFTER=-1):
+            response = self.client.get(reverse('blog-community'))
+        self.assertEqual(response.context['version'], 1)
+        self.assertTrue(response.context['stale'])
+        self.assertContains(response, 'may be out of date')
+
+
+class FakeWriterHandler(BaseHTTPRequestHandler):
+    """Serveur local remplaçant writer.php : les `failures` premières requêtes échouent."""
+    failures = 0
+    writes = []
+
+    def do_GET(self):
+        if FakeWriterHandler.failures > 0:
+            FakeWriterHandler.failures -= 1
+            self.send_response(500)
+        else:
+            FakeWriterHandler.writes.append(self.path.split('?', 1)[1])
+            self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class CommunityWriteQueueTests(TestCase):
+    def setUp(self):
+        FakeWriterHandler.failures = 0
+        FakeWriterHandler.writes = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeWriterHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.settings = override_settings(
+            COMMUNITY_WRITER_URL=f'http://127.0.0.1:{self.server.server_port}/writer.php',
+            COMMUNITY_USERNAME='user', COMMUNITY_PASSWORD='secret', COMMUNITY_WRITE_BACKOFF=0.01,
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def test_repeated_writes_are_coalesced(self):
+        queue = CommunityWriteQueue(workers=2)
+        queue.enqueue(1, 2, '000000')
+        queue.enqueue(3, 4, 'FF0000')
+        queue.enqueue(1, 2, '00FF00')
+        self.assertEqual(queue.metrics()['depth'], 2)
+        queue.start()
+        self.assertTrue(queue.join(timeout=5))
+        self.assertEqual(sorted(FakeWriterHandler.writes), [
+            'username=user&password=secret&row=1&col=2&hexvalue=00FF00',
+            'username=user&password=secret&row=3&col=4&hexvalue=FF0000',
+        ])
+        metrics = queue.metrics()
+        self.assertEqual((metrics['accepted'], metrics['coalesced']), (2, 1))
+        self.assertEqual(metrics['accepted'], metrics['sent'] + metrics['failed'])
+
+    def test_failures_are_retried_then_counted(self):
+        FakeWriterHandler.failures = 2
+        with override_settings(COMMUNITY_WRITE_RETRIES=2):
+            queue = CommunityWriteQueue(workers=1)
+            queue.start()
+            queue.enqueue(0, 0, '000000')
+            self.assertTrue(queue.join(timeout=5))
+            FakeWriterHandler.failures = 10
+            queue.enqueue(0, 1, '000000')
+            self.assertTrue(queue.join(timeout=5))
+        metrics = queue.metrics()
+        self.assertEqual((metrics['sent'], metrics['retries'], metrics['failed']), (1, 4, 1))
+
+    def test_full_queue_rejects_writes(self):
+        queue = CommunityWriteQueue(workers=1, max_size=1)
+        self.assertTrue(queue.enqueue(0, 0, '000000'))
+        self.assertFalse(queue.enqueue(0, 1, '000000'))
+        self.assertEqual(queue.metrics()['rejected'], 1)
+
+    def test_view_acknowledges_immediately(self):
+        with mock.patch('blog.views.get_community_write_queue') as get_queue:
+            get_queue.return_value.enqueue.return_value = True
+            response = self.client.get(reverse('update_pixel_community'), {'row': 1, 'col': 2, 'hexvalue': 'ABCDEF'})
+            self.assertEqual(response.status_code, 202)
+            get_queue.return_value.enqueue.assert_called_once_with(1, 2, 'ABCDEF')
+            self.assertEqual(self.client.get(reverse('update_pixel_community'), {'row': 1, 'col': 2, 'hexvalue': 'xyz'}).status_code, 400)
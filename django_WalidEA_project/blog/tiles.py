@@ -0,0 +1,179 @@
+"""
+Découpage des toiles en tuiles carrées de TILE_SIZE x TILE_SIZE pixels.
+
+Les tuiles sont l'unité de stockage des pixels (une ligne CanvasTile par tuile modifiée au
+moins une fois) : une écriture ne lit et ne réécrit que les tuiles qu'elle modifie, son coût
+ne dépend donc pas de la taille de la toile. Chaque tuile a sa propre version : la version de
+la toile lors de la dernière modification d'un de ses pixels. Une tuile peut donc être servie,
+mise en cache et revalidée (ETag) indépendamment des autres : seules les tuiles visibles
+d'une grande toile sont téléchargées par la page de détail.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .pixels import DEFAULT_COLOR, PixelBuffer, normalize_color
+
+# Taille (en pixels) du côté d'une tuile ; changer cette valeur invalide les CanvasTile enregistrées
+TILE_SIZE = 64
+
+
+def tile_grid(width, height):
+    """Nombre de tuiles (colonnes, lignes) d'une toile."""
+    return -(-width // TILE_SIZE), -(-height // TILE_SIZE)
+
+
+def tile_bounds(tx, ty, width, height):
+    """Retourne (x, y, largeur, hauteur) de la tuile (tx, ty) ; les tuiles du bord sont plus petites."""
+    x0, y0 = tx * TILE_SIZE, ty * TILE_SIZE
+    return x0, y0, min(TILE_SIZE, width - x0), min(TILE_SIZE, height - y0)
+
+
+class TiledPixelBuffer(PixelBuffer):
+    """
+    Pixels d'une toile découpés en tuiles : {(tx, ty): un octet par pixel de la tuile, ligne par
+    ligne}, les index désignant la palette commune de la toile. Une tuile absente est entièrement
+    de la couleur de fond (palette[0]) : une toile vide ne coûte rien à créer ni à stocker.
+    Modifier un pixel ne touche que sa tuile, ajoutée à `modified` pour être enregistrée.
+    Le tampon dense de toute la toile n'est construit qu'à la première lecture de `data`.
+    """
+
+    def __init__(self, width, height, palette, tiles=None):
+        self.width = width
+        self.height = height
+        self.palette = list(palette) or [DEFAULT_COLOR]
+        self._index = {color: i for i, color in enumerate(self.palette)}
+        columns, rows = tile_grid(width, height)
+        self.tiles = {}
+        for (tx, ty), data in (tiles or {}).items():
+            # Tuiles hors de la grille ou de mauvaise taille (format invalide) : fond
+            if tx < columns and ty < rows:
+                _, _, w, h = tile_bounds(tx, ty, width, height)
+                if len(data) == w * h:
+                    self.tiles[tx, ty] = bytearray(data)
+        self.modified = set()
+        self._data = None
+
+    @classmethod
+    def blank(cls, width, height, color=DEFAULT_COLOR):
+        """Crée une toile vide, entièrement de la couleur de fond (aucune tuile)."""
+        return cls(width, height, [normalize_color(color)])
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """Découpe un tampon dense en tuiles ; les tuiles entièrement de la couleur de fond sont omises."""
+        tiled = cls(buffer.width, buffer.height, buffer.palette)
+        data = bytes(buffer.data)
+        columns, rows = tile_grid(buffer.width, buffer.height)
+        for ty in range(rows):
+            for tx in range(columns):
+                tile = extract_tile(data, buffer.width, *tile_bounds(tx, ty, buffer.width, buffer.height))
+                if tile.count(0) != len(tile):
+                    tiled.tiles[tx, ty] = bytearray(tile)
+        return tiled
+
+    @property
+    def data(self):
+        """Tampon dense (un octet par pixel), construit à la première lecture puis maintenu par set()."""
+        if self._data is None:
+            data = bytearray(self.width * self.height)
+            for (tx, ty), tile in self.tiles.items():
+                x0, y0, w, h = tile_bounds(tx, ty, self.width, self.height)
+                for row in range(h):
+                    start = (y0 + row) * self.width + x0
+                    data[start:start + w] = tile[row * w:(row + 1) * w]
+            self._data = data
+        return self._data
+
+    def get_tile(self, tx, ty):
+        """Retourne les octets de la tuile (tx, ty), ligne par ligne."""
+        tile = self.tiles.get((tx, ty))
+        if tile is None:
+            _, _, w, h = tile_bounds(tx, ty, self.width, self.height)
+            return bytes(w * h)
+        return bytes(tile)
+
+    def get(self, x, y):
+        """Retourne la couleur "#RRGGBB" du pixel (x, y)."""
+        tile = self.tiles.get((x // TILE_SIZE, y // TILE_SIZE))
+        if tile is None:
+            return self.palette[0]
+        w = min(TILE_SIZE, self.width - x // TILE_SIZE * TILE_SIZE)
+        return self.palette[tile[(y % TILE_SIZE) * w + x % TILE_SIZE]]
+
+    def set(self, x, y, color):
+        """
+        Modifie la couleur du pixel (x, y) en écrivant un seul octet de sa tuile.
+        Retourne la couleur réellement stockée (elle peut différer si la palette est pleine).
+        """
+        index = self.color_index(color)
+        key = (x // TILE_SIZE, y // TILE_SIZE)
+        _, _, w, h = tile_bounds(*key, self.width, self.height)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.tiles[key] = bytearray(w * h)
+        tile[(y % TILE_SIZE) * w + x % TILE_SIZE] = index
+        self.modified.add(key)
+        if self._data is not None:
+            self._data[y * self.width + x] = index
+        return self.palette[index]
+
+    def to_bytes(self):
+        """Retourne les octets de toute la toile au format dense (un octet par pixel)."""
+        return bytes(self.data)
+
+
+def extract_tile(data, width, x0, y0, w, h):
+    """Extrait les octets d'un rectangle d'un tampon dense de `width` pixels de large, ligne par ligne."""
+    return b''.join(data[(y0 + row) * width + x0:(y0 + row) * width + x0 + w] for row in range(h))
+
+
+def render_tile(buffer, tx, ty):
+    """
+    Extrait une tuile du tampon de pixels. Retourne un dictionnaire avec sa position,
+    sa taille, sa palette (couleurs utilisées dans la tuile uniquement) et ses pixels
+    (un octet par pixel, index dans cette palette, encodés en base64).
+    """
+    x0, y0, width, height = tile_bounds(tx, ty, buffer.width, buffer.height)
+    tile = buffer.get_tile(tx, ty)
+    # Palette locale : les index de la toile sont renumérotés en une seule passe
+    used = sorted(set(tile))
+    table = bytearray(256)
+    for local_index, index in enumerate(used):
+        table[index] = local_index
+    return {
+        'x': x0,
+        'y': y0,
+        'width': width,
+        'height': height,
+        'palette': [buffer.palette[index] for index in used],
+        'pixels': base64.b64encode(tile.translate(table)).decode('ascii'),
+    }
+
+
+def get_tile(canvas_id, tx, ty, tile_version):
+    """
+    Retourne le JSON (octets) de la tuile (tx, ty), mis en cache pour sa version :
+    les modifications des autres tuiles ne l'invalident pas. En l'absence de la tuile
+    dans le cache, seules cette tuile et la palette de la toile sont lues, dans cet ordre :
+    la palette ne fait que grandir, elle contient donc toutes les couleurs de la tuile lue.
+    """
+    key = f'canvas-tile:{canvas_id}:{tx}:{ty}:{tile_version}'
+    data = cache.get(key)
+    if data is None:
+        from .models import Canvas, CanvasTile
+
+        row = CanvasTile.objects.filter(canvas_id=canvas_id, tx=tx, ty=ty).values_list('version', 'pixels').first()
+        canvas = Canvas.objects.only('width', 'height', 'palette').get(pk=canvas_id)
+        # La tuile a pu être modifiée depuis la lecture de tile_version
+        tile_version, pixels = row if row is not None else (0, None)
+        buffer = TiledPixelBuffer(canvas.width, canvas.height, canvas.palette,
+                                  {(tx, ty): pixels} if pixels is not None else None)
+        tile = render_tile(buffer, tx, ty)
+        tile.update(tx=tx, ty=ty, version=tile_version)
+        data = json.dumps(tile).encode()
+        cache.set(f'canvas-tile:{canvas_id}:{tx}:{ty}:{tile_version}', data,
+                  getattr(settings, 'CANVAS_IMAGE_CACHE_TIMEOUT', 3600))
+    return data
@@ -6,6 +6,8 @@ from .views import (
     CanvasDeleteView,       # Vue pour supprimer un canvas
     update_pixel,           # Vue pour modifier un pixel spécifique
     get_canvas_data,        # Vue pour récupérer les données d'un canvas
+    get_canvas_changes,     # Vue pour récupérer les pixels modifiés depuis une version
+    get_canvas_cooldown,    # Vue pour connaître le temps restant avant la prochaine modification
 )
 from . import views  # Import de la vue 'community' et autres fonctions
 
@@ -17,6 +19,16 @@ urlpatterns = [
     # Détail d'un canvas spécifique, avec son ID dans l'URL
     path('canvas/<int:pk>/', CanvasDetailView.as_view(), name='canvas-detail'),
     
+    # Miniature PNG d'un canvas (page d'accueil)
+    path('canvas/<int:pk>/thumbnail.png', views.canvas_thumbnail, name='canvas-thumbnail'),
+
+    # Export d'un canvas en image (?scale=N pour agrandir chaque pixel)
+    path('canvas/<int:pk>/image.png', views.canvas_image, {'image_format': 'png'}, name='canvas-image-png'),
+    path('canvas/<int:pk>/image.webp', views.canvas_image, {'image_format': 'webp'}, name='canvas-image-webp'),
+
+    # Time-lapse d'un canvas en GIF animé (?frames=N&duration=ms&scale=N)
+    path('canvas/<int:pk>/timelapse.gif', views.canvas_timelapse, name='canvas-timelapse'),
+
     # Création d'un nouveau canvas
     path('canvas/new/', CanvasCreateView.as_view(), name='canvas-create'),
     
@@ -27,16 +39,49 @@ urlpatterns = [
     
     # API pour la mise à jour d'un pixel d'un canvas spécifique via une requête POST
     path('api/canvas/<int:pk>/update_pixel/', update_pixel, name='update-pixel'),
+
+    # API pour la mise à jour de plusieurs pixels en une seule requête (JSON ou binaire)
+    path('api/canvas/<int:pk>/update_pixels/', views.update_pixels, name='update-pixels'),
     
     # API pour récupérer les données d'un canvas spécifique, utilisé pour les mises à jour en temps réel
     path('api/canvas/<int:pk>/get_data/', get_canvas_data, name='get-canvas-data'),
+
+    # API pour récupérer une tuile d'un canvas (seules les tuiles visibles sont chargées par la page)
+    path('api/canvas/<int:pk>/tiles/<int:tx>/<int:ty>/', views.canvas_tile, name='canvas-tile'),
+
+    # API pour récupérer uniquement les pixels modifiés depuis une version (?since=<version>)
+    path('api/canvas/<int:pk>/changes/', get_canvas_changes, name='get-canvas-changes'),
+
+    # API pour connaître le temps restant avant de pouvoir modifier un pixel
+    path('api/canvas/<int:pk>/cooldown/', get_canvas_cooldown, name='get-canvas-cooldown'),
+
+    # Flux Server-Sent Events des modifications d'un canvas (serveur ASGI uniquement)
+    path('api/canvas/<int:pk>/events/', views.canvas_events, name='canvas-events'),
     
     # Page "Community" où les utilisateurs interagissent avec une toile commune
     path('community/', views.community, name='blog-community'),
     
+    # Image PNG de la toile commune et cases modifiées depuis une version (?since=<version>)
+    path('community/board.png', views.community_board, name='community-board'),
+    path('api/community/changes/', views.get_community_changes, name='get-community-changes'),
+
     # Mise à jour d'un pixel pour la communauté (interactions avec la toile B2)
     path('community/update_pixel/', views.updatePixelCommunity, name='update_pixel_community'),
     
     # Statistiques détaillées d'un canvas spécifique
     path('canvas/<int:pk>/statistics/', views.canvas_statistics, name='canvas-statistics'),
+
+    # Classement général des contributeurs (page et API)
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('api/leaderboard/', views.get_leaderboard_data, name='get-leaderboard'),
+
+    # Compteurs hits/misses du cache des statistiques (monitoring, staff uniquement)
+    path('api/monitoring/statistics-cache/', views.statistics_cache_counters, name='statistics-cache-counters'),
+
+    # Taille de la file d'envoi vers la toile commune et compteurs d'échecs (monitoring, staff uniquement)
+    path('api/monitoring/community-writes/', views.community_write_metrics, name='community-write-metrics'),
+
+    # Mesures des requêtes au format Prometheus et dernières requêtes lentes (staff uniquement)
+    path('metrics', views.metrics, name='metrics'),
+    path('monitoring/slow-requests/', views.slow_requests, name='slow-requests'),
 ]
@@ -1,16 +1,33 @@
-from datetime import timezone
+from datetime import datetime, timezone
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
+import asyncio
 import json
-from django.http import JsonResponse
-from django.http import JsonResponse
-from .models import Canvas
-import requests
-from django.db.models import Count
+import math
+import struct
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+from django.core.handlers.asgi import ASGIRequest
+from .models import Canvas, CanvasChange, CanvasTile, CanvasWriteConflict
+from .ratelimit import get_cooldown_policy, get_rate_limiter
+from .pixels import validate_pixels
+from .broadcast import get_broadcaster
+from .rendering import IMAGE_FORMATS, get_export, get_max_export_size, get_thumbnail, get_thumbnail_size
+from .statistics import get_cached_statistics, get_counters
+from .tiles import TILE_SIZE, get_tile, tile_grid
+from .history import get_max_frames, iter_frames, iter_gif
+from .community import get_community_image, get_community_mirror
+from .community_writes import METRIC_NAMES as COMMUNITY_WRITE_METRIC_NAMES, get_community_write_queue
+from .metrics import format_counters, get_request_metrics
+from .leaderboard import WINDOWS as LEADERBOARD_WINDOWS, get_leaderboard
+from .wire import CONTENT_TYPE as WIRE_CONTENT_TYPE, accepts_binary, accepts_gzip, get_canvas_payload
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import OuterRef, Subquery
+from django.conf import settings
 
 
 # Page d'accueil : liste tous les canvas
@@ -18,17 +35,17 @@ class CanvasListView(ListView):
     model = Canvas
     template_name = 'blog/home.html'  # Le template utilisé pour la page d'accueil
     context_object_name = 'canvases'
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        # Convertir le contenu en JSON valide pour l'utiliser dans le template
-        for canvas in context['canvases']:
-            canvas.content = json.dumps(canvas.content)
-        return context
+    paginate_by = 10  # Nombre de canvas par page
 
     def get_queryset(self):
-        # Trier uniquement par nombre de contributions
-        return Canvas.objects.annotate(num_contributions=Count('contributions')).order_by('-num_contributions')  # Trier uniquement par nombre de contributions
+        # Trier par nombre de contributions (colonne maintenue et indexée, sans GROUP BY)
+        # Seuls les champs affichés sont chargés : chaque toile est affichée par sa miniature
+        return (
+            Canvas.objects.select_related('author__profile')
+            .only('title', 'width', 'height', 'pixel_edit_interval', 'version', 'edit_count',
+                  'author__username', 'author__profile__image', 'author__profile__image_variants')
+            .order_by('-edit_count', '-id')
+        )
     
 # Détail d'un canvas
 class CanvasDetailView(LoginRequiredMixin, DetailView):
@@ -36,11 +53,14 @@ class CanvasDetailView(LoginRequiredMixin, DetailView):
     template_name = 'blog/canvas_detail.html'
     context_object_name = 'canvas'
 
+    def get_queryset(self):
+        # Les pixels ne sont pas envoyés dans la page : ils sont chargés par tuiles (voir canvas_tile)
+        return Canvas.objects.select_related('author').defer('palette')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Encoder le contenu en JSON valide
-        context['content_json'] = json.dumps(self.object.content)
-        
+        context['tile_size'] = TILE_SIZE
+
          # Vérifier si l'utilisateur est le créateur et ajouter un bouton de suppression
         if self.object.author == self.request.user:
             context['can_delete'] = True
@@ -55,10 +75,8 @@ class CanvasCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        response = super().form_valid(form)
-        # Initialise la toile après création
-        self.object.initialize_canvas()
-        return response
+        # La toile est créée vide (aucune tuile) : aucun pixel n'est stocké ni écrit
+        return super().form_valid(form)
 
 
 
@@ -72,8 +90,8 @@ class CanvasStatisticsView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Récupérer les statistiques de la toile
-        statistics = self.object.get_statistics()
+        # Récupérer les statistiques de la toile (depuis le cache si possible)
+        statistics = get_cached_statistics(self.object)
 
         # Ajouter les statistiques au contexte
         context['daily_contributions'] = statistics['daily_contributions']
@@ -99,56 +117,379 @@ class CanvasDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 def update_pixel(request, pk):
     if request.method == 'POST':
         try:
-            canvas = Canvas.objects.get(pk=pk)
-            x, y, color = json.loads(request.body).get("x"), json.loads(request.body).get("y"), json.loads(request.body).get("color")
-            
+            data = json.loads(request.body)
+            x, y, color = data.get("x"), data.get("y"), data.get("color")
+
+            # Vérifier la modification et l'intervalle de modification avant de charger le contenu de la toile
+            row = Canvas.objects.filter(pk=pk).values_list('pixel_edit_interval', 'author_id', 'width', 'height').first()
+            if row is None:
+                raise Canvas.DoesNotExist
+            # Même validation (et même forme d'erreur) que les lots d'update_pixels
+            valid, results = validate_pixels([(x, y, color)], row[2], row[3])
+            if not valid:
+                return JsonResponse({"error": results[0]['error'], "results": results}, status=400)
+            x, y, color = valid[0]
+            interval, _ = get_cooldown_policy(request.user, row[1], row[0])
+            limiter = get_rate_limiter()
+            allowed, time_left = limiter.acquire(pk, request.user.id, interval)
+            if not allowed:
+                # Si l'utilisateur essaie de modifier trop tôt
+                return JsonResponse({"error": f"Please wait {math.ceil(time_left)} seconds before editing again."}, status=403)
+
             # Essayer de mettre à jour le pixel
-            success = canvas.update_pixel(x, y, color, request.user)
+            try:
+                canvas = Canvas.objects.get(pk=pk)
+                success = canvas.write_pixel(x, y, color, request.user)
+            except Exception:
+                limiter.release(pk, request.user.id)
+                raise
 
             if success:
                 return JsonResponse({"message": "Pixel updated successfully!"}, status=200)
             else:
-                # Si l'utilisateur essaie de modifier trop tôt
-                time_left = canvas.pixel_edit_interval - (timezone.now().timestamp() - canvas.last_edit_timestamps.get(str(request.user.id), 0))
-                return JsonResponse({"error": f"Please wait {int(time_left)} seconds before editing again."}, status=403)
-                
+                # Coordonnées invalides : l'intervalle de modification n'est pas consommé
+                limiter.release(pk, request.user.id)
+                return JsonResponse({"error": "Invalid pixel coordinates"}, status=400)
+
         except Canvas.DoesNotExist:
             return JsonResponse({"error": "Canvas not found"}, status=404)
+        except CanvasWriteConflict as e:
+            # Trop d'écritures concurrentes sur la toile : le client peut réessayer
+            return JsonResponse({"error": str(e)}, status=409)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
 
+# Format binaire d'une modification : x et y sur 2 octets (big-endian) puis r, g, b sur 1 octet
+BULK_PIXEL_RECORD = struct.Struct('>HHBBB')
+
+
+def parse_bulk_pixels(request):
+    """
+    Lit le lot de modifications envoyé à update_pixels, au format JSON
+    {"pixels": [{"x": .., "y": .., "color": "#RRGGBB"}, ...]} ou binaire
+    (Content-Type application/octet-stream, enregistrements BULK_PIXEL_RECORD).
+    Retourne une liste de (x, y, couleur) ; lève une ValueError si le contenu est mal formé.
+    """
+    if request.content_type == 'application/octet-stream':
+        body = request.body
+        if len(body) % BULK_PIXEL_RECORD.size:
+            raise ValueError("Invalid binary payload")
+        return [(x, y, f'#{r:02X}{g:02X}{b:02X}') for x, y, r, g, b in BULK_PIXEL_RECORD.iter_unpack(body)]
+    pixels = json.loads(request.body).get('pixels')
+    if not isinstance(pixels, list) or not all(isinstance(pixel, dict) for pixel in pixels):
+        raise ValueError("Invalid pixel list")
+    return [(pixel.get('x'), pixel.get('y'), pixel.get('color')) for pixel in pixels]
 
-# API pour récupérer les données d'un canvas
+
+# API pour modifier plusieurs pixels en une seule requête (outils de modération, tampons, scripts)
+# Le lot est appliqué en une seule transaction : une seule nouvelle version de la toile
+@csrf_exempt
+@login_required
+def update_pixels(request, pk):
+    if request.method != 'POST':
+        return JsonResponse({"error": "Invalid request method"}, status=405)
+    try:
+        pixels = parse_bulk_pixels(request)
+    except (ValueError, AttributeError):
+        return JsonResponse({"error": "Invalid payload"}, status=400)
+
+    row = Canvas.objects.filter(pk=pk).values_list('pixel_edit_interval', 'author_id').first()
+    if row is None:
+        return JsonResponse({"error": "Canvas not found"}, status=404)
+    interval, max_pixels = get_cooldown_policy(request.user, row[1], row[0])
+    if not pixels or len(pixels) > max_pixels:
+        return JsonResponse({"error": f"A batch must contain between 1 and {max_pixels} pixels."}, status=400)
+
+    limiter = get_rate_limiter()
+    allowed, time_left = limiter.acquire(pk, request.user.id, interval)
+    if not allowed:
+        return JsonResponse({"error": f"Please wait {math.ceil(time_left)} seconds before editing again."}, status=403)
+
+    try:
+        canvas = Canvas.objects.get(pk=pk)
+        valid, results = validate_pixels(pixels, canvas.width, canvas.height)
+        if not valid:
+            # Aucune modification valide : l'intervalle de modification n'est pas consommé
+            limiter.release(pk, request.user.id)
+            return JsonResponse({"error": "No valid pixel in batch", "results": results}, status=400)
+        stored_colors = iter(canvas.write_pixels(valid, request.user))
+    except CanvasWriteConflict as e:
+        limiter.release(pk, request.user.id)
+        return JsonResponse({"error": str(e)}, status=409)
+    except Exception:
+        limiter.release(pk, request.user.id)
+        raise
+
+    for result in results:
+        if result['status'] == 'ok':
+            result['color'] = next(stored_colors)
+    return JsonResponse({"version": canvas.version, "results": results}, status=200)
+
+
+# API pour connaître le temps restant avant de pouvoir modifier un pixel
+@login_required
+def get_canvas_cooldown(request, pk):
+    """
+    Retourne l'intervalle de modification applicable à l'utilisateur, le nombre maximal de pixels
+    par modification et le temps restant avant la prochaine.
+    """
+    row = Canvas.objects.filter(pk=pk).values_list('pixel_edit_interval', 'author_id').first()
+    if row is None:
+        return JsonResponse({'error': 'Canvas not found'}, status=404)
+    interval, max_pixels = get_cooldown_policy(request.user, row[1], row[0])
+    remaining = get_rate_limiter().remaining(pk, request.user.id)
+    return JsonResponse({'interval': interval, 'max_pixels': max_pixels, 'remaining': round(remaining, 3)}, status=200)
+
+
+# API pour récupérer les données d'un canvas (JSON, ou format binaire compact si le client le demande)
 @login_required
 def get_canvas_data(request, pk):
     """Récupère les données actuelles du canvas pour mise à jour dynamique."""
+    if accepts_binary(request):
+        # Seule la version est lue : les pixels ne sont chargés qu'en l'absence du cache
+        version = Canvas.objects.filter(pk=pk).values_list('version', flat=True).first()
+        if version is None:
+            return JsonResponse({'error': 'Canvas not found'}, status=404)
+        compressed = accepts_gzip(request)
+        try:
+            data = get_canvas_payload(pk, version, compressed)
+        except Canvas.DoesNotExist:
+            # Canvas supprimé depuis la lecture de sa version
+            return JsonResponse({'error': 'Canvas not found'}, status=404)
+        response = HttpResponse(data, content_type=WIRE_CONTENT_TYPE)
+        if compressed:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
     try:
         canvas = Canvas.objects.get(pk=pk)
-        return JsonResponse({'content': json.dumps(canvas.content)}, status=200)
+        response = JsonResponse({'content': json.dumps(canvas.get_content()), 'version': canvas.version}, status=200)
     except Canvas.DoesNotExist:
         return JsonResponse({'error': 'Canvas not found'}, status=404)
+    # Le format dépend de l'en-tête Accept : les caches ne doivent pas mélanger les deux
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+# API pour récupérer uniquement les pixels modifiés depuis une version donnée
+@login_required
+def get_canvas_changes(request, pk):
+    """
+    Retourne les pixels modifiés depuis la version `since` passée en paramètre.
+    Si le client est trop en retard pour le journal des changements, retourne un marqueur "resync".
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid version'}, status=400)
+
+    # Seule la version est lue : le contenu de la toile n'est pas chargé
+    version = Canvas.objects.filter(pk=pk).values_list('version', flat=True).first()
+    if version is None:
+        return JsonResponse({'error': 'Canvas not found'}, status=404)
+
+    changes = CanvasChange.since(pk, version, since)
+    if changes is None:
+        return JsonResponse({'version': version, 'resync': True}, status=200)
+    return JsonResponse({'version': version, 'changes': changes}, status=200)
+
+
+
+
+def get_tile_version(pk, tx, ty):
+    """Version de la tuile (tx, ty) d'un canvas, lue sans charger ses pixels (None si elle n'existe pas)."""
+    # Une seule requête : dimensions du canvas et version de la tuile (0 si elle n'a jamais été modifiée)
+    tile_version = CanvasTile.objects.filter(canvas_id=OuterRef('pk'), tx=tx, ty=ty).values('version')[:1]
+    row = Canvas.objects.filter(pk=pk).values_list('width', 'height', Subquery(tile_version)).first()
+    if row is None:
+        return None
+    width, height, version = row
+    columns, rows = tile_grid(width, height)
+    if tx >= columns or ty >= rows:
+        return None
+    return version or 0
 
 
+def canvas_tile_etag(request, pk, tx, ty):
+    tile_version = get_tile_version(pk, tx, ty)
+    return f'{pk}-tile-{tx}-{ty}-{tile_version}' if tile_version is not None else None
+
+
+# API pour récupérer une tuile de TILE_SIZE x TILE_SIZE pixels d'un canvas (pixels en base64 + palette)
+# Chaque tuile a sa propre version : elle n'est renvoyée que si elle a changé (ETag)
+@login_required
+@condition(etag_func=canvas_tile_etag)
+def canvas_tile(request, pk, tx, ty):
+    tile_version = get_tile_version(pk, tx, ty)
+    if tile_version is None:
+        return JsonResponse({'error': 'Tile not found'}, status=404)
+    try:
+        data = get_tile(pk, tx, ty, tile_version)
+    except Canvas.DoesNotExist:
+        # Canvas supprimé depuis la lecture de la version de la tuile
+        return JsonResponse({'error': 'Tile not found'}, status=404)
+    response = HttpResponse(data, content_type='application/json')
+    set_image_cache_control(request, response, tile_version)
+    return response
+
+
+# Flux Server-Sent Events des modifications d'un canvas (nécessite un serveur ASGI)
+@login_required
+async def canvas_events(request, pk):
+    """
+    Pousse au client les pixels modifiés dès qu'une écriture est validée.
+    Le premier événement ("hello") donne la version courante pour que le client rattrape
+    les modifications manquées via l'API des changements.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Sous WSGI, un flux infini bloquerait un worker : le client utilise le polling
+        return JsonResponse({'error': 'Live updates require an ASGI server'}, status=501)
+
+    broadcaster = get_broadcaster()
+    # Abonnement avant la lecture de la version pour ne manquer aucune modification
+    subscription = broadcaster.subscribe(pk)
+    version = await Canvas.objects.filter(pk=pk).values_list('version', flat=True).afirst()
+    if version is None:
+        broadcaster.unsubscribe(subscription)
+        return JsonResponse({'error': 'Canvas not found'}, status=404)
+
+    keepalive = getattr(settings, 'CANVAS_EVENTS_KEEPALIVE', 15)
+
+    async def stream():
+        try:
+            yield f"retry: 2000\nevent: hello\ndata: {json.dumps({'version': version})}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"  # Commentaire SSE pour garder la connexion ouverte
+                    continue
+                yield f"data: {json.dumps(message)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Désactiver la mise en tampon des proxys (nginx)
+    return response
+
+
+def canvas_version_etag(canvas_id, *parts):
+    """ETag d'une représentation d'un canvas : ne dépend que de sa version (None si le canvas n'existe pas)."""
+    version = Canvas.objects.filter(pk=canvas_id).values_list('version', flat=True).first()
+    if version is None:
+        return None
+    return '-'.join(str(part) for part in (canvas_id, version, *parts))
+
+
+def set_image_cache_control(request, response, version):
+    """
+    Les URLs contenant la version courante (?v=<version>) ne changent jamais de contenu :
+    elles peuvent être mises en cache longtemps. Les autres doivent être revalidées (ETag).
+    """
+    if request.GET.get('v') == str(version):
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+
+
+# Miniature PNG d'un canvas, utilisée par la page d'accueil
+@condition(etag_func=lambda request, pk: canvas_version_etag(pk, 'thumbnail', get_thumbnail_size()))
+def canvas_thumbnail(request, pk):
+    try:
+        canvas = Canvas.objects.get(pk=pk)
+    except Canvas.DoesNotExist:
+        return JsonResponse({'error': 'Canvas not found'}, status=404)
+    response = HttpResponse(get_thumbnail(canvas), content_type='image/png')
+    set_image_cache_control(request, response, canvas.version)
+    return response
+
+
+def get_export_scale(request, width, height):
+    """
+    Lit le paramètre `scale` (agrandissement entier, 1 par défaut).
+    Retourne None si la valeur est invalide ou si l'image dépasserait CANVAS_EXPORT_MAX_SIZE.
+    """
+    try:
+        scale = int(request.GET.get('scale', 1))
+    except ValueError:
+        return None
+    if scale < 1 or max(width, height) * scale > get_max_export_size():
+        return None
+    return scale
+
+
+def canvas_image_etag(request, pk, image_format):
+    row = Canvas.objects.filter(pk=pk).values_list('version', 'width', 'height').first()
+    if row is None:
+        return None
+    version, width, height = row
+    scale = get_export_scale(request, width, height)
+    if scale is None:
+        return None
+    return f'{pk}-{version}-image-{scale}-{image_format}'
+
+
+# Export d'un canvas en image PNG ou WebP (?scale=N pour agrandir chaque pixel)
+@condition(etag_func=canvas_image_etag)
+def canvas_image(request, pk, image_format):
+    try:
+        canvas = Canvas.objects.get(pk=pk)
+    except Canvas.DoesNotExist:
+        return JsonResponse({'error': 'Canvas not found'}, status=404)
+    scale = get_export_scale(request, canvas.width, canvas.height)
+    if scale is None:
+        return JsonResponse({'error': 'Invalid scale'}, status=400)
+    content_type = IMAGE_FORMATS[image_format][1]
+    response = HttpResponse(get_export(canvas, scale, image_format), content_type=content_type)
+    set_image_cache_control(request, response, canvas.version)
+    return response
+
+
+def get_timelapse_options(request, canvas):
+    """
+    Lit les paramètres `frames` (nombre d'images), `duration` (durée d'une image en ms)
+    et `scale` du time-lapse. Retourne None si l'un d'eux est invalide.
+    """
+    try:
+        frames = int(request.GET.get('frames', 50))
+        duration = int(request.GET.get('duration', 100))
+    except ValueError:
+        return None
+    scale = get_export_scale(request, canvas.width, canvas.height)
+    if scale is None or not 1 <= frames <= get_max_frames() or not 20 <= duration <= 10000:
+        return None
+    return frames, duration, scale
+
+
+# Time-lapse d'un canvas en GIF animé, envoyé image par image au fur et à mesure du rendu
+@login_required
+def canvas_timelapse(request, pk):
+    try:
+        canvas = Canvas.objects.get(pk=pk)
+    except Canvas.DoesNotExist:
+        return JsonResponse({'error': 'Canvas not found'}, status=404)
+    options = get_timelapse_options(request, canvas)
+    if options is None:
+        return JsonResponse({'error': 'Invalid time-lapse parameters'}, status=400)
+    frames, duration, scale = options
+    response = StreamingHttpResponse(iter_gif(iter_frames(canvas, frames, scale), duration), content_type='image/gif')
+    # L'historique ne change pas, mais sa fin (dernière modification) oui
+    patch_cache_control(response, no_cache=True)
+    return response
 
 
 def community(request):
-    # Récupérer les données du fichier colors.txt
-    url = "https://helbplace2425.alwaysdata.net/colors.txt"
-    response = requests.get(url)
-
-    # Si la requête réussit
-    if response.status_code == 200:
-        # Séparer chaque ligne du fichier en une liste
-        pixel_data = response.text.strip().split('\n')
-        
-        # Construire un tableau 2D avec les couleurs des pixels
-        canvas_data = [line.split(';') for line in pixel_data]
+    # Récupérer la copie locale du fichier colors.txt (rafraîchie en arrière-plan)
+    snapshot, stale = get_community_mirror().get_status()
 
-        # Calculer la largeur et la hauteur du canvas
-        canvas_width = len(canvas_data[0])  # Nombre de pixels dans la première ligne
-        canvas_height = len(canvas_data)    # Nombre de lignes dans le tableau
+    # Si une copie est disponible
+    if snapshot is not None:
+        # Les pixels ne sont pas envoyés dans la page : ils sont chargés en image PNG
+        canvas_width = snapshot['width']
+        canvas_height = snapshot['height']
 
         # Multiplier les dimensions par 10 pour afficher les pixels correctement
         scaled_width = canvas_width * 10
@@ -156,9 +497,11 @@ def community(request):
 
         # Passer ces données au template
         context = {
-            'canvas_data': canvas_data,
+            'version': snapshot['version'],
             'canvas_width': scaled_width,
             'canvas_height': scaled_height,
+            'updated_at': datetime.fromtimestamp(snapshot['updated_at'], tz=timezone.utc),
+            'stale': stale,  # La toile distante n'a pas pu être vérifiée récemment
         }
 
         return render(request, 'blog/community.html', context)
@@ -167,35 +510,66 @@ def community(request):
         return render(request, 'blog/community.html', {'error': 'Unable to fetch canvas data'})
 
 
+def community_board_etag(request):
+    snapshot = get_community_mirror().get_snapshot()
+    return f'community-{snapshot["version"]}' if snapshot is not None else None
+
+
+# Image PNG de la copie locale de la toile commune (?v=<version> pour la mettre en cache)
+@condition(etag_func=community_board_etag)
+def community_board(request):
+    snapshot, data = get_community_mirror().get_board()
+    if snapshot is None:
+        return JsonResponse({'error': 'Unable to fetch canvas data'}, status=503)
+    response = HttpResponse(get_community_image(snapshot, data), content_type='image/png')
+    set_image_cache_control(request, response, snapshot['version'])
+    return response
+
+
+# API pour récupérer uniquement les cases de la toile commune modifiées depuis une version (?since=<version>)
+def get_community_changes(request):
+    try:
+        since = int(request.GET.get('since', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid version'}, status=400)
+    version, changes = get_community_mirror().get_changes(since)
+    if version is None:
+        return JsonResponse({'error': 'Unable to fetch canvas data'}, status=503)
+    if changes is None:
+        # Différences trop anciennes ou indisponibles : le client doit recharger l'image
+        return JsonResponse({'version': version, 'resync': True}, status=200)
+    return JsonResponse({'version': version, 'changes': changes}, status=200)
+
+
 # Méthode pour mettre à jour un pixel sur la toile de la community B2
+# La modification est placée dans la file d'envoi : le serveur distant est appelé en arrière-plan
 def updatePixelCommunity(request):
     # Récupérer les données du formulaire
-    username = "ewalid"  # Remplace par ton nom d'utilisateur
-    password = "FOWoegXfasE9"  # Remplace par ton mot de passe
-    row_index = request.GET.get('row')  # Index de la ligne
-    col_index = request.GET.get('col')  # Index de la colonne
-    hex_value = request.GET.get('hexvalue')  # Valeur hexadécimale du pixel
+    try:
+        row_index = int(request.GET.get('row'))  # Index de la ligne
+        col_index = int(request.GET.get('col'))  # Index de la colonne
+    except (TypeError, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Invalid coordinates'}, status=400)
+    hex_value = request.GET.get('hexvalue', '')  # Valeur hexadécimale du pixel
+    if len(hex_value) != 6 or any(c not in '0123456789abcdefABCDEF' for c in hex_value):
+        return JsonResponse({'status': 'error', 'message': 'Invalid color'}, status=400)
 
-    # URL de la mise à jour du pixel
-    url = f"https://helbplace2425.alwaysdata.net/writer.php?username={username}&password={password}&row={row_index}&col={col_index}&hexvalue={hex_value}"
+    if not get_community_write_queue().enqueue(row_index, col_index, hex_value):
+        # File pleine : le serveur distant ne suit plus, le client doit réessayer plus tard
+        return JsonResponse({'status': 'error', 'message': 'Too many pending updates, please retry later'}, status=503)
+    return JsonResponse({'status': 'success', 'message': 'Pixel update queued'}, status=202)
 
-    # Effectuer la requête GET pour mettre à jour le pixel
-    response = requests.get(url)
 
-    if response.status_code == 200:
-        return JsonResponse({'status': 'success', 'message': 'Pixel updated successfully'})
-    else:
-        return JsonResponse({'status': 'error', 'message': 'Failed to update pixel'})
-    
 
 # Vue pour afficher les statistiques d'un canvas
 @login_required
 def canvas_statistics(request, pk):
     try:
-        canvas = Canvas.objects.get(pk=pk)
+        # Les pixels ne sont pas nécessaires pour les statistiques
+        canvas = Canvas.objects.defer('palette').get(pk=pk)
         
-        # Récupérer les statistiques de la toile
-        statistics = canvas.get_statistics()  # Retourne un dictionnaire
+        # Récupérer les statistiques de la toile (depuis le cache si possible)
+        statistics = get_cached_statistics(canvas)  # Retourne un dictionnaire
 
         # Structure des données pour passer au template
         daily_contributions = statistics['daily_contributions']
@@ -219,3 +593,67 @@ def canvas_statistics(request, pk):
         return JsonResponse({'error': 'Canvas not found'}, status=404)
 
 
+# Classement général des contributeurs (?window=all|24h|7d)
+def leaderboard(request):
+    window = request.GET.get('window', 'all')
+    if window not in LEADERBOARD_WINDOWS:
+        window = 'all'
+    return render(request, 'blog/leaderboard.html', {
+        'window': window,
+        'windows': [('all', 'All time'), ('7d', 'Last 7 days'), ('24h', 'Last 24 hours')],
+        'entries': get_leaderboard(window),
+    })
+
+
+# API du classement général (?window=all|24h|7d&limit=N)
+def get_leaderboard_data(request):
+    window = request.GET.get('window', 'all')
+    if window not in LEADERBOARD_WINDOWS:
+        return JsonResponse({'error': 'Invalid window'}, status=400)
+    try:
+        limit = int(request.GET['limit']) if 'limit' in request.GET else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+    if limit is not None and limit < 1:
+        return JsonResponse({'error': 'Invalid limit'}, status=400)
+    return JsonResponse({'window': window, 'entries': get_leaderboard(window, limit)}, status=200)
+
+
+# Compteurs du cache des statistiques, pour le monitoring (réservé au staff)
+@staff_member_required
+def statistics_cache_counters(request):
+    return JsonResponse(get_counters(), status=200)
+
+
+# Taille de la file d'envoi vers la toile commune et compteurs d'envois (réservé au staff)
+@staff_member_required
+def community_write_metrics(request):
+    return JsonResponse(get_community_write_queue().metrics(), status=200)
+
+
+# Mesures au format texte de Prometheus : requêtes par nom d'URL, cache des statistiques
+# et file d'envoi vers la toile commune (staff, ou adresses de METRICS_ALLOWED_IPS : aucune par défaut)
+def metrics(request):
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    if not request.user.is_staff and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return JsonResponse({'error': 'You are not allowed to view metrics.'}, status=403)
+
+    lines = get_request_metrics().render()
+    lines += format_counters('canvas_statistics_cache_total', 'Statistics cache lookups by result.',
+                             'result', get_counters())
+    queue_metrics = get_community_write_queue().metrics()
+    lines += format_counters('community_writes_total', 'Community pixel writes by outcome.', 'event',
+                             {name: queue_metrics[name] for name in COMMUNITY_WRITE_METRIC_NAMES})
+    lines += format_counters('community_write_queue', 'Community pixel writes waiting or being sent.', 'state',
+                             {'pending': queue_metrics['depth'], 'in_flight': queue_metrics['in_flight']},
+                             metric_type='gauge')
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Dernières requêtes plus lentes que METRICS_SLOW_REQUEST_THRESHOLD (réservé au staff)
+@staff_member_required
+def slow_requests(request):
+    return render(request, 'blog/slow_requests.html', {
+        'slow_requests': get_request_metrics().slowest(),
+        'threshold_ms': getattr(settings, 'METRICS_SLOW_REQUEST_THRESHOLD', 0.5) * 1000,
+    })
@@ -0,0 +1,87 @@
+"""
+Canal WebSocket optionnel des modifications de pixels, branché directement dans asgi.py
+(sans dépendance supplémentaire). URL : /ws/canvas/<pk>/
+
+Le serveur envoie d'abord {"type": "hello", "version": V} puis un message JSON
+{"version": V, "changes": [...]} (ou {"version": V, "resync": true}) par modification,
+exactement comme le flux Server-Sent Events.
+"""
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+
+from .broadcast import get_broadcaster
+
+WEBSOCKET_PATH = re.compile(r'^/ws/canvas/(?P<pk>\d+)/$')
+
+
+class _SessionRequest:
+    """Objet minimal accepté par django.contrib.auth.get_user (seule la session est utilisée)."""
+
+    def __init__(self, session):
+        self.session = session
+
+
+def _authenticate(scope):
+    """Retourne l'utilisateur correspondant au cookie de session de la connexion."""
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(morsel.value if morsel else None)
+    return get_user(_SessionRequest(session))
+
+
+def _get_version(pk):
+    from .models import Canvas
+    return Canvas.objects.filter(pk=pk).values_list('version', flat=True).first()
+
+
+async def websocket_application(scope, receive, send):
+    """Application ASGI gérant les connexions WebSocket vers /ws/canvas/<pk>/."""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = WEBSOCKET_PATH.match(scope['path'])
+    user = await sync_to_async(_authenticate)(scope) if match else None
+    if user is None or not user.is_authenticated:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    pk = int(match['pk'])
+    broadcaster = get_broadcaster()
+    subscription = broadcaster.subscribe(pk)
+    try:
+        version = await sync_to_async(_get_version)(pk)
+        if version is None:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+
+        await send({'type': 'websocket.accept'})
+        await send({'type': 'websocket.send', 'text': json.dumps({'type': 'hello', 'version': version})})
+
+        # Attendre en même temps un message à diffuser et la fermeture par le client
+        receive_task = asyncio.ensure_future(receive())
+        while True:
+            get_task = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({receive_task, get_task}, return_when=asyncio.FIRST_COMPLETED)
+            if get_task in done:
+                await send({'type': 'websocket.send', 'text': json.dumps(get_task.result())})
+            else:
+                get_task.cancel()
+            if receive_task in done:
+                if receive_task.result()['type'] == 'websocket.disconnect':
+                    break
+                # Les messages envoyés par le client sont ignorés
+                receive_task = asyncio.ensure_future(receive())
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,102 @@
+"""
+Format binaire compact des données d'une toile, servi par get_canvas_data aux clients qui
+le demandent (en-tête Accept: application/octet-stream) ; le JSON reste le format par défaut.
+
+Le corps contient un en-tête (signature, largeur, hauteur, version, taille de la palette),
+la palette (3 octets RGB par couleur) puis un octet par pixel (index dans la palette),
+ligne par ligne : c'est directement le tampon PixelBuffer, sans conversion pixel par pixel.
+Il est compressé avec gzip si le client l'accepte (les longues plages d'une même couleur se
+compressent très bien) et mis en cache pour la version de la toile.
+"""
+import gzip
+import struct
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .pixels import PixelBuffer, hex_to_rgb
+
+CONTENT_TYPE = 'application/octet-stream'
+
+# Signature, largeur, hauteur, version, nombre de couleurs de la palette (big-endian)
+HEADER = struct.Struct('>4sIIQH')
+MAGIC = b'HPX1'
+
+
+def accepts_binary(request):
+    """Vrai si le client préfère le format binaire au JSON (Accept: application/octet-stream)."""
+    return request.get_preferred_type(['application/json', CONTENT_TYPE]) == CONTENT_TYPE
+
+
+def parse_accept_encoding(header):
+    """Retourne {codage en minuscules: q} d'un en-tête Accept-Encoding (q vaut 1 par défaut)."""
+    codings = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    # Valeur invalide : le codage est considéré comme refusé
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def accepts_gzip(request):
+    """
+    Vrai si le client accepte gzip : q de gzip, ou à défaut de "*", supérieur à 0.
+    "gzip;q=0" est un refus explicite, même si "*" est accepté.
+    """
+    codings = parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+    q = codings.get('gzip', codings.get('x-gzip', codings.get('*', 0)))
+    return q > 0
+
+
+def encode_canvas(buffer, version):
+    """Retourne les octets du format binaire (non compressé) d'un tampon de pixels."""
+    palette = bytes(channel for color in buffer.palette for channel in hex_to_rgb(color))
+    header = HEADER.pack(MAGIC, buffer.width, buffer.height, version, len(buffer.palette))
+    return header + palette + bytes(buffer.data)
+
+
+def decode_canvas(data):
+    """Décode le format binaire (non compressé) et retourne (tampon de pixels, version)."""
+    magic, width, height, version, colors = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Invalid canvas data")
+    start = HEADER.size
+    palette = [f'#{data[i:i + 3].hex().upper()}' for i in range(start, start + colors * 3, 3)]
+    return PixelBuffer(width, height, palette, data[start + colors * 3:]), version
+
+
+def compress(data):
+    # mtime=0 : le même contenu donne toujours les mêmes octets
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def get_canvas_payload(canvas_id, version, compressed):
+    """
+    Retourne les octets du format binaire de la toile (compressés avec gzip si demandé),
+    mis en cache pour sa version : les pixels ne sont chargés qu'en l'absence du cache.
+    """
+    name = 'gzip' if compressed else 'raw'
+    key = f'canvas-render:{canvas_id}:{version}:wire-{name}'
+    data = cache.get(key)
+    if data is None:
+        from .models import Canvas
+
+        canvas = Canvas.objects.get(pk=canvas_id)
+        # La toile a pu être modifiée depuis la lecture de version
+        data = encode_canvas(canvas.get_pixel_buffer(), canvas.version)
+        if compressed:
+            data = compress(data)
+        cache.set(f'canvas-render:{canvas_id}:{canvas.version}:wire-{name}', data,
+                  getattr(settings, 'CANVAS_IMAGE_CACHE_TIMEOUT', 3600))
+    return data
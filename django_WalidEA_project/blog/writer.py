@@ -0,0 +1,158 @@
+"""
+Thread d'écriture unique des pixels (mode CANVAS_SINGLE_WRITER, pour SQLite en production).
+
+Avec SQLite, une seule transaction d'écriture est possible à la fois : des requêtes qui
+écrivent en parallèle s'attendent les unes les autres (ou échouent avec "database is locked")
+et chacune paie la validation de sa propre transaction. Ici, les threads des requêtes placent
+leurs lots dans une file et attendent un Future ; un seul thread les applique, par groupes
+d'au plus CANVAS_WRITER_BATCH_SIZE lots validés dans une même transaction. Les toiles sont
+chargées une fois par groupe et le thread n'entre jamais en conflit avec lui-même.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from .models import PIXEL_FIELDS, Canvas, CanvasWriteConflict
+
+# Marqueur placé dans la file pour arrêter le thread d'écriture
+STOP = object()
+
+
+class PixelWriter:
+    """File des lots de modifications, appliqués par un thread d'écriture unique."""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or getattr(settings, 'CANVAS_WRITER_BATCH_SIZE', 50)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Démarre le thread d'écriture (une seule fois)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Arrête le thread d'écriture après les lots déjà en file et ferme sa connexion."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(STOP)
+            thread.join()
+
+    def submit(self, canvas_id, pixels, user):
+        """
+        Place un lot [(x, y, couleur), ...] dans la file. Le Future retourné donne
+        (couleurs stockées, champs PIXEL_FIELDS de la toile après l'écriture).
+        """
+        future = Future()
+        self._queue.put((canvas_id, pixels, user, future))
+        return future
+
+    def write(self, canvas_id, pixels, user):
+        """Soumet un lot et attend son application (voir submit)."""
+        future = self.submit(canvas_id, pixels, user)
+        try:
+            return future.result(timeout=getattr(settings, 'CANVAS_WRITER_TIMEOUT', 10))
+        except TimeoutError:
+            if future.cancel():
+                raise CanvasWriteConflict(f"Canvas {canvas_id} is too busy, please retry")
+            # Lot en cours d'application : sa transaction est courte, on attend son résultat
+            return future.result()
+
+    def flush(self, block=False):
+        """
+        Applique les lots en file, par groupes d'au plus batch_size lots, dans le thread appelant.
+        Avec block=True, attend d'abord qu'un lot arrive. Retourne False si l'arrêt est demandé.
+        """
+        while True:
+            try:
+                item = self._queue.get(block=block)
+            except queue.Empty:
+                return True
+            block = False
+            batch = []
+            while item is not STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._apply(batch)
+            if item is STOP:
+                return False
+
+    def _apply(self, batch):
+        """Applique un groupe de lots dans une seule transaction, puis résout leurs Future."""
+        canvases = {}
+        results = []
+        try:
+            with transaction.atomic():
+                for canvas_id, pixels, user, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        canvas = canvases.get(canvas_id)
+                        if canvas is None:
+                            canvas = canvases[canvas_id] = Canvas.objects.get(pk=canvas_id)
+                        # apply_pixels crée un point de sauvegarde : un lot en erreur n'annule que lui-même
+                        stored_colors = canvas.apply_pixels(pixels, user)
+                    except DatabaseError as e:
+                        # La transaction du groupe n'est plus utilisable : tout le groupe échoue
+                        future.set_exception(e)
+                        raise
+                    except Exception as e:
+                        # L'instance a pu être modifiée avant l'erreur : elle sera rechargée
+                        canvases.pop(canvas_id, None)
+                        future.set_exception(e)
+                        continue
+                    fields = {name: getattr(canvas, name) for name in PIXEL_FIELDS}
+                    # La palette de l'instance change avec les lots suivants
+                    fields['palette'] = list(fields['palette'])
+                    results.append((future, (stored_colors, fields)))
+        except Exception as e:
+            # Validation du groupe impossible : aucune de ses écritures n'a été enregistrée
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            connection.close_if_unusable_or_obsolete()
+            return
+        for future, result in results:
+            future.set_result(result)
+
+    def _run(self):
+        try:
+            while self.flush(block=True):
+                pass
+        finally:
+            connection.close()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_pixel_writer():
+    """Retourne le thread d'écriture des pixels du processus, (re)démarré si nécessaire."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = PixelWriter()
+    _writer.start()
+    return _writer
+
+
+def stop_pixel_writer():
+    """Arrête le thread d'écriture du processus s'il a été démarré (fin d'un benchmark)."""
+    with _writer_lock:
+        writer = _writer
+    if writer is not None:
+        writer.stop()
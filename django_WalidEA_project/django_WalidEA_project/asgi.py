@@ -2,6 +2,9 @@
 ASGI config for django_WalidEA_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests (including the Server-Sent Events stream of live pixel updates) are
+served by Django; WebSocket connections to /ws/canvas/<pk>/ are handled by
+blog.websocket.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +16,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_WalidEA_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importé après l'initialisation de Django (le module utilise les settings et les modèles)
+from blog.websocket import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +75,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'django_WalidEA_project.wsgi.application'
 
+# Les mises à jour en direct (Server-Sent Events, WebSocket) nécessitent un serveur ASGI,
+# par exemple : uvicorn django_WalidEA_project.asgi:application
+ASGI_APPLICATION = 'django_WalidEA_project.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -85,6 +90,116 @@ DATABASES = {
     }
 }
 
+# Mode de production SQLite (définir HELBPLACE_SQLITE_PRODUCTION=1) : pragmas appliqués à chaque
+# connexion (voir blog.database), transactions d'écriture qui prennent le verrou dès leur début
+# et écritures de pixels regroupées par un thread d'écriture unique (voir blog.writer)
+SQLITE_PRODUCTION = bool(os.environ.get('HELBPLACE_SQLITE_PRODUCTION'))
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # en millisecondes
+    'mmap_size': 268435456,  # 256 Mo
+    'temp_store': 'MEMORY',
+}
+SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS if SQLITE_PRODUCTION else {}
+CANVAS_SINGLE_WRITER = SQLITE_PRODUCTION
+# Nombre maximal de lots de pixels validés dans une même transaction et attente maximale d'une requête (en secondes)
+CANVAS_WRITER_BATCH_SIZE = 50
+CANVAS_WRITER_TIMEOUT = 10
+
+if SQLITE_PRODUCTION:
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Cache en mémoire par défaut ; définir HELBPLACE_CACHE_DIR pour partager le cache
+# entre plusieurs processus via des fichiers (par exemple avec plusieurs workers).
+
+if os.environ.get('HELBPLACE_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['HELBPLACE_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Limiteur de l'intervalle de modification des pixels et cache utilisé pour son état
+CANVAS_RATE_LIMITER = 'blog.ratelimit.CooldownLimiter'
+CANVAS_RATE_LIMIT_CACHE = 'default'
+
+# Intervalle de modification et nombre maximal de pixels par requête selon le rôle (staff, créateur
+# de la toile, autres utilisateurs) : par défaut blog.ratelimit.DEFAULT_COOLDOWN_POLICY. Définir
+# CANVAS_COOLDOWN_POLICY pour la remplacer, par exemple {'staff': {'interval': 0, ...}} pour retirer
+# l'intervalle des membres du staff (y compris pour les modifications d'un seul pixel)
+
+# Diffusion des modifications de pixels aux clients abonnés :
+# - 'blog.broadcast.LocalBackend' : un seul processus (publication directe)
+# - 'blog.broadcast.ChangeLogBackend' : plusieurs workers (relecture du journal des changements en base)
+CANVAS_BROADCAST_BACKEND = 'blog.broadcast.LocalBackend'
+
+# Miniatures des canvas (page d'accueil) : taille du plus grand côté et durée de cache des images rendues
+CANVAS_THUMBNAIL_SIZE = 200
+CANVAS_IMAGE_CACHE_TIMEOUT = 3600
+
+# Taille maximale (en pixels) d'un côté des images exportées (canvas/<pk>/image.png?scale=N)
+CANVAS_EXPORT_MAX_SIZE = 4096
+
+# Cache des statistiques : une toile modifiée n'est recalculée qu'après ce délai (en secondes)
+CANVAS_STATISTICS_STALENESS = 10
+CANVAS_STATISTICS_CACHE_TIMEOUT = 3600
+
+# Miroir local de la toile commune B2 : URL du fichier distant, intervalle de rafraîchissement
+# en arrière-plan et délai (en secondes) après lequel la copie affichée est signalée comme périmée
+COMMUNITY_BOARD_URL = 'https://helbplace2425.alwaysdata.net/colors.txt'
+COMMUNITY_REFRESH_INTERVAL = 5
+COMMUNITY_STALE_AFTER = 30
+COMMUNITY_FETCH_TIMEOUT = 5
+# Durée de conservation (en secondes) des cases modifiées par chaque nouvelle version de la toile commune
+COMMUNITY_DELTA_TIMEOUT = 300
+
+# Envoi des modifications vers la toile commune : identifiants, nombre de threads d'envoi,
+# taille maximale de la file, nombre de nouvelles tentatives et délai initial entre elles (doublé à chaque essai)
+COMMUNITY_WRITER_URL = 'https://helbplace2425.alwaysdata.net/writer.php'
+COMMUNITY_USERNAME = os.environ.get('COMMUNITY_USERNAME', 'ewalid')
+COMMUNITY_PASSWORD = os.environ.get('COMMUNITY_PASSWORD', 'FOWoegXfasE9')
+COMMUNITY_WRITE_WORKERS = 4
+COMMUNITY_WRITE_QUEUE_SIZE = 10000
+COMMUNITY_WRITE_RETRIES = 5
+COMMUNITY_WRITE_BACKOFF = 0.5
+
+# Historique : une image clé est enregistrée toutes les N modifications d'une toile
+# (au plus N modifications sont rejouées pour reconstruire un état passé)
+CANVAS_KEYFRAME_INTERVAL = 500
+
+# Nombre maximal d'images d'un time-lapse (canvas/<pk>/timelapse.gif?frames=N)
+CANVAS_TIMELAPSE_MAX_FRAMES = 300
+
+# Classement général : nombre de contributeurs affichés, durée de cache (en secondes) d'un classement
+# et durée de conservation (en jours) des compteurs horaires (fenêtre la plus longue)
+LEADERBOARD_SIZE = 50
+LEADERBOARD_CACHE_TIMEOUT = 30
+LEADERBOARD_RETENTION_DAYS = 7
+
+# Variantes des images de profil (miniature, avatar, WebP) : générées par ce nombre de threads
+# en arrière-plan (False : générées pendant la requête)
+PROFILE_IMAGE_BACKGROUND = True
+PROFILE_IMAGE_WORKERS = 2
+
+# Mesures des requêtes (/metrics) : réservées au staff, et aux adresses de METRICS_ALLOWED_IPS
+# (serveur Prometheus). REMOTE_ADDR est l'adresse du proxy derrière un reverse proxy (nginx...) :
+# n'y ajouter alors ni 127.0.0.1 ni l'adresse du proxy, sinon /metrics devient public.
+# Durée (en secondes) à partir de laquelle une requête est lente et nombre de requêtes lentes conservées
+METRICS_ALLOWED_IPS = []
+METRICS_SLOW_REQUEST_THRESHOLD = 0.5
+METRICS_SLOW_REQUESTS = 50
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,136 @@
+"""
+Variantes des images de profil (miniature, avatar et miniature WebP).
+
+L'image envoyée par l'utilisateur n'est plus modifiée : ses variantes sont générées par un
+groupe de threads, après la validation de l'enregistrement du profil, et uniquement lorsque
+l'image a changé (voir Profile.save). Les fichiers des variantes sont nommés d'après
+l'empreinte SHA-256 du contenu de l'image : une image déjà traitée (par exemple l'image
+par défaut, partagée par tous les profils) n'est jamais traitée une seconde fois.
+"""
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from PIL import Image
+
+# Variantes générées : nom -> (taille maximale du plus grand côté, format Pillow ou None pour
+# garder celui de l'image d'origine)
+VARIANTS = {
+    'thumbnail': (300, None),
+    'avatar': (128, None),
+    'webp': (300, 'WEBP'),
+}
+
+# Formats d'origine conservés pour les variantes (les autres sont convertis en PNG)
+KEPT_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+
+
+def hash_image(image):
+    """Empreinte SHA-256 (hexadécimale) du contenu d'un fichier image, lu par morceaux."""
+    digest = hashlib.sha256()
+    with image.open('rb') as f:
+        for chunk in f.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_name(image_hash, size, extension):
+    return f'profile_pics/variants/{image_hash}_{size}.{extension}'
+
+
+def variant_format(source_format, image_format):
+    """Retourne (format Pillow, extension) d'une variante d'une image au format source_format."""
+    if image_format is None:
+        image_format = source_format if source_format in KEPT_FORMATS else 'PNG'
+    return image_format, KEPT_FORMATS.get(image_format, image_format.lower())
+
+
+def render_variant(img, size, image_format):
+    """Retourne les octets de l'image réduite à size x size pixels au plus."""
+    variant = img.copy()
+    variant.thumbnail((size, size))
+    if image_format == 'JPEG' and variant.mode not in ('RGB', 'L'):
+        variant = variant.convert('RGB')
+    elif image_format == 'WEBP' and variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA')
+    output = io.BytesIO()
+    variant.save(output, format=image_format)
+    return output.getvalue()
+
+
+def generate_variants(image, image_hash):
+    """
+    Génère les variantes manquantes de l'image et retourne {nom de variante: nom du fichier}.
+    Les fichiers existants (même empreinte) sont réutilisés : seul l'en-tête de l'image est lu.
+    """
+    storage = image.storage
+    variants = {}
+    with image.open('rb') as f:
+        # Image.open ne lit que l'en-tête : les pixels ne sont décodés que pour une variante manquante
+        img = Image.open(f)
+        for name, (size, image_format) in VARIANTS.items():
+            image_format, extension = variant_format(img.format, image_format)
+            path = variant_name(image_hash, size, extension)
+            if not storage.exists(path):
+                saved = storage.save(path, ContentFile(render_variant(img, size, image_format)))
+                if saved != path:
+                    # Même variante enregistrée entre-temps par un autre thread : la copie est inutile
+                    storage.delete(saved)
+            variants[name] = path
+    return variants
+
+
+def process_profile_image(profile_id):
+    """
+    Met à jour les variantes de l'image du profil si son contenu a changé depuis le dernier
+    traitement. L'enregistrement est ignoré si l'image a de nouveau changé entre-temps.
+    """
+    from .models import Profile
+
+    profile = Profile.objects.filter(pk=profile_id).only('image', 'image_hash', 'image_variants').first()
+    if profile is None or not profile.image:
+        return
+    image_hash = hash_image(profile.image)
+    if image_hash == profile.image_hash and profile.image_variants:
+        return
+    variants = generate_variants(profile.image, image_hash)
+    Profile.objects.filter(pk=profile_id, image=profile.image.name).update(
+        image_hash=image_hash, image_variants=variants,
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Groupe de threads du processus chargé de générer les variantes."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'PROFILE_IMAGE_WORKERS', 2),
+                                           thread_name_prefix='profile-images')
+        return _executor
+
+
+def schedule_profile_image(profile_id):
+    """
+    Demande le traitement de l'image d'un profil : en arrière-plan, ou immédiatement
+    si PROFILE_IMAGE_BACKGROUND vaut False.
+    """
+    if getattr(settings, 'PROFILE_IMAGE_BACKGROUND', True):
+        get_executor().submit(run_in_thread, profile_id)
+    else:
+        process_profile_image(profile_id)
+
+
+def run_in_thread(profile_id):
+    try:
+        process_profile_image(profile_id)
+    finally:
+        # Les threads du groupe sont réutilisés : leur connexion ne doit pas rester ouverte
+        connection.close()
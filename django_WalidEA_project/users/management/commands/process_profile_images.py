@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from users.images import process_profile_image
+from users.models import DEFAULT_IMAGE, Profile
+
+
+class Command(BaseCommand):
+    help = "Génère les variantes (miniature, avatar, WebP) des images de profil qui n'ont pas encore été traitées."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Vérifier aussi les profils déjà traités (images modifiées hors de l'application)")
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.all() if options['all'] else Profile.objects.filter(image_hash='')
+        # L'image par défaut, partagée par les nouveaux profils, n'est jamais traitée
+        profiles = profiles.exclude(image=DEFAULT_IMAGE)
+        count = 0
+        for profile_id in profiles.values_list('id', flat=True).iterator():
+            process_profile_image(profile_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"{count} profile images processed."))
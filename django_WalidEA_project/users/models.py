@@ -1,28 +1,70 @@
-from django.db import models
+from functools import partial
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from PIL import Image
+
+from .images import schedule_profile_image
+
+# Image attribuée aux nouveaux profils : servie telle quelle, sans variantes
+DEFAULT_IMAGE = 'default.jpg'
 
 class Profile(models.Model):
     # Définition de la relation entre le modèle Profile et User (un utilisateur peut avoir un profil)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
     # Champ pour l'image de profil, avec une valeur par défaut
-    image = models.ImageField(default='default.jpg', upload_to='profile_pics')
+    image = models.ImageField(default=DEFAULT_IMAGE, upload_to='profile_pics')
+
+    # Empreinte SHA-256 de l'image dont les variantes ont été générées (vide tant qu'elles ne l'ont pas été)
+    image_hash = models.CharField(max_length=64, blank=True, default='')
+
+    # Fichiers des variantes de l'image : {"thumbnail": ..., "avatar": ..., "webp": ...} (voir users.images)
+    image_variants = models.JSONField(default=dict, blank=True)
 
     # Représentation sous forme de chaîne du profil, affichant le nom de l'utilisateur
     def __str__(self):
         return f'{self.user.username} Profile'
 
-    # Méthode pour sauvegarder l'image de profil
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nom de l'image enregistrée en base, pour savoir si elle a changé lors du prochain save()
+        if 'image' in field_names:
+            instance._saved_image = values[field_names.index('image')]
+        return instance
+
+    def image_changed(self):
+        """Vérifie si l'image a été remplacée depuis le chargement du profil (sans lire le fichier)."""
+        if 'image' in self.get_deferred_fields():
+            return False
+        return not self.image._committed or self.image.name != getattr(self, '_saved_image', None)
+
+    # Méthode pour sauvegarder le profil : les variantes de l'image ne sont générées que si elle a changé,
+    # en arrière-plan et une fois l'enregistrement validé (aucune lecture d'image lors des autres sauvegardes).
+    # L'image par défaut n'est jamais traitée : la création d'un profil ne génère rien
     def save(self, *args, **kwargs):
-        # Sauvegarde de l'instance avant toute modification
+        changed = self.image_changed()
         super(Profile, self).save(*args, **kwargs)
+        if changed:
+            self._saved_image = self.image.name
+            if self.image.name != DEFAULT_IMAGE:
+                transaction.on_commit(partial(schedule_profile_image, self.pk))
+
+    def get_image_url(self, variant):
+        """URL d'une variante de l'image, ou de l'image d'origine tant qu'elle n'a pas été générée."""
+        name = self.image_variants.get(variant)
+        if name:
+            return self.image.storage.url(name)
+        return self.image.url
+
+    @property
+    def thumbnail_url(self):
+        return self.get_image_url('thumbnail')
 
-        # Ouvrir l'image à l'aide de la bibliothèque PIL
-        img = Image.open(self.image.path)
+    @property
+    def avatar_url(self):
+        return self.get_image_url('avatar')
 
-        # Si l'image est trop grande (plus de 300x300 pixels), on la redimensionne
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)  # Taille cible
-            img.thumbnail(output_size)  # Redimensionner l'image en maintenant le ratio
-            img.save(self.image.path)   # Sauvegarder l'image redimensionnée
+    @property
+    def webp_url(self):
+        return self.get_image_url('webp') if 'webp' in self.image_variants else None
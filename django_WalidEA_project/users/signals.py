@@ -18,6 +18,10 @@ def create_profile(sender, instance, created, **kwargs):
 def save_profile(sender, instance, **kwargs):
     """
     Cette fonction enregistre le profil de l'utilisateur chaque fois qu'il est sauvegardé.
-    Elle est appelée chaque fois qu'un utilisateur est modifié (après un post_save).
+    Elle est appelée chaque fois qu'un utilisateur est modifié (après un post_save),
+    sauf lors de la mise à jour de la date de dernière connexion (à chaque login).
     """
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
     instance.profile.save()  # Sauvegarde le profil de l'utilisateur
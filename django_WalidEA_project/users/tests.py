@@ -1,3 +1,138 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from blog.models import Canvas, Contribution, PixelEdit
+
+from .models import Profile
+
+
+class ProfileContributionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('painter', password='secret')
+        self.first = Canvas.objects.create(title='First', width=3, height=3, author=self.user, pixel_edit_interval=0)
+        self.second = Canvas.objects.create(title='Second', width=3, height=3, author=self.user, pixel_edit_interval=0)
+        self.first.update_pixel(0, 0, "#000000", self.user)
+        for x in range(3):
+            self.second.update_pixel(x, 0, "#000000", self.user)
+        self.client.force_login(self.user)
+
+    def test_user_profile_lists_contributions(self):
+        response = self.client.get(reverse('user-profile', kwargs={'username': 'painter'}))
+        self.assertEqual(
+            [(contribution.canvas.title, contribution.count) for contribution in response.context['contributions']],
+            [('Second', 3), ('First', 1)],
+        )
+        first = response.context['contributions'][1]
+        self.assertEqual(first.first_edit_at, PixelEdit.objects.get(canvas=self.first).timestamp)
+
+    def test_profile_query_count_does_not_depend_on_canvases(self):
+        url = reverse('user-profile', kwargs={'username': 'painter'})
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for i in range(30):
+            canvas = Canvas.objects.create(title=f'Canvas {i}', width=3, height=3, author=self.user, pixel_edit_interval=0)
+            canvas.write_pixel(0, 0, "#000000", self.user)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.context['contributions']), 20)
+        self.assertEqual(Contribution.objects.filter(user=self.user).count(), 32)
+
+    def test_rebuild_matches_incremental_summaries(self):
+        expected = list(Contribution.objects.order_by('canvas_id').values('canvas_id', 'user_id', 'count', 'first_edit_at',
+                                                                          'last_edit_at'))
+        Contribution.rebuild()
+        self.assertEqual(
+            list(Contribution.objects.order_by('canvas_id').values('canvas_id', 'user_id', 'count', 'first_edit_at',
+                                                                   'last_edit_at')),
+            expected,
+        )
+
+
+def make_upload(name='avatar.png', size=(600, 400), color='red'):
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, format='PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+class ProfileImageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PROFILE_IMAGE_BACKGROUND=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('painter', password='secret', email='painter@example.com')
+
+    def upload(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('profile'), {'username': 'painter', 'email': 'painter@example.com',
+                                                  'image': upload})
+        return Profile.objects.get(user=self.user)
+
+    def test_login_and_user_save_do_not_process_image(self):
+        with mock.patch('users.models.schedule_profile_image') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.client.login(username='painter', password='secret'))
+            user = User.objects.get(pk=self.user.pk)
+            user.first_name = 'Paint'
+            user.save()
+        schedule.assert_not_called()
+
+    def test_create_user_does_not_process_default_image(self):
+        with mock.patch('users.models.schedule_profile_image') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user('newcomer', password='secret')
+            user.profile.save()
+        schedule.assert_not_called()
+        self.assertEqual(user.profile.image.name, 'default.jpg')
+        self.assertEqual(user.profile.image_variants, {})
+
+    def test_command_skips_default_image(self):
+        uploaded = User.objects.create_user('uploader')
+        Profile.objects.filter(user=uploaded).update(image='profile_pics/avatar.png')
+        for options in ({}, {'all': True}):
+            with mock.patch('users.management.commands.process_profile_images.process_profile_image') as process:
+                call_command('process_profile_images', stdout=io.StringIO(), **options)
+            self.assertEqual([call.args for call in process.call_args_list], [(uploaded.profile.pk,)])
+
+    def test_new_image_variants_are_generated(self):
+        self.client.force_login(self.user)
+        profile = self.upload(make_upload())
+        self.assertEqual(len(profile.image_hash), 64)
+        sizes = {}
+        for name, path in profile.image_variants.items():
+            with profile.image.storage.open(path) as f:
+                image = Image.open(f)
+                sizes[name] = (image.format, image.size)
+        self.assertEqual(sizes, {
+            'thumbnail': ('PNG', (300, 200)),
+            'avatar': ('PNG', (128, 85)),
+            'webp': ('WEBP', (300, 200)),
+        })
+        # L'image d'origine n'est pas modifiée
+        with profile.image.open('rb') as f:
+            self.assertEqual(Image.open(f).size, (600, 400))
+        self.assertEqual(profile.thumbnail_url, profile.image.storage.url(profile.image_variants['thumbnail']))
+
+    def test_same_content_is_not_processed_again(self):
+        self.client.force_login(self.user)
+        first = self.upload(make_upload())
+        with mock.patch('users.images.generate_variants') as generate:
+            second = self.upload(make_upload(name='again.png'))
+        generate.assert_not_called()
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(second.image_variants, first.image_variants)
+        third = self.upload(make_upload(name='blue.png', color='blue'))
+        self.assertNotEqual(third.image_hash, first.image_hash)
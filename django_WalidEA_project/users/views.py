@@ -3,10 +3,32 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
-from blog.models import Canvas  # Importation correcte du modèle Canvas pour récupérer les toiles
+from blog.models import Contribution  # Résumés des contributions par utilisateur et par toile
 from django.contrib.auth.models import User
+from django.core.paginator import Paginator
 from django.http import Http404
 
+# Nombre de toiles affichées par page dans la liste des contributions d'un profil
+CONTRIBUTIONS_PER_PAGE = 20
+
+
+def get_contributions_page(request, user):
+    """
+    Retourne la page demandée (?page=N) des toiles auxquelles l'utilisateur a contribué,
+    de la plus modifiée à la moins modifiée : objets Contribution (nombre de modifications,
+    première et dernière modification) avec le titre de leur toile.
+    Une requête pour le nombre total et une requête indexée pour la page, quel que soit
+    le nombre de toiles modifiées par l'utilisateur.
+    """
+    contributions = (
+        Contribution.objects.filter(user=user)
+        .select_related('canvas')
+        .only('count', 'first_edit_at', 'last_edit_at', 'canvas__id', 'canvas__title')
+        .order_by('-count', 'canvas__title', 'canvas_id')
+    )
+    return Paginator(contributions, CONTRIBUTIONS_PER_PAGE).get_page(request.GET.get('page'))
+
+
 # Fonction pour l'inscription des nouveaux utilisateurs
 def register(request):
     if request.method == 'POST':
@@ -29,18 +51,12 @@ def user_profile(request, username):
     except User.DoesNotExist:
         raise Http404("User not found")  # Si l'utilisateur n'existe pas, lever une erreur 404
 
-    # Récupérer les toiles dans lesquelles l'utilisateur a contribué
-    canvases_contributed = Canvas.objects.filter(contributions__has_key=str(user.id))
-
-    # Créer une liste contenant les toiles avec le nombre de contributions de l'utilisateur
-    canvases_with_contributions = []
-    for canvas in canvases_contributed:
-        contributions_count = len(canvas.contributions.get(str(user.id), []))  # Compter le nombre de contributions
-        canvases_with_contributions.append((canvas, contributions_count))  # Ajouter la toile et son nombre de contributions
+    # Récupérer la page des toiles dans lesquelles l'utilisateur a contribué, avec son nombre de contributions
+    contributions = get_contributions_page(request, user)
 
     context = {
         'user': user,
-        'canvases_with_contributions': canvases_with_contributions,  # Passer la liste des toiles et des contributions
+        'contributions': contributions,  # Passer la page des toiles et des contributions
     }
 
     return render(request, 'users/profile.html', context)  # Rendu du profil de l'utilisateur
@@ -63,22 +79,13 @@ def profile(request):
         u_form = UserUpdateForm(instance=request.user)  # Formulaire d'utilisateur pré-rempli
         p_form = ProfileUpdateForm(instance=request.user.profile)  # Formulaire de profil pré-rempli
 
-    # Récupérer toutes les toiles dans lesquelles l'utilisateur a contribué
-    canvases_contributed = Canvas.objects.filter(contributions__has_key=str(request.user.id))
-
-    # Ajouter le nombre de contributions à chaque toile
-    canvases_with_contributions = []
-    for canvas in canvases_contributed:
-        contributions_count = len(canvas.contributions.get(str(request.user.id), []))
-        canvases_with_contributions.append((canvas, contributions_count))
-
-    # Trier les toiles par nombre de contributions (de la plus grande à la plus petite)
-    canvases_with_contributions.sort(key=lambda x: x[1], reverse=True)
+    # Récupérer la page des toiles dans lesquelles l'utilisateur a contribué, triées par nombre de contributions
+    contributions = get_contributions_page(request, request.user)
 
     context = {
         'u_form': u_form,  # Passer le formulaire d'utilisateur
         'p_form': p_form,  # Passer le formulaire de profil
-        'canvases_with_contributions': canvases_with_contributions  # Passer la liste triée des toiles et des contributions
+        'contributions': contributions  # Passer la page triée des toiles et des contributions
     }
 
     return render(request, 'users/profile.html', context)  # Rendu du profil utilisateur avec les informations et les toiles